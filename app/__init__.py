@@ -4,7 +4,15 @@ from .models import db
 import os
 from datetime import timedelta
 
-def create_app():
+def create_app(background=True):
+    """
+    App erzeugen (gunicorn, run.py, Skripte).
+
+    Args:
+        background: Hintergrund-Threads starten (Sync, Job-Runner, Checkpoints,
+            RFID-Reader). Nur für den Server; CLI- und Cron-Skripte übergeben
+            False, sonst würden sie Jobs übernehmen, die mit dem Skript enden.
+    """
     app = Flask(__name__, static_folder='../static', template_folder='../templates')
     # Cloudflare Tunnel → nginx → Flask: Forwarded-Headers + Prefix (/food) auswerten
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_prefix=1)
@@ -25,14 +33,14 @@ def create_app():
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///foodbot.db'
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         
-        # Database Connection Pooling
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_size': 10,
-            'pool_recycle': 3600,
-            'pool_pre_ping': True,
-            'max_overflow': 5,
-            'pool_timeout': 30
-        }
+        # Database Connection Pooling (SQLite: eigener Pool + PRAGMAs, siehe storage.py)
+        from .storage import engine_options, readonly_binds
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+            app.config['SQLALCHEMY_DATABASE_URI'], pool_size=10, max_overflow=5, pool_recycle=3600
+        )
+        app.config['SQLALCHEMY_BINDS'] = readonly_binds(
+            app.config['SQLALCHEMY_DATABASE_URI'], None, pool_size=5, max_overflow=5, pool_recycle=3600
+        )
         
         # SECRET_KEY (alte Validierung)
         secret_key = os.environ.get('SECRET_KEY')
@@ -52,16 +60,23 @@ def create_app():
         app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
     
     db.init_app(app)
+    # SQLite: WAL, busy_timeout usw. für jede Verbindung (auch der Read-Engine)
+    from . import storage
+    storage.init_app(app)
     
     with app.app_context():
-        db.create_all()
-        # Auto-Sync Kameraden vom Portal (falls JWT_SECRET gesetzt)
-        try:
-            from .sync import sync_kameraden
-            sync_kameraden()
-        except Exception as e:
-            import logging
-            logging.getLogger(__name__).warning(f"Kameraden-Sync beim Start fehlgeschlagen: {e}")
+        # Schema anlegen bzw. fehlende Migrationen anwenden (siehe migrations.py)
+        from .migrations import upgrade
+        upgrade()
+        # User-Index für Scans vorwärmen (Mapper-Events halten ihn aktuell)
+        from .user_index import user_index
+        user_index.rebuild()
+        # Tageszähler bei bestehender Installation einmalig aus den Anmeldungen befüllen
+        from .counters import rebuild_if_empty
+        rebuild_if_empty()
+        # Anmeldezähler pro User (Historie) ebenso
+        from .attendance import rebuild_if_missing
+        rebuild_if_missing()
     
     # Blueprints importieren
     from . import routes
@@ -69,6 +84,7 @@ def create_app():
     from .stats import stats_bp
     from .history import history_bp
     from .system import system_bp
+    from .events import events_bp
     
     # CSRF-Schutz initialisieren (NACH Blueprint-Import)
     from flask_wtf.csrf import CSRFProtect
@@ -113,6 +129,10 @@ def create_app():
     app.register_blueprint(stats_bp)
     app.register_blueprint(history_bp)
     app.register_blueprint(system_bp)
+    app.register_blueprint(events_bp)
+    
+    if background:
+        start_background(app)
     
     # Jinja2 filter for cache busting
     import time
@@ -144,3 +164,23 @@ def create_app():
         return response
     
     return app
+
+
+def start_background(app):
+    """Hintergrund-Threads des Servers starten (je Thread ein Leader pro Host)"""
+    # Kameraden-Sync vom Portal im Hintergrund (falls JWT_SECRET gesetzt);
+    # der Worker-Start wartet nicht mehr auf das Portal
+    from .sync import start_scheduler
+    start_scheduler(app)
+    
+    # Runner für Hintergrund-Jobs (CSV-Import, Sync, Backup aus dem Admin)
+    from .jobs import start_runner
+    start_runner(app)
+    
+    # WAL regelmäßig zurückschreiben
+    from .storage import start_checkpointer
+    start_checkpointer(app)
+    
+    # RFID-Reader (nur ein Prozess pro Host hält den Port)
+    from .routes import start_rfid_thread
+    start_rfid_thread(app)
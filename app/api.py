@@ -1,10 +1,9 @@
 from flask import Blueprint, jsonify, request
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from .models import db, User, Menu, Registration, Guest
+from .models import User
 from .auth import login_required
 from datetime import date, datetime, timedelta
-from sqlalchemy.orm import joinedload
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
@@ -18,24 +17,30 @@ limiter = Limiter(
 @api.route('/status', methods=['GET'])
 @limiter.exempt
 def status():
-    """Aktueller Status: Menü, Anmeldungen, Gäste"""
+    """Aktueller Status: Menü, Anmeldungen, Gäste (304 wenn unverändert)"""
+    from .counters import day_version
+    from .etags import make_etag, conditional_json
     today = date.today()
-    today_menu = Menu.query.filter_by(date=today).first()
-    
-    # Performance: N+1 Query-Problem behoben mit joinedload
-    registrations = Registration.query.options(
-        joinedload(Registration.user)
-    ).filter_by(date=today).all()
+    etag = make_etag('status', today.isoformat(), day_version(today))
+    return conditional_json(etag, _status_payload)
+
+
+def _status_payload():
+    from .today import get_today_context
+    from .counters import get_counts
+    today_ctx = get_today_context()
+    today_menu = today_ctx.menu
     
-    guest_entry = Guest.query.filter_by(date=today).first()
+    # Eine Zeile aus den Tageszählern statt aller Anmeldungen des Tages
+    counts = get_counts(today_ctx.date)
     
-    return jsonify({
-        'date': today.isoformat(),
+    return {
+        'date': today_ctx.date.isoformat(),
         'menu': today_menu.description if today_menu else None,
-        'registrations': len(registrations),
-        'guests': guest_entry.count if guest_entry else 0,
-        'total': len(registrations) + (guest_entry.count if guest_entry else 0)
-    })
+        'registrations': counts.registrations,
+        'guests': counts.guests,
+        'total': counts.total
+    }
 
 @api.route('/register', methods=['POST'])
 @limiter.limit("10 per minute")
@@ -51,77 +56,50 @@ def register():
     if menu_choice not in (1, 2):
         menu_choice = 1
     
+    # Lookup über den prozesslokalen User-Index statt ORM-Query
+    from .user_index import user_index
     user = None
     if card_id:
-        user = User.query.filter_by(card_id=card_id).first()
+        user = user_index.by_card(card_id)
     elif personal_number:
-        user = User.query.filter_by(personal_number=personal_number).first()
+        user = user_index.by_personal_number(personal_number)
     
     if not user:
         return jsonify({'success': False, 'message': 'Benutzer nicht gefunden'}), 404
     
-    today = date.today()
-    today_menu = Menu.query.filter_by(date=today).first()
+    from .today import get_today_context
+    today_menu = get_today_context().menu
+    
+    # Toggle als eine atomare Transaktion; ohne menu_choice im Zwei-Menü-Modus
+    # wird die Auswahl angefordert
+    from .registration import toggle, RegistrationStatus
+    try:
+        outcome = toggle(user.id, today_menu, menu_choice if 'menu_choice' in data else None)
+    except Exception:
+        return jsonify({'success': False, 'message': 'Datenbankfehler'}), 500
     
-    # Deadline-Prüfung (Abmeldung nach Deadline erlauben)
-    if today_menu and not today_menu.is_registration_open():
-        existing_reg = Registration.query.filter_by(user_id=user.id, date=today).first()
-        if not existing_reg:
-            return jsonify({
-                'success': False,
-                'message': f'Anmeldefrist abgelaufen ({today_menu.registration_deadline} Uhr)'
-            }), 403
+    user_data = {'name': user.name, 'personal_number': user.personal_number}
     
-    if today_menu and today_menu.zwei_menues_aktiv:
-        # Prüfe ob User schon angemeldet ist
-        existing_reg = Registration.query.filter_by(user_id=user.id, date=today).first()
-        if existing_reg:
-            # Abmelden
-            try:
-                db.session.delete(existing_reg)
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
-                return jsonify({'success': False, 'message': 'Datenbankfehler'}), 500
-            return jsonify({
-                'success': True,
-                'registered': False,
-                'user': {'name': user.name, 'personal_number': user.personal_number}
-            })
-        else:
-            # Wenn menu_choice nicht übergeben wurde, Menüauswahl anfordern
-            if 'menu_choice' not in data:
-                return jsonify({
-                    'success': True,
-                    'need_menu_choice': True,
-                    'user_id': user.id,
-                    'menu1': today_menu.menu1_name,
-                    'menu2': today_menu.menu2_name,
-                    'user': {'name': user.name, 'personal_number': user.personal_number}
-                })
-            
-            # Anmeldung mit Menüwahl
-            reg = Registration(user_id=user.id, date=today, menu_choice=menu_choice)
-            try:
-                db.session.add(reg)
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
-                return jsonify({'success': False, 'message': 'Datenbankfehler'}), 500
-            return jsonify({
-                'success': True,
-                'registered': True,
-                'user': {'name': user.name, 'personal_number': user.personal_number}
-            })
+    if outcome.status == RegistrationStatus.DEADLINE_CLOSED:
+        return jsonify({
+            'success': False,
+            'message': f'Anmeldefrist abgelaufen ({today_menu.registration_deadline} Uhr)'
+        }), 403
     
-    # Normaler Modus ohne Menüauswahl
-    from .utils import register_user_for_today
-    registered = register_user_for_today(user)
+    if outcome.status == RegistrationStatus.NEEDS_MENU_CHOICE:
+        return jsonify({
+            'success': True,
+            'need_menu_choice': True,
+            'user_id': user.id,
+            'menu1': today_menu.menu1_name,
+            'menu2': today_menu.menu2_name,
+            'user': user_data
+        })
     
     return jsonify({
         'success': True,
-        'registered': registered,
-        'user': {'name': user.name, 'personal_number': user.personal_number}
+        'registered': outcome.registered,
+        'user': user_data
     })
 
 @api.route('/stats', methods=['GET'])
@@ -135,33 +113,20 @@ def stats():
     today = date.today()
     start_date = today - timedelta(days=days - 1)
     
-    # Batch-Queries statt N+1
-    from sqlalchemy import func
-    reg_counts = dict(
-        db.session.query(Registration.date, func.count(Registration.id))
-        .filter(Registration.date >= start_date, Registration.date <= today)
-        .group_by(Registration.date).all()
-    )
-    guest_entries = {
-        g.date: g.count for g in
-        Guest.query.filter(Guest.date >= start_date, Guest.date <= today).all()
-    }
-    menu_entries = {
-        m.date: m.description for m in
-        Menu.query.filter(Menu.date >= start_date, Menu.date <= today).all()
-    }
+    # Aus den Tages-Rollups statt GROUP BY über alle Anmeldungen
+    from .rollups import get_days
+    day_stats = {s.date: s for s in get_days(start_date, today)}
     
     result = []
     for i in range(days):
         day = today - timedelta(days=i)
-        regs = reg_counts.get(day, 0)
-        guests = guest_entries.get(day, 0)
+        entry = day_stats.get(day)
         result.append({
             'date': day.isoformat(),
-            'registrations': regs,
-            'guests': guests,
-            'total': regs + guests,
-            'menu': menu_entries.get(day)
+            'registrations': entry.registrations if entry else 0,
+            'guests': entry.guests if entry else 0,
+            'total': entry.total if entry else 0,
+            'menu': entry.description if entry else None
         })
     
     return jsonify({'stats': result})
@@ -170,19 +135,24 @@ def stats():
 @login_required
 @limiter.limit("30 per minute")
 def users():
-    """Liste aller User (mit Pagination)"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 50, type=int), 100)  # Max 100
+    """Liste aller User, nach Name (Cursor-Pagination: ?after=<next_cursor>&limit=, ?total=1)"""
+    from sqlalchemy import select
+    from .pagination import count, keyset, request_args
+    order_by = [User.name, User.id]
+    try:
+        after, limit = request_args(order_by)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    pagination = User.query.order_by(User.name).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    stmt = select(User.id, User.name, User.personal_number, User.card_id)
+    page = keyset(stmt, order_by=order_by, after=after, limit=limit)
     
-    return jsonify({
+    result = {
         'users': [{'id': u.id, 'name': u.name, 'personal_number': u.personal_number, 'card_id': u.card_id} 
-                  for u in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
-    })
+                  for u in page.items],
+        'next_cursor': page.next_cursor,
+        'limit': limit
+    }
+    if request.args.get('total') == '1':
+        result['total'] = count(stmt)
+    return jsonify(result)
@@ -0,0 +1,71 @@
+"""
+Hot/Archiv-Aufteilung der Anmeldungen.
+
+`Registration` hält nur heute und künftige Tage (schnelle Scans, kleine
+Indizes). Abgeschlossene Tage verschiebt `rotate()` (nächtlich per Cron,
+scripts/rotate_registrations.py) nach `RegistrationArchive`. Leser, die
+Historie brauchen, nutzen `all_registrations()` und sehen beide Tabellen.
+"""
+import logging
+from datetime import date as date_type
+from typing import Optional
+
+from sqlalchemy import delete, select, union_all
+
+from .dialect import insert
+from .models import db, Registration, RegistrationArchive
+
+logger = logging.getLogger(__name__)
+
+
+def all_registrations():
+    """Hot- und Archiv-Tabelle als eine Subquery (user_id, date, menu_choice)"""
+    return union_all(
+        select(Registration.user_id, Registration.date, Registration.menu_choice),
+        select(RegistrationArchive.user_id, RegistrationArchive.date, RegistrationArchive.menu_choice),
+    ).subquery('all_registrations')
+
+
+def rotate(cutoff: Optional[date_type] = None) -> int:
+    """
+    Anmeldungen vor `cutoff` ins Archiv verschieben (ein Commit pro Tag).
+
+    Die Tageszähler bleiben unverändert; die Rollups der verschobenen Tage
+    werden danach festgeschrieben.
+
+    Args:
+        cutoff: Erster Tag, der im Hot-Table bleibt (default heute)
+
+    Returns:
+        Anzahl verschobener Anmeldungen
+    """
+    cutoff = cutoff or date_type.today()
+    days = db.session.execute(
+        select(Registration.date).where(Registration.date < cutoff).distinct().order_by(Registration.date)
+    ).scalars().all()
+
+    moved = 0
+    for day in days:
+        try:
+            db.session.execute(
+                insert(RegistrationArchive).from_select(
+                    ['date', 'user_id', 'menu_choice'],
+                    select(Registration.date, Registration.user_id, Registration.menu_choice)
+                    .where(Registration.date == day),
+                ).on_conflict_do_nothing()
+            )
+            result = db.session.execute(
+                delete(Registration).where(Registration.date == day)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        moved += result.rowcount
+
+    if days:
+        from .rollups import get_days
+        get_days(days[0], days[-1])
+    logger.info(f"Anmeldungen archiviert: {moved} aus {len(days)} Tagen")
+    return moved
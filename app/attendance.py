@@ -0,0 +1,184 @@
+"""
+Gleitende Anmeldezähler pro User (`UserAttendance`) für die Essenshistorie.
+
+`count_7/30/90` zählen die Anmeldungen ab Stichtag minus 7/30/90 Tage
+(künftige Tage eingeschlossen, wie bisher in der Historie), dazu Gesamtzahl
+und letztes Datum. Die Registrierungs-Engine schreibt die Zähler im selben
+Commit wie die Anmeldung fort. Einmal am Tag (rotate_registrations.py)
+rückt `decay()` den Stichtag vor und zieht nur die Tage ab, die aus den
+Fenstern fallen.
+
+Der Stichtag steht global im Versionsstempel 'attendance_as_of' (Datum als
+Ordinalzahl), damit alle Worker auf derselben Basis zählen.
+"""
+import logging
+from datetime import date as date_type, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, case, delete, func, select, update
+
+from .dialect import insert
+from .archive import all_registrations
+from .models import db, DataVersion, UserAttendance
+
+logger = logging.getLogger(__name__)
+
+AS_OF_KEY = 'attendance_as_of'
+WINDOWS = (7, 30, 90)  # Tage
+
+
+def _column(days: int) -> str:
+    return f'count_{days}'
+
+
+def current_as_of() -> Optional[date_type]:
+    """Aktueller Stichtag oder None, wenn die Zähler noch nie aufgebaut wurden"""
+    ordinal = db.session.execute(
+        select(DataVersion.version).where(DataVersion.key == AS_OF_KEY)
+    ).scalar()
+    return date_type.fromordinal(ordinal) if ordinal else None
+
+
+def apply(user_ids: Iterable[int], day: date_type, delta: int):
+    """
+    An- bzw. Abmeldungen eines Tages verbuchen (ohne Commit).
+
+    Abmeldungen erst nach dem Löschen verbuchen: das letzte Datum wird dann
+    aus den verbleibenden Anmeldungen ermittelt.
+
+    Args:
+        user_ids: Betroffene User
+        day: Datum der Anmeldung
+        delta: +1 (angemeldet) oder -1 (abgemeldet)
+    """
+    user_ids = list(user_ids)
+    as_of = current_as_of()
+    if not user_ids or as_of is None:
+        return  # Noch nicht aufgebaut, rebuild() zählt alles
+    table = UserAttendance.__table__
+    steps = {
+        _column(days): delta if day >= as_of - timedelta(days=days) else 0
+        for days in WINDOWS
+    }
+    steps['total_count'] = delta
+
+    if delta > 0:
+        stmt = insert(table).values(
+            user_id=bindparam('uid'), last_date=day,
+            **{column: max(step, 0) for column, step in steps.items()},
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                **{column: table.c[column] + step for column, step in steps.items()},
+                'last_date': case(
+                    (table.c.last_date.is_(None) | (table.c.last_date < day), day),
+                    else_=table.c.last_date,
+                ),
+            },
+        )
+    else:
+        regs = all_registrations()
+        latest = select(func.max(regs.c.date)).where(regs.c.user_id == table.c.user_id).scalar_subquery()
+        stmt = update(table).where(table.c.user_id == bindparam('uid')).values({
+            **{column: table.c[column] + step for column, step in steps.items()},
+            'last_date': case((table.c.last_date == day, latest), else_=table.c.last_date),
+        })
+    db.session.execute(stmt, [{'uid': user_id} for user_id in user_ids])
+
+
+def rebuild(today: Optional[date_type] = None) -> int:
+    """
+    Alle Zähler aus den Anmeldungen (inkl. Archiv) neu berechnen (Reparatur).
+
+    Returns:
+        Anzahl User mit Anmeldungen
+    """
+    today = today or date_type.today()
+    regs = all_registrations()
+    rows = db.session.execute(
+        select(
+            regs.c.user_id,
+            *[func.count(case((regs.c.date >= today - timedelta(days=days), 1))).label(_column(days))
+              for days in WINDOWS],
+            func.count().label('total_count'),
+            func.max(regs.c.date).label('last_date'),
+        ).group_by(regs.c.user_id)
+    ).all()
+    try:
+        db.session.execute(delete(UserAttendance))
+        if rows:
+            db.session.execute(insert(UserAttendance), [dict(row._mapping) for row in rows])
+        db.session.execute(
+            insert(DataVersion).values(key=AS_OF_KEY, version=today.toordinal())
+            .on_conflict_do_update(index_elements=[DataVersion.key], set_={'version': today.toordinal()})
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Anmeldezähler pro User neu berechnet: {len(rows)} User")
+    return len(rows)
+
+
+def decay(today: Optional[date_type] = None) -> bool:
+    """
+    Stichtag auf `today` vorrücken. Einziger Aufrufer ist der nächtliche
+    Cron-Lauf scripts/rotate_registrations.py; die Historie liest nur und
+    warnt, wenn der Stichtag veraltet ist.
+
+    Liest nur die Tage, die seit dem alten Stichtag aus den Fenstern gefallen
+    sind. Liegt der letzte Lauf länger als das größte Fenster zurück, wird
+    neu berechnet.
+
+    Returns:
+        True wenn vorgerückt wurde, False wenn die Zähler schon aktuell sind
+    """
+    today = today or date_type.today()
+    as_of = current_as_of()
+    if as_of is None or (today - as_of).days > max(WINDOWS):
+        rebuild(today)
+        return True
+    if as_of >= today:
+        return False
+
+    table = UserAttendance.__table__
+    regs = all_registrations()
+    try:
+        # Stichtag zuerst umsetzen: nimmt die Schreibsperre, ein paralleler
+        # Worker findet den alten Stand nicht mehr und zieht nicht doppelt ab
+        moved = db.session.execute(
+            update(DataVersion)
+            .where(DataVersion.key == AS_OF_KEY, DataVersion.version == as_of.toordinal())
+            .values(version=today.toordinal())
+        ).rowcount
+        if not moved:
+            db.session.rollback()
+            return False
+        for days in WINDOWS:
+            # Aus dem Fenster gefallen: [alter Stichtag - N, neuer Stichtag - N)
+            expired = db.session.execute(
+                select(regs.c.user_id, func.count())
+                .where(regs.c.date >= as_of - timedelta(days=days),
+                       regs.c.date < today - timedelta(days=days))
+                .group_by(regs.c.user_id)
+            ).all()
+            if expired:
+                column = table.c[_column(days)]
+                db.session.execute(
+                    update(table).where(table.c.user_id == bindparam('uid'))
+                    .values({column: column - bindparam('expired')}),
+                    [{'uid': user_id, 'expired': count} for user_id, count in expired],
+                )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Anmeldezähler pro User auf {today.isoformat()} vorgerückt")
+    return True
+
+
+def rebuild_if_missing():
+    """Beim Start: Zähler initial aufbauen (z.B. nach Update einer bestehenden Installation)"""
+    if current_as_of() is None:
+        rebuild()
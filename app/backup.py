@@ -0,0 +1,203 @@
+"""
+Datenbank-Backups: online, konsistent, komprimiert.
+
+Früher kopierte `shutil.copy2` die laufende SQLite-Datei: während eines
+Schreibzugriffs inkonsistent, im WAL-Modus ohne die Änderungen aus dem
+-wal, in einem Zug von der SD-Karte gelesen und unkomprimiert abgelegt.
+
+SQLite: die Backup-API (`sqlite3.Connection.backup`) kopiert seitenweise
+in eine temporäre Datei, zwischen den Schritten ruht sie kurz, damit
+Anmeldungen nicht warten. Ändert sich die Datenbank dabei zu oft (jede
+Änderung startet die Kopie neu), folgt der Rest in einem Schritt – im
+WAL-Modus blockiert auch das keine Schreiber. Die Kopie wird per
+`PRAGMA integrity_check` geprüft und als .db.gz abgelegt.
+
+PostgreSQL: `pg_dump` im Custom-Format (bereits komprimiert), geprüft
+mit `pg_restore --list`.
+
+Danach bleiben die BACKUP_KEEP neuesten Backups, ältere werden gelöscht.
+"""
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from . import storage
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+KEEP = int(os.getenv('BACKUP_KEEP', '14'))  # Anzahl aufbewahrter Backups
+PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', '256'))  # 1 MiB bei 4-KiB-Seiten
+STEP_SLEEP_MS = int(os.getenv('BACKUP_STEP_SLEEP_MS', '20'))  # Pause zwischen zwei Schritten
+MAX_RESTARTS = 3  # Danach den Rest in einem Schritt kopieren
+CHUNK_SIZE = 1024 * 1024
+
+PREFIX = 'foodbot_'
+SUFFIXES = ('.db.gz', '.dump', '.db')  # .db: ältere, unkomprimierte Backups
+
+
+class BackupError(Exception):
+    """Backup ist unvollständig oder beschädigt"""
+
+
+class _Restarted(Exception):
+    """Kopie wurde durch Schreibzugriffe zu oft neu gestartet"""
+
+
+@dataclass
+class Backup:
+    path: str
+    size: int  # Bytes
+    seconds: float
+    removed: List[str] = field(default_factory=list)  # Durch die Aufbewahrung gelöscht
+
+    def __str__(self):
+        return f"{self.path} ({self.size / 1024:.0f} KB, {self.seconds:.1f} s)"
+
+
+def create(progress: Optional[Callable[[int, int], None]] = None) -> Backup:
+    """
+    Backup der App-Datenbank nach BACKUP_DIR schreiben (im App-Kontext).
+
+    Args:
+        progress: Wird mit (kopierte Seiten, Seiten gesamt) aufgerufen (nur SQLite)
+
+    Raises:
+        BackupError: Kopie fehlgeschlagen oder Prüfung nicht bestanden
+    """
+    url = db.engine.url  # Flask-SQLAlchemy hat relative SQLite-Pfade schon aufgelöst
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    started = time.monotonic()
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if url.get_backend_name() == 'postgresql':
+        path = os.path.join(BACKUP_DIR, f'{PREFIX}{timestamp}.dump')
+        _pg_dump(url, path)
+    else:
+        path = os.path.join(BACKUP_DIR, f'{PREFIX}{timestamp}.db.gz')
+        _sqlite_backup(url.database, path, progress)
+    backup = Backup(path=path, size=os.path.getsize(path), seconds=time.monotonic() - started)
+    backup.removed = prune()
+    logger.info(f"Backup erstellt: {backup}")
+    return backup
+
+
+def list_backups() -> List[str]:
+    """Pfade aller Backups in BACKUP_DIR, neueste zuerst"""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    paths = [
+        os.path.join(BACKUP_DIR, name) for name in os.listdir(BACKUP_DIR)
+        if name.startswith(PREFIX) and name.endswith(SUFFIXES)
+    ]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def prune(keep: int = KEEP) -> List[str]:
+    """
+    Alte Backups löschen, die `keep` neuesten bleiben.
+
+    Returns:
+        Gelöschte Pfade
+    """
+    removed = []
+    for path in list_backups()[keep:]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            logger.warning(f"Altes Backup nicht gelöscht: {path}: {e}")
+    if removed:
+        logger.info(f"{len(removed)} alte(s) Backup(s) gelöscht")
+    return removed
+
+
+# --- SQLite --------------------------------------------------------------
+
+def _sqlite_backup(database: str, path: str, progress):
+    tmp, part = f'{path}.tmp', f'{path}.part'
+    try:
+        _copy(database, tmp, progress)
+        _verify(tmp)
+        with open(tmp, 'rb') as source, open(part, 'wb') as raw:
+            with gzip.GzipFile(filename=os.path.basename(path)[:-3], mode='wb', fileobj=raw) as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(part, path)
+    finally:
+        for leftover in (tmp, part):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def _copy(database: str, tmp: str, progress):
+    """Seitenweise Kopie über die Backup-API, mit Pause zwischen den Schritten"""
+    source = sqlite3.connect(database)
+    storage.apply_pragmas(source, readonly=True)  # busy_timeout, query_only
+    target = sqlite3.connect(tmp)
+    state = {'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        # Mehr verbleibende Seiten als zuletzt: ein Schreiber hat die Kopie neu gestartet
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > MAX_RESTARTS:
+                raise _Restarted()
+        state['remaining'] = remaining
+        if progress:
+            progress(total - remaining, total)
+        if remaining:
+            time.sleep(STEP_SLEEP_MS / 1000)
+
+    try:
+        try:
+            source.backup(target, pages=PAGES_PER_STEP, progress=step)
+        except _Restarted:
+            logger.info("Backup: Datenbank ändert sich laufend, Rest in einem Schritt")
+            source.backup(target)
+        # Kopie als eigenständige Datei (ohne -wal) nutzbar machen
+        target.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target.close()
+        source.close()
+
+
+def _verify(tmp: str):
+    conn = sqlite3.connect(f'file:{tmp}?mode=ro', uri=True)
+    try:
+        result = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    finally:
+        conn.close()
+    if result != ['ok']:
+        raise BackupError(f"integrity_check fehlgeschlagen: {'; '.join(result[:5])}")
+
+
+# --- PostgreSQL ----------------------------------------------------------
+
+def _pg_dump(url, path: str):
+    # Passwort per Umgebung, nicht in der Prozessliste
+    env = dict(os.environ, PGPASSWORD=url.password or '')
+    dsn = url.set(drivername='postgresql', password=None).render_as_string(hide_password=False)
+    part = f'{path}.part'
+    try:
+        result = subprocess.run(
+            ['pg_dump', '--format=custom', '--no-owner', f'--file={part}', f'--dbname={dsn}'],
+            env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise BackupError(f"pg_dump fehlgeschlagen: {result.stderr.strip()}")
+        result = subprocess.run(['pg_restore', '--list', part], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise BackupError(f"Dump nicht lesbar: {result.stderr.strip()}")
+        os.replace(part, path)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
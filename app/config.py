@@ -7,6 +7,8 @@ from dataclasses import dataclass
 from typing import Optional
 from dotenv import load_dotenv
 
+from .storage import engine_options, readonly_binds
+
 # Lade .env Datei
 load_dotenv()
 
@@ -18,6 +20,7 @@ class Config:
     # Core Settings
     SECRET_KEY: str
     DATABASE_URI: str = 'sqlite:///foodbot.db'
+    DATABASE_REPLICA_URI: Optional[str] = None  # PostgreSQL-Replica für Auswertungen
     
     # Session
     SESSION_LIFETIME_HOURS: int = 1
@@ -40,6 +43,7 @@ class Config:
     DB_POOL_SIZE: int = 10
     DB_POOL_RECYCLE: int = 3600
     DB_MAX_OVERFLOW: int = 5
+    DB_READ_POOL_SIZE: int = 5  # Read-Engine der Auswertungen, 0 = aus
     
     @classmethod
     def from_env(cls) -> 'Config':
@@ -93,12 +97,14 @@ class Config:
         
         # Optional: Database URI
         db_uri = os.getenv('DATABASE_URI', cls.DATABASE_URI)
+        db_replica_uri = os.getenv('DATABASE_REPLICA_URI') or None
         
         # Optional: Integer-Werte mit Defaults
         session_hours = int(os.getenv('SESSION_LIFETIME_HOURS', cls.SESSION_LIFETIME_HOURS))
         db_pool_size = int(os.getenv('DB_POOL_SIZE', cls.DB_POOL_SIZE))
         db_pool_recycle = int(os.getenv('DB_POOL_RECYCLE', cls.DB_POOL_RECYCLE))
         db_max_overflow = int(os.getenv('DB_MAX_OVERFLOW', cls.DB_MAX_OVERFLOW))
+        db_read_pool_size = int(os.getenv('DB_READ_POOL_SIZE', cls.DB_READ_POOL_SIZE))
         
         # Cookie Secure-Flag: Standardmäßig True (Cloudflare Tunnel = HTTPS)
         # Nur mit HTTPS_ENABLED=false explizit deaktivieren (z.B. lokale Entwicklung)
@@ -107,11 +113,13 @@ class Config:
         return cls(
             SECRET_KEY=secret,
             DATABASE_URI=db_uri,
+            DATABASE_REPLICA_URI=db_replica_uri,
             SESSION_LIFETIME_HOURS=session_hours,
             SESSION_COOKIE_SECURE=https_enabled,
             DB_POOL_SIZE=db_pool_size,
             DB_POOL_RECYCLE=db_pool_recycle,
-            DB_MAX_OVERFLOW=db_max_overflow
+            DB_MAX_OVERFLOW=db_max_overflow,
+            DB_READ_POOL_SIZE=db_read_pool_size
         )
     
     def to_flask_config(self) -> dict:
@@ -125,13 +133,15 @@ class Config:
             'SECRET_KEY': self.SECRET_KEY,
             'SQLALCHEMY_DATABASE_URI': self.DATABASE_URI,
             'SQLALCHEMY_TRACK_MODIFICATIONS': False,
-            'SQLALCHEMY_ENGINE_OPTIONS': {
-                'pool_size': self.DB_POOL_SIZE,
-                'pool_recycle': self.DB_POOL_RECYCLE,
-                'pool_pre_ping': True,
-                'max_overflow': self.DB_MAX_OVERFLOW,
-                'pool_timeout': 30
-            },
+            # SQLite bekommt eigenen Pool + PRAGMAs (storage.py)
+            'SQLALCHEMY_ENGINE_OPTIONS': engine_options(
+                self.DATABASE_URI, self.DB_POOL_SIZE, self.DB_MAX_OVERFLOW, self.DB_POOL_RECYCLE
+            ),
+            # Eigene Read-Engine für Statistik/Historie/Export (readonly.py)
+            'SQLALCHEMY_BINDS': readonly_binds(
+                self.DATABASE_URI, self.DATABASE_REPLICA_URI, self.DB_READ_POOL_SIZE,
+                self.DB_MAX_OVERFLOW, self.DB_POOL_RECYCLE
+            ),
             'PERMANENT_SESSION_LIFETIME': self.SESSION_LIFETIME_HOURS * 3600,
             'SESSION_COOKIE_SECURE': self.SESSION_COOKIE_SECURE,
             'SESSION_COOKIE_HTTPONLY': self.SESSION_COOKIE_HTTPONLY,
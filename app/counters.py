@@ -0,0 +1,217 @@
+"""
+Materialisierte Tageszähler (`DailyCounts`).
+
+Die Registrierungs-Engine und die Gäste-Verwaltung aktualisieren die Zeile
+des Tages im selben Commit wie die eigentliche Änderung. Endpunkte, die nur
+Zahlen brauchen, lesen damit eine Zeile statt aller Anmeldungen des Tages.
+`version` steigt mit jeder Änderung (auch am Menü) und dient als
+Datenversion des Tages, z.B. für ETags. Jede Erhöhung schreibt zusätzlich
+einen Eintrag ins Änderungsprotokoll (`ChangeLog`, seq = neue Version), aus
+dem die Küche Deltas statt kompletter Listen abholt.
+"""
+import logging
+from datetime import date as date_type
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, event, func, select
+
+from .dialect import insert
+from .models import db, ChangeLog, DailyCounts, Menu, Guest
+
+logger = logging.getLogger(__name__)
+
+
+class DayCounts(NamedTuple):
+    date: date_type
+    menu1: int
+    menu2: int
+    guests_menu1: int
+    guests_menu2: int
+    version: int
+
+    @property
+    def registrations(self) -> int:
+        return self.menu1 + self.menu2
+
+    @property
+    def guests(self) -> int:
+        return self.guests_menu1 + self.guests_menu2
+
+    @property
+    def total(self) -> int:
+        return self.registrations + self.guests
+
+
+def _upsert_stmt(day: date_type, insert_values: dict, update_values: dict):
+    return insert(DailyCounts).values(date=day, version=1, **insert_values).on_conflict_do_update(
+        index_elements=[DailyCounts.date],
+        set_={**update_values, 'version': DailyCounts.version + 1},
+    ).returning(DailyCounts.version)
+
+
+def _record(execute, day: date_type, insert_values: dict, update_values: dict, kind: str, **change):
+    """Zähler fortschreiben und die Änderung mit der neuen Version protokollieren"""
+    seq = execute(_upsert_stmt(day, insert_values, update_values)).scalar_one()
+    execute(ChangeLog.__table__.insert().values(date=day, seq=seq, kind=kind, **change))
+    # Protokoll enthält nur den laufenden Tag (und spätere)
+    execute(ChangeLog.__table__.delete().where(ChangeLog.date < date_type.today()))
+    return seq
+
+
+def apply_registration(day: date_type, menu_choice: int, delta: int, user_id: Optional[int] = None):
+    """
+    An-/Abmeldung in den Tageszählern verbuchen (ohne Commit).
+
+    Args:
+        day: Datum der Anmeldung
+        menu_choice: 1 oder 2
+        delta: +1 (angemeldet) oder -1 (abgemeldet)
+        user_id: Für das Änderungsprotokoll
+    """
+    column = 'menu2' if menu_choice == 2 else 'menu1'
+    _record(
+        db.session.execute, day,
+        {column: max(delta, 0)},
+        {column: getattr(DailyCounts, column) + delta},
+        'registered' if delta > 0 else 'unregistered',
+        user_id=user_id, menu_choice=menu_choice,
+    )
+
+
+def set_guests(day: date_type, menu_choice: int, count: int):
+    """Gästezahl eines Menüs in den Tageszählern setzen (ohne Commit)"""
+    column = 'guests_menu2' if menu_choice == 2 else 'guests_menu1'
+    _record(db.session.execute, day, {column: count}, {column: count},
+            'guests', menu_choice=menu_choice, value=count)
+
+
+def clear_registrations(day: date_type):
+    """Anmeldezähler eines Tages nullen, wenn alle Anmeldungen gelöscht werden (ohne Commit)"""
+    _record(db.session.execute, day, {}, {'menu1': 0, 'menu2': 0}, 'reset')
+
+
+def changes_since(day: date_type, since: int, current: int, limit: int) -> Optional[list]:
+    """
+    Protokollierte Änderungen eines Tages zwischen `since` und `current`.
+
+    Args:
+        day: Datum
+        since: Version, die der Client zuletzt gesehen hat
+        current: Aktuelle Version (day_version)
+        limit: Maximale Anzahl Änderungen
+
+    Returns:
+        Liste von ChangeLog-Zeilen oder None, wenn das Protokoll lückenhaft
+        ist (z.B. nach rebuild()) oder mehr als `limit` Änderungen anstehen
+        – dann braucht der Client einen vollständigen Stand.
+    """
+    if since > current:
+        return None
+    if current - since > limit:
+        return None
+    rows = db.session.execute(
+        select(ChangeLog)
+        .where(ChangeLog.date == day, ChangeLog.seq > since, ChangeLog.seq <= current)
+        .order_by(ChangeLog.seq)
+    ).scalars().all()
+    # Jede Version muss genau einen Eintrag haben, sonst fehlt etwas
+    if [row.seq for row in rows] != list(range(since + 1, current + 1)):
+        return None
+    return rows
+
+
+def get_counts(day: Optional[date_type] = None) -> DayCounts:
+    """Zähler eines Tages (eine Zeile; Nullen wenn es noch keine gibt)"""
+    day = day or date_type.today()
+    row = db.session.get(DailyCounts, day)
+    if row is None:
+        return DayCounts(day, 0, 0, 0, 0, 0)
+    return DayCounts(day, row.menu1, row.menu2, row.guests_menu1, row.guests_menu2, row.version)
+
+
+def day_version(day: Optional[date_type] = None) -> int:
+    """Datenversion eines Tages (0 wenn noch nichts geschrieben wurde)"""
+    day = day or date_type.today()
+    return db.session.execute(
+        select(DailyCounts.version).where(DailyCounts.date == day)
+    ).scalar() or 0
+
+
+def rebuild(start: Optional[date_type] = None, end: Optional[date_type] = None) -> int:
+    """
+    Tageszähler aus Anmeldungen (inkl. Archiv) und `Guest` neu berechnen (Reparatur).
+    Tage mit Menü bekommen immer eine Zeile (Grundlage der Statistik-Rollups).
+
+    Args:
+        start: Erstes Datum (inklusive), None = ohne Grenze
+        end: Letztes Datum (inklusive), None = ohne Grenze
+
+    Returns:
+        Anzahl neu geschriebener Tage
+    """
+    def _in_range(column):
+        conditions = []
+        if start:
+            conditions.append(column >= start)
+        if end:
+            conditions.append(column <= end)
+        return conditions
+
+    days = {}
+
+    def _day(d):
+        return days.setdefault(d, {'menu1': 0, 'menu2': 0, 'guests_menu1': 0, 'guests_menu2': 0})
+
+    # Hot- und Archiv-Tabelle, sonst würden archivierte Tage genullt
+    from .archive import all_registrations
+    regs = all_registrations()
+    reg_rows = db.session.execute(
+        select(regs.c.date, regs.c.menu_choice, func.count())
+        .where(*_in_range(regs.c.date))
+        .group_by(regs.c.date, regs.c.menu_choice)
+    ).all()
+    for day, menu_choice, count in reg_rows:
+        _day(day)['menu2' if menu_choice == 2 else 'menu1'] += count
+
+    guest_rows = db.session.execute(
+        select(Guest.date, Guest.menu_choice, Guest.count).where(*_in_range(Guest.date))
+    ).all()
+    for day, menu_choice, count in guest_rows:
+        _day(day)['guests_menu2' if menu_choice == 2 else 'guests_menu1'] += count or 0
+
+    for day in db.session.execute(select(Menu.date).where(*_in_range(Menu.date))).scalars():
+        _day(day)
+
+    try:
+        # Versionen fortschreiben statt zurücksetzen (ETags/Deltas bleiben gültig)
+        old_versions = dict(db.session.execute(
+            select(DailyCounts.date, DailyCounts.version).where(*_in_range(DailyCounts.date))
+        ).all())
+        db.session.execute(delete(DailyCounts).where(*_in_range(DailyCounts.date)))
+        for day in old_versions.keys() - days.keys():
+            days[day] = {'menu1': 0, 'menu2': 0, 'guests_menu1': 0, 'guests_menu2': 0}
+        if days:
+            db.session.execute(insert(DailyCounts), [
+                {'date': day, 'version': old_versions.get(day, 0) + 1, **values}
+                for day, values in days.items()
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Tageszähler neu berechnet: {len(days)} Tage")
+    return len(days)
+
+
+def rebuild_if_empty():
+    """Beim Start: Zähler initial befüllen (z.B. nach Update einer bestehenden Installation)"""
+    if db.session.execute(select(DailyCounts.date).limit(1)).first() is None:
+        rebuild()
+
+
+@event.listens_for(Menu, 'after_insert')
+@event.listens_for(Menu, 'after_update')
+@event.listens_for(Menu, 'after_delete')
+def _menu_changed(mapper, connection, target):
+    # Menüänderungen gehören zur Datenversion des Tages
+    _record(connection.execute, target.date, {}, {}, 'menu')
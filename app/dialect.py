@@ -0,0 +1,43 @@
+"""
+SQL, das sich zwischen SQLite und PostgreSQL unterscheidet.
+
+Beide Dialekte kennen `INSERT ... ON CONFLICT` mit derselben API
+(`on_conflict_do_update`/`on_conflict_do_nothing`, `excluded`), SQLAlchemy
+liefert aber je ein eigenes `insert()`. Module importieren es deshalb von
+hier statt aus `sqlalchemy.dialects.sqlite`; der Dialekt kommt von der
+übergebenen Connection bzw. der Engine der App.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import db
+
+
+def name(connection=None) -> str:
+    """Name des aktiven Dialekts ('sqlite', 'postgresql')"""
+    return (connection or db.engine).dialect.name
+
+
+def insert(table, connection=None):
+    """INSERT mit ON CONFLICT-Unterstützung für den aktiven Dialekt"""
+    if name(connection) == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def month(column):
+    """Datum als 'YYYY-MM' (für GROUP BY Monat)"""
+    if name() == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def lock(key: str, connection=None):
+    """
+    Sperre bis zum Ende der Transaktion, gilt über alle App-Nodes.
+
+    PostgreSQL: Advisory-Lock (wartet, bis ein anderer Node fertig ist).
+    SQLite: nichts zu tun, es gibt nur einen Host und einen Schreiber.
+    """
+    if name(connection) == 'postgresql':
+        (connection or db.session).execute(select(func.pg_advisory_xact_lock(func.hashtext(key))))
@@ -0,0 +1,34 @@
+"""
+Conditional GET für Polling-Endpunkte.
+
+Küche und Touch-Display fragen alle paar Sekunden nach, die Daten ändern
+sich aber nur wenige Dutzend Mal am Tag. Der ETag wird aus Versionsstempeln
+gebildet (Datenversion des Tages, siehe counters.py, bzw. versions.py).
+Passt `If-None-Match`, wird 304 geantwortet, ohne die Daten zu laden.
+"""
+from typing import Callable
+
+from flask import Response, jsonify, request
+
+
+def make_etag(*parts) -> str:
+    """Starker ETag aus Versionsbestandteilen, z.B. ('kitchen', date, 12)"""
+    return '-'.join(str(part) for part in parts)
+
+
+def conditional_json(etag: str, build: Callable[[], dict]) -> Response:
+    """
+    JSON-Antwort mit ETag; 304 wenn der Client den Stand schon hat.
+
+    Args:
+        etag: Aktueller ETag (ohne Anführungszeichen)
+        build: Liefert die Nutzdaten, wird nur bei Änderung aufgerufen
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Immer revalidieren, nie ungeprüft aus dem Browser-Cache
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,204 @@
+"""
+Server-Sent-Events-Hub (`/events`) für Küche, Touch-Display und Admin.
+
+Clients abonnieren Themen (`kitchen`, `menu`, `scan`, `admin`) und
+bekommen eine Nachricht, sobald sich die zugehörige Version ändert; die
+Daten selbst holen sie über die bestehenden Endpunkte (ETag/Delta).
+
+Prozessübergreifend: Jeder Gunicorn-Worker hat genau einen Hub-Thread. Er
+hält eine eigene SQLite-Verbindung und prüft `PRAGMA data_version`, das
+sich ändert, sobald irgendein anderer Prozess/Connection committet. Nur
+dann werden die Versionsstempel gelesen und wartende Streams geweckt. Die
+Datenbanklast hängt damit nicht mehr von der Zahl offener Displays ab.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from flask import Blueprint, Response, current_app, jsonify, request, session, stream_with_context
+from sqlalchemy import func, select
+
+from .api import limiter
+from .models import db, DailyCounts, DataVersion, RFIDScan
+from .today import MENU_VERSION_KEY
+from .user_index import VERSION_KEY as USERS_VERSION_KEY
+from .validation import validate_integer
+
+logger = logging.getLogger(__name__)
+
+events_bp = Blueprint('events', __name__)
+
+TOPICS = ('kitchen', 'menu', 'scan', 'admin')
+
+SSE_STREAM_DURATION = 55  # Sekunden, danach verbindet der Browser neu (Resume per Last-Event-ID)
+SSE_HEARTBEAT_INTERVAL = 15  # Sekunden, hält Proxies/Tunnel offen
+SSE_RETRY_MS = 1000  # Reconnect-Verzögerung für EventSource
+HUB_POLL_INTERVAL = 0.1  # Sekunden zwischen zwei `PRAGMA data_version`-Prüfungen
+
+
+def sse_message(data, event=None, event_id=None):
+    """Formatiert eine SSE-Nachricht"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def _read_versions(conn) -> Dict[str, object]:
+    """Aktuelle Version je Thema (wenige kleine Queries auf der Hub-Verbindung)"""
+    today = date.today()
+    stamps = dict(conn.execute(select(DataVersion.key, DataVersion.version)).all())
+    day_version = conn.execute(
+        select(DailyCounts.version).where(DailyCounts.date == today)
+    ).scalar() or 0
+    last_scan = conn.execute(select(func.max(RFIDScan.id))).scalar() or 0
+    # Gleiches Format wie der `version`-Cursor von /kitchen/data
+    kitchen = f'{today.isoformat()}.{day_version}.{stamps.get(USERS_VERSION_KEY, 0)}'
+    return {
+        'kitchen': kitchen,
+        'menu': f'{today.isoformat()}.{stamps.get(MENU_VERSION_KEY, 0)}',
+        'scan': last_scan,
+        'admin': kitchen,
+    }
+
+
+class EventHub:
+    """Ein Beobachter-Thread pro Prozess, beliebig viele wartende Streams"""
+
+    def __init__(self, poll_interval: float = HUB_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._versions: Dict[str, object] = {}
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self, app):
+        """Startet den Hub-Thread (idempotent, erst im Worker nach dem Fork)"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(app,), name='event-hub', daemon=True)
+            self._thread.start()
+
+    def _publish(self, versions: Dict[str, object]):
+        with self._cond:
+            if versions != self._versions:
+                self._versions = versions
+                self._cond.notify_all()
+
+    def _run(self, app):
+        with app.app_context():
+            engine = db.engine
+        # Nur SQLite kennt data_version; sonst jedes Intervall die Stempel lesen
+        watch = engine.dialect.name == 'sqlite'
+        conn = None
+        last_data_version = None
+        last_day = None
+        while True:
+            try:
+                if conn is None:
+                    conn = engine.connect()
+                    last_data_version = None
+                changed = True
+                if watch:
+                    data_version = conn.exec_driver_sql('PRAGMA data_version').scalar()
+                    changed = data_version != last_data_version or date.today() != last_day
+                    last_data_version = data_version
+                if changed:
+                    last_day = date.today()
+                    self._publish(_read_versions(conn))
+                # Keine offene Lese-Transaktion zwischen den Prüfungen halten
+                conn.rollback()
+            except Exception as e:
+                logger.error(f"Event-Hub: Prüfung fehlgeschlagen: {e}")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                time.sleep(1.0)
+            time.sleep(self.poll_interval)
+
+    def wait(self, seen: Dict[str, object], timeout: float) -> Optional[Dict[str, object]]:
+        """
+        Blockiert bis sich eine der Versionen in `seen` ändert.
+
+        Returns:
+            Aktuelle Versionen oder None nach Timeout
+        """
+        def _changed():
+            return self._versions and any(self._versions.get(t) != v for t, v in seen.items())
+
+        with self._cond:
+            if self._cond.wait_for(_changed, timeout):
+                return dict(self._versions)
+        return None
+
+
+hub = EventHub()
+
+
+def event_stream(topics: Iterable[str], last_scan_id: Optional[int] = None) -> Response:
+    """
+    SSE-Response für die Themen `topics`.
+
+    Themen außer `scan` senden nur die neue Version. `scan` holt den Scan
+    atomar aus der Warteschlange (at-most-once) und setzt die Event-ID für
+    das Resume per Last-Event-ID.
+    """
+    from .scan_queue import claim_next
+
+    topics = list(topics)
+    hub.ensure_started(current_app._get_current_object())
+
+    def generate():
+        nonlocal last_scan_id
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        seen = {topic: None for topic in topics}
+        started = time.monotonic()
+        while True:
+            remaining = SSE_STREAM_DURATION - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            current = hub.wait(seen, min(SSE_HEARTBEAT_INTERVAL, remaining))
+            if current is None:
+                yield ": heartbeat\n\n"
+                continue
+            for topic in topics:
+                version = current.get(topic)
+                if version == seen[topic]:
+                    continue
+                seen[topic] = version
+                if topic == 'scan':
+                    while True:
+                        scan = claim_next(last_scan_id)
+                        if not scan:
+                            break
+                        last_scan_id = scan.id
+                        yield sse_message({'card_id': scan.card_id}, event='scan', event_id=scan.id)
+                else:
+                    yield sse_message({'version': version}, event=topic)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: nicht puffern
+    return response
+
+
+@events_bp.route('/events')
+@limiter.limit("30 per minute")
+def events():
+    """Abonnement per ?topics=kitchen,menu (Komma-getrennt)"""
+    topics = [t for t in request.args.get('topics', '').split(',') if t in TOPICS]
+    if not topics:
+        return jsonify({'error': f"topics erforderlich ({', '.join(TOPICS)})"}), 400
+    if 'admin' in topics and not session.get('admin_logged_in'):
+        return jsonify({'error': 'Nicht autorisiert'}), 403
+    last_scan_id = validate_integer(
+        request.headers.get('Last-Event-ID') or request.args.get('last_id'), min_value=0
+    )
+    return event_stream(topics, last_scan_id)
@@ -6,7 +6,12 @@ import os
 # Server
 bind = "0.0.0.0:5001"
 workers = 2
-worker_class = "sync"
+# gthread: offene Event-Streams (/events) belegen nur einen Thread, nicht den
+# ganzen Worker. Ein idle Stream wartet nur auf den Event-Hub (kein CPU, keine
+# DB), daher viele Threads pro Worker. `timeout` ist bei gthread der
+# Worker-Heartbeat, nicht die Request-Dauer – lange Streams sind unkritisch.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
 timeout = 30
 keepalive = 2
 
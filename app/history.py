@@ -1,91 +1,115 @@
 """
 Essenshistorie - Pro-User-Statistiken
 """
-from flask import Blueprint, render_template
-from .models import db, User, Registration
+import logging
+from flask import Blueprint, abort, render_template
+from .models import db, User, UserAttendance
+from . import dialect
+from .archive import all_registrations
+from .attendance import current_as_of
 from .auth import login_required
+from .readonly import route_reads
+from .pagination import keyset, request_args
+from .user_index import user_index
 from datetime import date, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, select
+
+logger = logging.getLogger(__name__)
 
 history_bp = Blueprint('history', __name__, url_prefix='/history')
+route_reads(history_bp)  # Auswertungen nicht über den Pool der Anmeldungen
 
 @history_bp.route('/')
 @login_required
 def index():
-    """Essenshistorie aller User"""
-    today = date.today()
-    start_90 = today - timedelta(days=90)
-    start_30 = today - timedelta(days=30)
-    start_7 = today - timedelta(days=7)
-    
-    # Aggregierte Query statt N+1 (eine Query statt 4 pro User)
-    from sqlalchemy import case
-    
-    stats_query = db.session.query(
-        User.id,
-        User.name,
-        User.personal_number,
-        func.count(case((Registration.date >= start_90, 1))).label('count_90'),
-        func.count(case((Registration.date >= start_30, 1))).label('count_30'),
-        func.count(case((Registration.date >= start_7, 1))).label('count_7'),
-        func.max(Registration.date).label('last_date')
-    ).outerjoin(
-        Registration, 
-        (User.id == Registration.user_id) & (Registration.date >= start_90)
-    ).group_by(User.id, User.name, User.personal_number)\
-     .order_by(User.name).all()
+    """Essenshistorie aller User (seitenweise nach Name, ?after=<cursor>&limit=)"""
+    order_by = [User.name, User.id]
+    try:
+        after, limit = request_args(order_by)
+    except ValueError:
+        abort(400)
+    # Zähler pro User (attendance.py) statt Aggregat über alle Anmeldungen.
+    # Den Stichtag rückt nur der nächtliche Lauf vor (rotate_registrations.py),
+    # die Seite schreibt nicht; fehlt der Lauf, wird der Stand angezeigt
+    as_of = current_as_of()
+    counts_stale = as_of is not None and as_of < date.today()
+    if counts_stale:
+        logger.warning(f"Anmeldezähler auf Stand {as_of}: nächtliche Rotation ist nicht gelaufen")
     
-    user_stats = []
-    for row in stats_query:
-        user_stats.append({
-            'user': type('User', (), {'id': row.id, 'name': row.name, 'personal_number': row.personal_number})(),
-            'count_90': row.count_90,
-            'count_30': row.count_30,
-            'count_7': row.count_7,
-            'last_date': row.last_date
-        })
+    counts = [
+        func.coalesce(UserAttendance.count_90, 0).label('count_90'),
+        func.coalesce(UserAttendance.count_30, 0).label('count_30'),
+        func.coalesce(UserAttendance.count_7, 0).label('count_7'),
+        UserAttendance.last_date,
+    ]
+    page = keyset(
+        select(User.id, User.name, User.personal_number, *counts)
+        .outerjoin(UserAttendance, UserAttendance.user_id == User.id),
+        order_by=order_by,
+        after=after,
+        limit=limit,
+    )
     
-    # Top 10 Esser (90 Tage)
-    top_users = sorted(user_stats, key=lambda x: x['count_90'], reverse=True)[:10]
+    # Top 10 Esser (90 Tage) über den Index auf count_90
+    top_users = db.session.execute(
+        select(User.id, User.name, User.personal_number, *counts)
+        .join(User, User.id == UserAttendance.user_id)
+        .where(UserAttendance.count_90 > 0)
+        .order_by(UserAttendance.count_90.desc(), UserAttendance.user_id.desc())
+        .limit(10)
+    ).all()
     
     return render_template('history.html', 
-                         user_stats=user_stats, 
+                         user_stats=page.items, 
                          top_users=top_users,
-                         total_users=len(user_stats))
+                         next_cursor=page.next_cursor,
+                         first_page=after is None,
+                         limit=limit,
+                         total_users=len(user_index),
+                         counts_as_of=as_of,
+                         counts_stale=counts_stale)
 
 @history_bp.route('/user/<int:user_id>')
 @login_required
 def user_detail(user_id):
-    """Detail-Ansicht für einen User mit Pagination"""
-    from flask import request
+    """Detail-Ansicht für einen User (seitenweise, ?after=<cursor>&limit=)"""
     user = db.session.get(User, user_id)
     if not user:
-        from flask import abort
         abort(404)
     
-    # Pagination-Parameter
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
-    per_page = min(per_page, 100)  # Max 100 Einträge pro Seite
-    
-    # Alle Anmeldungen des Users (letzte 180 Tage) mit Pagination
+    # Anmeldungen der letzten 180 Tage (Hot + Archiv); user_id fest, Datum
+    # als Schlüssel: beide Tabellen haben einen Index auf (user_id, date)
     start_date = date.today() - timedelta(days=180)
-    pagination = Registration.query.filter(
-        Registration.user_id == user_id,
-        Registration.date >= start_date
-    ).order_by(Registration.date.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    regs = all_registrations()
+    try:
+        after, limit = request_args([regs.c.date])
+    except ValueError:
+        abort(400)
+    in_range = (regs.c.user_id == user_id, regs.c.date >= start_date)
+    page = keyset(
+        select(regs.c.date, regs.c.menu_choice).where(*in_range),
+        order_by=[regs.c.date],
+        after=after,
+        limit=limit,
+        descending=True,
     )
     
-    # Gruppiere nach Monat (nur angezeigte Registrierungen)
-    from collections import defaultdict
-    by_month = defaultdict(int)
-    for reg in pagination.items:
-        month_key = reg.date.strftime('%Y-%m')
-        by_month[month_key] += 1
+    # Monatssummen über den ganzen Zeitraum, nicht nur die angezeigte Seite
+    month = dialect.month(regs.c.date)
+    by_month = db.session.execute(
+        select(month, func.count()).where(*in_range)
+        .group_by(month).order_by(month.desc())
+    ).all()
+    total = sum(count for _, count in by_month)
+    # Letzte Anmeldung aus den Zählern pro User (liegt im Zeitraum, sobald es dort Anmeldungen gibt)
+    attendance = db.session.get(UserAttendance, user_id) if total else None
     
     return render_template('history_detail.html',
                          user=user,
-                         registrations=pagination.items,
-                         pagination=pagination,
-                         by_month=dict(sorted(by_month.items(), reverse=True)))
+                         registrations=page.items,
+                         next_cursor=page.next_cursor,
+                         first_page=after is None,
+                         limit=limit,
+                         total=total,
+                         last_date=attendance.last_date if attendance else None,
+                         by_month=by_month)
@@ -0,0 +1,336 @@
+"""
+Hintergrund-Jobs für lange Admin-Aktionen (CSV-Import, Vollsync, Backup).
+
+Der Request legt nur einen Eintrag in der Tabelle `job` an und antwortet
+sofort mit der Job-ID; ein Runner-Thread im Leader-Prozess (leader.py)
+holt wartende Jobs per atomarem UPDATE ... RETURNING ab und führt sie aus.
+Fortschritt, Ergebnis und Fehler stehen in der Datenbank und sind damit
+über `/system/jobs/<id>` von jedem Worker aus abrufbar – auch nach einem
+Neuladen der Seite. Gunicorn-Timeouts betreffen die Jobs nicht mehr.
+
+Ein Handler bekommt einen `JobContext` und die Parameter des Jobs; über
+`ctx.progress()` meldet er den Fortschritt und bricht mit `JobCancelled`
+ab, sobald der Job abgebrochen wurde.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, or_, select, update
+
+from .models import db, Job
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '1'))  # Runner-Threads im Leader
+NODE = os.getenv('NODE_NAME') or socket.gethostname()  # Mehrere App-Nodes: je ein Runner
+POLL_INTERVAL = 1.0  # Sekunden zwischen zwei Blicken in die Warteschlange
+PROGRESS_INTERVAL = 0.5  # Fortschritt höchstens so oft schreiben (Sekunden)
+RETENTION = timedelta(days=30)  # Abgeschlossene Jobs so lange aufheben
+
+ACTIVE = ('queued', 'running')
+
+# Job-Typ → Handler(ctx, params) → Ergebnis (JSON-serialisierbar)
+_handlers: Dict[str, Callable[['JobContext', dict], Optional[dict]]] = {}
+
+# Weckt den Runner nach enqueue() im selben Prozess sofort
+_wakeup = threading.Event()
+
+
+class JobCancelled(Exception):
+    """Job wurde über die Oberfläche abgebrochen"""
+
+
+def handler(kind: str):
+    """Decorator: Handler für den Job-Typ `kind` registrieren"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+class JobContext:
+    """Wird dem Handler übergeben: Fortschritt melden, Abbruch erkennen"""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None):
+        """
+        Fortschritt speichern (committet die Session des Handlers mit).
+
+        Raises:
+            JobCancelled: Abbruch wurde angefordert
+        """
+        now = datetime.now().timestamp()
+        if total is not None and done < total and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        values = {'progress_done': done}
+        if total is not None:
+            values['progress_total'] = total
+        if message is not None:
+            values['message'] = message[:200]
+        try:
+            cancel = db.session.execute(
+                update(Job).where(Job.id == self.job_id).values(values).returning(Job.cancel_requested)
+            ).scalar()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if cancel:
+            raise JobCancelled()
+
+
+def enqueue(kind: str, params: Optional[dict] = None, created_by: Optional[str] = None,
+            local: bool = False) -> int:
+    """
+    Job anlegen und den Runner wecken.
+
+    Args:
+        local: Nur auf diesem Host ausführen (Job braucht lokale Dateien)
+
+    Returns:
+        ID des Jobs (für `/system/jobs/<id>`)
+
+    Raises:
+        ValueError: Unbekannter Job-Typ
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unbekannter Job-Typ: {kind}")
+    job = Job(kind=kind, params=json.dumps(params or {}), created_by=created_by,
+              node=NODE if local else None)
+    try:
+        # Alte abgeschlossene Jobs bei der Gelegenheit aufräumen
+        db.session.execute(
+            delete(Job).where(Job.status.not_in(ACTIVE), Job.finished_at < datetime.now() - RETENTION)
+        )
+        db.session.add(job)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    _wakeup.set()
+    logger.info(f"Job {job.id} ({kind}) eingereiht")
+    return job.id
+
+
+def get(job_id: int) -> Optional[Job]:
+    return db.session.get(Job, job_id)
+
+
+def cancel(job_id: int) -> bool:
+    """
+    Job abbrechen: wartende sofort, laufende beim nächsten `progress()`.
+
+    Returns:
+        False wenn der Job nicht existiert oder schon beendet ist
+    """
+    try:
+        cancelled = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'queued')
+            .values(status='cancelled', finished_at=datetime.now(), message='Abgebrochen')
+        ).rowcount
+        if not cancelled:
+            cancelled = db.session.execute(
+                update(Job).where(Job.id == job_id, Job.status == 'running').values(cancel_requested=True)
+            ).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return bool(cancelled)
+
+
+def as_dict(job: Job) -> dict:
+    """Job für die JSON-API"""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': {'done': job.progress_done, 'total': job.progress_total},
+        'message': job.message,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'cancel_requested': job.cancel_requested,
+        'created_by': job.created_by,
+        'node': job.node,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def _claim():
+    """Ältesten wartenden Job dieses Hosts atomar übernehmen (wie scan_queue.claim)"""
+    oldest = (
+        select(Job.id)
+        .where(Job.status == 'queued', or_(Job.node.is_(None), Job.node == NODE))
+        .order_by(Job.id).limit(1)
+        .with_for_update(skip_locked=True)  # PostgreSQL: Runner anderer Nodes überspringen; SQLite ignoriert es
+        .scalar_subquery()
+    )
+    try:
+        row = db.session.execute(
+            update(Job).where(Job.id == oldest, Job.status == 'queued')
+            .values(status='running', started_at=datetime.now(), node=NODE)
+            .returning(Job.id, Job.kind, Job.params)
+        ).first()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return row
+
+
+def _finish(job_id: int, status: str, result: Optional[dict] = None,
+            error: Optional[str] = None, message: Optional[str] = None):
+    values = {'status': status, 'finished_at': datetime.now()}
+    if result is not None:
+        values['result'] = json.dumps(result, ensure_ascii=False)
+    if error is not None:
+        values['error'] = error
+    if message is not None:
+        values['message'] = message[:200]
+    try:
+        db.session.execute(update(Job).where(Job.id == job_id).values(values))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def run(job_id: int, kind: str, params: dict):
+    """Einen übernommenen Job ausführen und sein Ergebnis speichern"""
+    ctx = JobContext(job_id)
+    try:
+        result = _handlers[kind](ctx, params)
+    except JobCancelled:
+        db.session.rollback()
+        _finish(job_id, 'cancelled', message='Abgebrochen')
+        logger.info(f"Job {job_id} ({kind}) abgebrochen")
+        return
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"Job {job_id} ({kind}) fehlgeschlagen")
+        _finish(job_id, 'failed', error=str(e) or type(e).__name__, message='Fehlgeschlagen')
+        return
+    _finish(job_id, 'done', result=result, message='Fertig')
+    logger.info(f"Job {job_id} ({kind}) fertig")
+
+
+def _recover():
+    """Beim Leader-Start: Jobs eines abgestürzten Runners dieses Hosts als fehlgeschlagen markieren"""
+    try:
+        stale = db.session.execute(
+            update(Job).where(Job.status == 'running', Job.node == NODE)
+            .values(status='failed', finished_at=datetime.now(),
+                    error='Abgebrochen durch Neustart', message='Fehlgeschlagen')
+        ).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if stale:
+        logger.warning(f"{stale} unterbrochene Job(s) als fehlgeschlagen markiert")
+
+
+def _run_worker(app):
+    """Endlosschleife eines Runner-Threads"""
+    while True:
+        claimed = None
+        with app.app_context():
+            try:
+                claimed = _claim()
+                if claimed:
+                    run(claimed.id, claimed.kind, json.loads(claimed.params or '{}'))
+            except Exception as e:
+                logger.error(f"Job-Runner: {e}")
+            finally:
+                db.session.remove()
+        if not claimed:
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+
+
+def _run_runner(app):
+    with app.app_context():
+        try:
+            _recover()
+        finally:
+            db.session.remove()
+    for i in range(JOB_WORKERS - 1):
+        threading.Thread(target=_run_worker, args=(app,), daemon=True, name=f'job-worker-{i + 1}').start()
+    _run_worker(app)
+
+
+def start_runner(app):
+    """Startet den Job-Runner (ein Leader pro Host, blockiert den Start nicht)"""
+    from .leader import run_when_leader
+    run_when_leader('jobs', lambda: _run_runner(app))
+
+
+# --- Handler -------------------------------------------------------------
+
+def upload_path(app, suffix: str = '') -> str:
+    """Neuer Pfad im Upload-Verzeichnis (Datei für einen Job ablegen)"""
+    import uuid
+    directory = os.path.join(app.instance_path, 'uploads')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{uuid.uuid4().hex}{suffix}')
+
+
+@handler('user_import')
+def _user_import(ctx: JobContext, params: dict) -> dict:
+    """CSV-Import aus der hochgeladenen Datei (wird danach gelöscht)"""
+    from dataclasses import asdict
+    from .user_import import import_csv
+
+    path = params['path']
+    try:
+        with open(path, 'rb') as f:
+            total = max(sum(1 for _ in f) - 1, 0)  # Ohne Kopfzeile
+            f.seek(0)
+            ctx.progress(0, total, 'Import läuft')
+            report = import_csv(f, dry_run=params.get('dry_run', False),
+                                progress=lambda rows: ctx.progress(rows, total, f'{rows} von {total} Zeilen'))
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return {
+        'summary': str(report),
+        'imported': report.imported,
+        'skipped': report.skipped,
+        'dry_run': report.dry_run,
+        'errors': [asdict(e) for e in report.errors],
+    }
+
+
+@handler('sync')
+def _sync(ctx: JobContext, params: dict) -> dict:
+    """Kameraden-Sync (default: voll, wie der Button im Admin)"""
+    from .sync import sync_kameraden
+
+    ctx.progress(0, None, 'Sync läuft')
+    stats = sync_kameraden(full=params.get('full', True))
+    return {'summary': str(stats), 'mode': stats.mode, 'fetched': stats.fetched,
+            'created': stats.created, 'updated': stats.updated}
+
+
+@handler('backup')
+def _backup(ctx: JobContext, params: dict) -> dict:
+    """Datenbank-Backup"""
+    from .system import backup_database
+
+    ctx.progress(0, None, 'Backup läuft')
+    backup = backup_database(progress=lambda done, total: ctx.progress(done, total, f'{done} von {total} Seiten'))
+    return {'summary': f'Backup erstellt: {backup}', 'path': backup.path, 'size': backup.size,
+            'removed': len(backup.removed)}
@@ -0,0 +1,107 @@
+"""
+Leader-Wahl über Datei-Locks.
+
+Unter Gunicorn laufen mehrere Worker-Prozesse. Aufgaben, die genau einmal
+pro Host laufen dürfen (RFID-Port, Hintergrund-Jobs), holen sich vorher
+einen exklusiven flock. Stirbt der Leader, gibt das Betriebssystem den Lock
+frei und ein anderer Worker übernimmt beim nächsten Versuch.
+"""
+import fcntl
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+LOCK_DIR = os.getenv('FOODBOT_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'foodbot'))
+
+# Gehaltene Locks dieses Prozesses: name → File-Descriptor
+_held: Dict[str, int] = {}
+_held_lock = threading.Lock()
+
+
+def _lock_path(name: str) -> str:
+    return os.path.join(LOCK_DIR, f'{name}.lock')
+
+
+def try_acquire(name: str) -> bool:
+    """
+    Versucht den Leader-Lock `name` nicht-blockierend zu holen.
+
+    Returns:
+        True wenn dieser Prozess (jetzt oder bereits) Leader ist
+    """
+    with _held_lock:
+        if name in _held:
+            return True
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        fd = os.open(_lock_path(name), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # PID zur Diagnose in die Lock-Datei schreiben
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        _held[name] = fd
+        return True
+
+
+def release(name: str):
+    """Gibt den Leader-Lock frei (falls gehalten)"""
+    with _held_lock:
+        fd = _held.pop(name, None)
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+@contextmanager
+def exclusive(name: str):
+    """
+    Blockierender Lock `name` für die Dauer des with-Blocks.
+
+    Für einmalige Aufgaben beim Start (Migrationen): die anderen Worker
+    warten, bis der erste fertig ist, statt parallel loszulaufen.
+    """
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    fd = os.open(_lock_path(name), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def is_leader(name: str) -> bool:
+    """True wenn dieser Prozess den Lock `name` hält"""
+    return name in _held
+
+
+def run_when_leader(name: str, target: Callable[[], None], retry_interval: float = 5.0) -> threading.Thread:
+    """
+    Startet einen Daemon-Thread, der Leader für `name` zu werden versucht
+    und danach einmalig `target()` ausführt.
+
+    Nicht-Leader versuchen es alle `retry_interval` Sekunden erneut, damit
+    ein Worker-Neustart (max_requests) die Aufgabe nicht verwaist zurücklässt.
+    """
+    def _loop():
+        stop = threading.Event()
+        while not try_acquire(name):
+            stop.wait(retry_interval)
+        logger.info(f"Leader für '{name}' (pid {os.getpid()})")
+        try:
+            target()
+        except Exception as e:
+            logger.error(f"Leader-Aufgabe '{name}' fehlgeschlagen: {e}")
+            release(name)
+
+    t = threading.Thread(target=_loop, name=f'leader-{name}', daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,200 @@
+"""
+Versionierte Schema-Migrationen.
+
+Bisher legte `db.create_all()` beim Start nur fehlende Tabellen an; neue
+Spalten und Indizes auf bestehenden Tabellen kamen über Einzelskripte
+(migrate_*.py), die man von Hand ausführen musste – wer eines vergaß, lief
+ohne die Indizes oder mit fehlender Spalte. Jetzt steht jede Änderung als
+nummerierte Migration hier, angewendete Versionen stehen in `schema_version`.
+
+Beim Start liest jeder Worker nur die höchste Version (ein Zugriff auf
+den Primärschlüssel). Fehlt etwas, holt er den Datei-Lock 'migrations' (auf
+PostgreSQL zusätzlich einen Advisory-Lock für andere Nodes), prüft erneut
+und wendet die fehlenden Migrationen an; die anderen Worker warten so lange.
+
+Migrationen müssen idempotent sein: sie laufen auch auf Datenbanken, die
+ein altes Skript schon migriert hat, und SQLite führt DDL nicht zuverlässig
+in der Transaktion aus. Neue Tabellen legt Migration 1 nur auf frischen
+Installationen an; spätere Änderungen brauchen eine eigene Migration
+(`Model.__table__.create(conn, checkfirst=True)`, `_add_column`, ...).
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List
+
+from sqlalchemy import inspect, insert, select, text, update
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from . import dialect
+from .models import db, Guest, SchemaVersion, User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    apply: Callable
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Decorator: Migration `version` registrieren (Versionen lückenlos aufsteigend)"""
+    def register(func):
+        assert version == len(MIGRATIONS) + 1, f"Migration {version} außer der Reihe"
+        MIGRATIONS.append(Migration(version, name, func))
+        return func
+    return register
+
+
+def _columns(conn, table: str) -> set:
+    return {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn, table: str, column: str, ddl: str):
+    """Spalte hinzufügen, falls sie fehlt (`ddl` = Typ und Default)"""
+    if column in _columns(conn, table):
+        return
+    quote = conn.dialect.identifier_preparer.quote
+    conn.execute(text(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} {ddl}'))
+    logger.info(f"Spalte {table}.{column} hinzugefügt")
+
+
+# --- Migrationen ---------------------------------------------------------
+
+@migration(1, 'initial_schema')
+def _initial_schema(conn):
+    """Fehlende Tabellen anlegen (frische Installation: komplettes Schema)"""
+    db.metadata.create_all(conn)
+
+
+@migration(2, 'menu_deadline')
+def _menu_deadline(conn):
+    """Anmeldefrist (ehem. scripts/migrations/migrate_deadline.py)"""
+    _add_column(conn, 'menu', 'registration_deadline', "VARCHAR(5) DEFAULT '19:45'")
+    _add_column(conn, 'menu', 'deadline_enabled', 'BOOLEAN DEFAULT TRUE')
+
+
+@migration(3, 'user_mobile_token')
+def _user_mobile_token(conn):
+    """Token für die mobile Anmeldung (ehem. migrate_mobile_tokens.py)"""
+    _add_column(conn, 'user', 'mobile_token', 'VARCHAR(64)')
+    ids = conn.execute(select(User.id).where(User.mobile_token.is_(None))).scalars().all()
+    for user_id in ids:
+        conn.execute(update(User).where(User.id == user_id).values(mobile_token=User.generate_token()))
+    if ids:
+        logger.info(f"{len(ids)} Mobile-Tokens erzeugt")
+
+
+@migration(4, 'two_menus')
+def _two_menus(conn):
+    """Zwei-Menü-System (ehem. migrate_two_menus.py)"""
+    _add_column(conn, 'menu', 'zwei_menues_aktiv', 'BOOLEAN DEFAULT FALSE')
+    _add_column(conn, 'menu', 'menu1_name', 'VARCHAR(200)')
+    _add_column(conn, 'menu', 'menu2_name', 'VARCHAR(200)')
+    _add_column(conn, 'registration', 'menu_choice', 'INTEGER DEFAULT 1')
+
+
+@migration(5, 'guest_menu_choice')
+def _guest_menu_choice(conn):
+    """
+    Gäste pro Menü (ehem. migrate_guests.py): Eindeutigkeit wechselt von
+    `date` auf (date, menu_choice), SQLite kann das nur per Neuanlage.
+    """
+    if 'menu_choice' in _columns(conn, 'guest'):
+        return
+    rows = conn.execute(select(Guest.id, Guest.date, Guest.count)).all()
+    Guest.__table__.drop(conn)
+    Guest.__table__.create(conn)
+    if rows:
+        conn.execute(insert(Guest), [
+            {'id': row.id, 'date': row.date, 'menu_choice': 1, 'count': row.count} for row in rows
+        ])
+    logger.info(f"Tabelle guest neu angelegt, {len(rows)} Einträge zu Menü 1")
+
+
+@migration(6, 'indexes')
+def _indexes(conn):
+    """
+    Alle im Model deklarierten Indizes anlegen (ehem. migrate_indices.py).
+    `create_all()` legt Indizes nur mit neuen Tabellen an; ältere
+    Installationen liefen deshalb z.B. ohne idx_guest_date_menu.
+    """
+    for table in db.metadata.sorted_tables:
+        existing = {i['name'] for i in inspect(conn).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+                logger.info(f"Index {index.name} angelegt")
+
+
+@migration(7, 'job_node')
+def _job_node(conn):
+    """Ausführender Host eines Jobs (mehrere App-Nodes)"""
+    _add_column(conn, 'job', 'node', 'VARCHAR(100)')
+
+
+@migration(8, 'sync_watermark_id')
+def _sync_watermark_id(conn):
+    """Watermark des Kameraden-Syncs als (updated_at, id); bis zum nächsten Vollabgleich leer"""
+    _add_column(conn, 'sync_state', 'watermark_id', 'VARCHAR(64)')
+
+
+LATEST = MIGRATIONS[-1].version
+
+
+# --- Runner --------------------------------------------------------------
+
+def current_version() -> int:
+    """Höchste angewendete Version, 0 ohne `schema_version` (alte Installation)"""
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(
+                select(SchemaVersion.version).order_by(SchemaVersion.version.desc()).limit(1)
+            ).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def status() -> List[dict]:
+    """Alle Migrationen mit Zeitpunkt der Anwendung (None = ausstehend)"""
+    applied = {}
+    if current_version():
+        with db.engine.connect() as conn:
+            applied = dict(conn.execute(select(SchemaVersion.version, SchemaVersion.applied_at)).all())
+    return [{'version': m.version, 'name': m.name, 'applied_at': applied.get(m.version)} for m in MIGRATIONS]
+
+
+def upgrade() -> List[int]:
+    """
+    Ausstehende Migrationen anwenden (im App-Kontext, beim Start).
+
+    Returns:
+        Versionen, die dieser Prozess angewendet hat
+    """
+    if current_version() >= LATEST:
+        return []
+    from .leader import exclusive
+
+    applied = []
+    with exclusive('migrations'):
+        with db.engine.begin() as conn:
+            dialect.lock('foodbot.migrations', connection=conn)
+            SchemaVersion.__table__.create(conn, checkfirst=True)
+        for m in MIGRATIONS:
+            with db.engine.begin() as conn:
+                dialect.lock('foodbot.migrations', connection=conn)
+                done = conn.execute(select(SchemaVersion.version).where(SchemaVersion.version == m.version)).first()
+                if done:
+                    continue
+                logger.info(f"Migration {m.version} ({m.name}) ...")
+                m.apply(conn)
+                conn.execute(insert(SchemaVersion).values(version=m.version, name=m.name, applied_at=datetime.now()))
+            applied.append(m.version)
+    if applied:
+        logger.info(f"Schema auf Version {LATEST} migriert ({len(applied)} Migration(en))")
+    return applied
@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import date
+from datetime import date, datetime
+from .readonly import RoutingSession
 
-db = SQLAlchemy()
+# Auswertungen lesen über eine eigene Engine (readonly.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -61,6 +63,17 @@ class Registration(db.Model):
         db.Index('idx_registration_date_user', 'date', 'user_id'),  # Composite Index
     )
 
+class RegistrationArchive(db.Model):
+    """Anmeldungen abgeschlossener Tage (kompakt, siehe archive.py); `Registration` hält nur heute und später"""
+    date = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    menu_choice = db.Column(db.SmallInteger, nullable=False, default=1)
+
+    __table_args__ = (
+        db.Index('idx_registration_archive_user_date', 'user_id', 'date'),  # Historie pro User
+        {'sqlite_with_rowid': False},
+    )
+
 class Guest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, default=date.today, index=True)
@@ -96,3 +109,110 @@ class PresetMenu(db.Model):
     @staticmethod
     def get_all_ordered():
         return PresetMenu.query.order_by(PresetMenu.sort_order, PresetMenu.name).all()
+
+class RFIDScan(db.Model):
+    """Prozessübergreifende Warteschlange für RFID-Scans (ein Leser pro Host)"""
+    id = db.Column(db.Integer, primary_key=True)
+    card_id = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False, index=True)
+    consumed = db.Column(db.Boolean, default=False, nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_rfid_scan_pending', 'consumed', 'id'),  # Nächsten offenen Scan finden
+        {'sqlite_autoincrement': True},  # IDs nie wiederverwenden (SSE-Resume per Last-Event-ID)
+    )
+
+class DataVersion(db.Model):
+    """Versionszähler für prozessübergreifende Cache-Invalidierung (ein Eintrag pro Cache)"""
+    key = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyCounts(db.Model):
+    """Materialisierte Tageszähler, im selben Commit wie jede Anmeldung/Gäste-Änderung gepflegt"""
+    date = db.Column(db.Date, primary_key=True)
+    menu1 = db.Column(db.Integer, nullable=False, default=0)  # Anmeldungen Menü 1
+    menu2 = db.Column(db.Integer, nullable=False, default=0)  # Anmeldungen Menü 2
+    guests_menu1 = db.Column(db.Integer, nullable=False, default=0)
+    guests_menu2 = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Steigt mit jeder Änderung des Tages
+
+class ChangeLog(db.Model):
+    """Append-only Änderungsprotokoll pro Tag für Delta-Updates der Küche (seq = DailyCounts.version)"""
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # registered, unregistered, guests, menu, reset
+    user_id = db.Column(db.Integer, nullable=True)
+    menu_choice = db.Column(db.Integer, nullable=True)
+    value = db.Column(db.Integer, nullable=True)  # Neue Gästezahl bei kind='guests'
+
+    __table_args__ = (
+        db.UniqueConstraint('date', 'seq', name='uq_change_log_date_seq'),
+    )
+
+class DailySummary(db.Model):
+    """Statistik-Rollup pro abgeschlossenem Tag (Quelle: DailyCounts + Menu)"""
+    date = db.Column(db.Date, primary_key=True)
+    menu1_count = db.Column(db.Integer, nullable=False, default=0)
+    menu2_count = db.Column(db.Integer, nullable=False, default=0)
+    guests_menu1 = db.Column(db.Integer, nullable=False, default=0)
+    guests_menu2 = db.Column(db.Integer, nullable=False, default=0)
+    has_menu = db.Column(db.Boolean, nullable=False, default=False)
+    description = db.Column(db.String(200))
+    zwei_menues_aktiv = db.Column(db.Boolean, nullable=False, default=False)
+    menu1_name = db.Column(db.String(200))
+    menu2_name = db.Column(db.String(200))
+    source_version = db.Column(db.Integer, nullable=False)  # DailyCounts.version beim Abschluss
+    finalized_at = db.Column(db.DateTime, nullable=False)
+
+class UserAttendance(db.Model):
+    """Gleitende Anmeldezähler pro User (siehe attendance.py), Stichtag global in `data_version`"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    count_7 = db.Column(db.Integer, nullable=False, default=0)  # Anmeldungen ab Stichtag - 7 Tage
+    count_30 = db.Column(db.Integer, nullable=False, default=0)
+    count_90 = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)  # Gesamt (inkl. Archiv)
+    last_date = db.Column(db.Date, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_user_attendance_top', 'count_90', 'user_id'),  # Top-Esser
+    )
+
+class SyncState(db.Model):
+    """Stand eines Portal-Syncs (siehe sync.py), ein Eintrag pro Quelle"""
+    name = db.Column(db.String(50), primary_key=True)
+    watermark = db.Column(db.String(64), nullable=True)  # Größtes `updated_at` bisher; None = nur Vollabgleich
+    watermark_id = db.Column(db.String(64), nullable=True)  # Größte Portal-`id` mit diesem `updated_at`
+    etag = db.Column(db.String(200), nullable=True)  # ETag des letzten Vollabgleichs
+    last_full_sync = db.Column(db.DateTime, nullable=True)
+    last_sync = db.Column(db.DateTime, nullable=True)
+
+class Job(db.Model):
+    """Hintergrund-Job für lange Admin-Aktionen (siehe jobs.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # user_import, sync, backup
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed, cancelled
+    params = db.Column(db.Text, nullable=True)  # JSON
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer, nullable=True)  # None = unbekannt
+    message = db.Column(db.String(200), nullable=True)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    created_by = db.Column(db.String(50), nullable=True)
+    node = db.Column(db.String(100), nullable=True)  # Ausführender Host; vorab gesetzt = nur dort (lokale Dateien)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_job_status', 'status', 'id'),  # Nächsten wartenden Job finden
+        {'sqlite_autoincrement': True},  # IDs nie wiederverwenden (Status-URLs bleiben eindeutig)
+    )
+
+class SchemaVersion(db.Model):
+    """Angewendete Schema-Migration (siehe migrations.py), ein Eintrag pro Version"""
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
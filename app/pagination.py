@@ -0,0 +1,124 @@
+"""
+Keyset-Pagination: Seiten über die Sortierspalten statt per OFFSET.
+
+Statt `OFFSET n` (liest und verwirft n Zeilen) setzt jede Folgeseite mit
+`WHERE (a, b) > (letzter a, letzter b)` auf dem Index auf. Jede Seite kostet
+damit gleich viel, egal wie tief geblättert wird. Die Sortierspalten müssen
+zusammen eindeutig sein (z.B. Name + ID).
+
+Nach außen ist der Schlüssel ein undurchsichtiger Cursor
+(`?after=<cursor>&limit=`); die Gesamtzahl kostet ein COUNT(*) und wird
+nur auf Wunsch geliefert.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from flask import request
+from sqlalchemy import func, select, tuple_
+
+from .models import db
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_key: Optional[tuple]  # Sortierschlüssel des letzten Eintrags, None auf der letzten Seite
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        return encode_cursor(self.next_key) if self.next_key else None
+
+
+def encode_cursor(key: Sequence) -> str:
+    """Sortierschlüssel als URL-sicherer Cursor"""
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in key]
+    payload = json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, order_by: Sequence) -> tuple:
+    """
+    Cursor zurück in den Sortierschlüssel (Typen aus den Sortierspalten).
+
+    Raises:
+        ValueError: Cursor ist ungültig oder passt nicht zu den Spalten
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Ungültiger Cursor: {e}")
+    if not isinstance(values, list) or len(values) != len(order_by):
+        raise ValueError("Ungültiger Cursor")
+
+    key = []
+    for value, column in zip(values, order_by):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif not isinstance(value, python_type) or isinstance(value, bool):
+                raise TypeError(type(value).__name__)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Ungültiger Cursor: {e}")
+        key.append(value)
+    return tuple(key)
+
+
+def request_args(order_by: Sequence, default_limit: int = DEFAULT_LIMIT,
+                 max_limit: int = MAX_LIMIT) -> Tuple[Optional[tuple], int]:
+    """
+    `?after=<cursor>&limit=` aus dem aktuellen Request.
+
+    Returns:
+        (Schlüssel oder None für die erste Seite, Limit)
+
+    Raises:
+        ValueError: Cursor ist ungültig
+    """
+    cursor = request.args.get('after')
+    after = decode_cursor(cursor, order_by) if cursor else None
+    limit = request.args.get('limit', default_limit, type=int)
+    return after, max(1, min(limit, max_limit))
+
+
+def count(stmt) -> int:
+    """Gesamtzahl der Zeilen von `stmt` (optional, kostet einen Scan)"""
+    return db.session.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+
+
+def keyset(stmt, order_by: Sequence, after: Optional[Sequence] = None, limit: int = DEFAULT_LIMIT,
+           descending: bool = False, key: Optional[Callable[[Any], tuple]] = None) -> Page:
+    """
+    Eine Seite von `stmt` ab dem Schlüssel `after`.
+
+    Args:
+        stmt: Select ohne ORDER BY/LIMIT
+        order_by: Sortierspalten (zusammen eindeutig)
+        after: Schlüssel des letzten Eintrags der Vorseite, None = erste Seite
+        limit: Einträge pro Seite
+        descending: Absteigend sortieren (alle Spalten)
+        key: Schlüssel aus einer Ergebniszeile; default die Attribute
+            gleichen Namens wie die Sortierspalten
+
+    Returns:
+        Page mit den Zeilen und dem Schlüssel für die nächste Seite
+    """
+    columns = list(order_by)
+    if after is not None:
+        current = tuple_(*columns)
+        stmt = stmt.where(current < tuple_(*after) if descending else current > tuple_(*after))
+    stmt = stmt.order_by(*[c.desc() if descending else c.asc() for c in columns]).limit(limit + 1)
+    rows = db.session.execute(stmt).all()
+
+    if len(rows) <= limit:
+        return Page(rows, None)
+    rows = rows[:limit]
+    key = key or (lambda row: tuple(getattr(row, c.key) for c in columns))
+    return Page(rows, key(rows[-1]))
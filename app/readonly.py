@@ -0,0 +1,61 @@
+"""
+Lesezugriffe der Auswertungen über eine eigene, schreibgeschützte Engine.
+
+Statistik, Historie und der CSV-Export lesen teils über Monate; liefen sie
+über denselben Pool wie die Kiosk-Anmeldungen, könnten sie zur Frist alle
+Verbindungen belegen und Scans warten lassen. Blueprints, die
+`route_reads()` aufrufen, schicken ihre SELECTs deshalb an die Bind
+'readonly' (siehe storage.readonly_binds):
+
+- SQLite: eigener Pool auf dieselbe Datei mit `PRAGMA query_only`; im
+  WAL-Modus blockieren die Leser den Schreiber nicht
+- PostgreSQL: DATABASE_REPLICA_URI (Streaming-Replica) oder, ohne Replica,
+  ein zweiter Pool auf den Primary mit `default_transaction_read_only`
+
+Schreibt ein Request doch (z.B. die Rollups von `get_days()`), gehen
+Schreibzugriffe und alle weiteren Lesezugriffe der Transaktion an den
+Primary, damit sie den eigenen Stand sehen.
+"""
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+BIND_KEY = 'readonly'
+
+
+def route_reads(blueprint):
+    """Lesezugriffe aller Routen von `blueprint` über die Read-Engine"""
+    @blueprint.before_request
+    def _route_reads():
+        g.db_readonly = True
+
+
+def _is_read(clause) -> bool:
+    return getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+
+class RoutingSession(Session):
+    """Session von `db`: SELECTs in route_reads()-Blueprints an die Read-Engine"""
+
+    _wrote = False  # Transaktion hat auf dem Primary geschrieben
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._wrote and _is_read(clause) \
+                and has_app_context() and g.get('db_readonly'):
+            engine = self._db.engines.get(BIND_KEY)
+            if engine is not None:
+                return engine
+        if bind is None and not _is_read(clause):
+            self._wrote = True  # Flush oder DML
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._wrote = False
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._wrote = False
@@ -0,0 +1,176 @@
+"""
+Registrierungs-Engine: An-/Abmeldung als atomare Statement-Folge.
+
+Alle Einstiegspunkte (Touch, RFID, API, Mobile, Admin) gehen hierüber.
+Statt SELECT + separatem INSERT/DELETE läuft jede Aktion als
+DELETE … RETURNING bzw. INSERT … ON CONFLICT DO NOTHING RETURNING in
+einer Transaktion. Das spart Queries pro Scan und verhindert
+Unique-Constraint-Fehler bei parallelen Scans aus mehreren Workern.
+Die Tageszähler (counters.py) und die Zähler pro User (attendance.py)
+werden im selben Commit fortgeschrieben.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date as date_type
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+from . import attendance, counters
+from .dialect import insert
+from .models import db, Registration
+
+logger = logging.getLogger(__name__)
+
+
+class RegistrationStatus(Enum):
+    REGISTERED = 'registered'
+    UNREGISTERED = 'unregistered'
+    NEEDS_MENU_CHOICE = 'needs_menu_choice'
+    DEADLINE_CLOSED = 'deadline_closed'
+    ALREADY_REGISTERED = 'already_registered'
+    NOT_REGISTERED = 'not_registered'
+
+
+@dataclass(frozen=True)
+class RegistrationOutcome:
+    """Ergebnis einer Registrierungs-Aktion"""
+    status: RegistrationStatus
+    menu_choice: Optional[int] = None  # Gewähltes bzw. abgemeldetes Menü
+
+    @property
+    def registered(self) -> bool:
+        """True wenn der User danach angemeldet ist"""
+        return self.status in (RegistrationStatus.REGISTERED, RegistrationStatus.ALREADY_REGISTERED)
+
+
+def _resolve_menu_choice(menu, menu_choice: Optional[int]) -> Optional[int]:
+    """Menüwahl normalisieren: ohne Zwei-Menü-Modus immer Menü 1"""
+    if menu is not None and not menu.zwei_menues_aktiv:
+        return 1
+    if menu_choice is None:
+        return None if menu is not None else 1
+    return menu_choice if menu_choice in (1, 2) else 1
+
+
+def _delete_returning(user_id: int, day: date_type) -> Optional[int]:
+    row = db.session.execute(
+        delete(Registration)
+        .where(Registration.user_id == user_id, Registration.date == day)
+        .returning(Registration.menu_choice)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        return None
+    counters.apply_registration(day, row.menu_choice, -1, user_id)
+    attendance.apply([user_id], day, -1)
+    return row.menu_choice
+
+
+def _insert_returning(user_id: int, day: date_type, menu_choice: int) -> bool:
+    row = db.session.execute(
+        insert(Registration)
+        .values(user_id=user_id, date=day, menu_choice=menu_choice)
+        .on_conflict_do_nothing(index_elements=['user_id', 'date'])
+        .returning(Registration.id)
+    ).first()
+    if row is None:
+        return False
+    counters.apply_registration(day, menu_choice, +1, user_id)
+    attendance.apply([user_id], day, +1)
+    return True
+
+
+def _run(action):
+    try:
+        outcome = action()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Registrierung fehlgeschlagen, rolled back: {e}")
+        raise
+    return outcome
+
+
+def toggle(user_id: int, menu=None, menu_choice: Optional[int] = None,
+           day: Optional[date_type] = None) -> RegistrationOutcome:
+    """
+    An-/Abmeldung umschalten (Scan am Touch-Display, RFID, API, Admin).
+
+    Abmelden ist immer erlaubt, auch nach der Anmeldefrist.
+
+    Args:
+        user_id: ID des Users
+        menu: Tagesmenü (für Frist und Zwei-Menü-Modus); None = keine Prüfungen
+        menu_choice: 1 oder 2; None = im Zwei-Menü-Modus Auswahl anfordern
+        day: Datum, default heute
+
+    Returns:
+        RegistrationOutcome
+    """
+    day = day or date_type.today()
+
+    def action():
+        removed_choice = _delete_returning(user_id, day)
+        if removed_choice is not None:
+            return RegistrationOutcome(RegistrationStatus.UNREGISTERED, removed_choice)
+        if menu is not None and not menu.is_registration_open():
+            return RegistrationOutcome(RegistrationStatus.DEADLINE_CLOSED)
+        choice = _resolve_menu_choice(menu, menu_choice)
+        if choice is None:
+            return RegistrationOutcome(RegistrationStatus.NEEDS_MENU_CHOICE)
+        if not _insert_returning(user_id, day, choice):
+            # Paralleler Scan war schneller
+            return RegistrationOutcome(RegistrationStatus.ALREADY_REGISTERED)
+        return RegistrationOutcome(RegistrationStatus.REGISTERED, choice)
+
+    return _run(action)
+
+
+def register(user_id: int, menu=None, menu_choice: Optional[int] = None,
+             day: Optional[date_type] = None) -> RegistrationOutcome:
+    """
+    Explizit anmelden (Menüauswahl, Mobile-Seite). Bestehende Anmeldung bleibt.
+
+    Returns:
+        REGISTERED, ALREADY_REGISTERED oder DEADLINE_CLOSED
+    """
+    day = day or date_type.today()
+    if menu is not None and not menu.is_registration_open():
+        return RegistrationOutcome(RegistrationStatus.DEADLINE_CLOSED)
+    choice = _resolve_menu_choice(menu, menu_choice) or 1
+
+    def action():
+        if not _insert_returning(user_id, day, choice):
+            return RegistrationOutcome(RegistrationStatus.ALREADY_REGISTERED)
+        return RegistrationOutcome(RegistrationStatus.REGISTERED, choice)
+
+    return _run(action)
+
+
+def unregister(user_id: int, day: Optional[date_type] = None) -> RegistrationOutcome:
+    """
+    Explizit abmelden (Mobile-Seite).
+
+    Returns:
+        UNREGISTERED oder NOT_REGISTERED
+    """
+    day = day or date_type.today()
+
+    def action():
+        removed_choice = _delete_returning(user_id, day)
+        if removed_choice is None:
+            return RegistrationOutcome(RegistrationStatus.NOT_REGISTERED)
+        return RegistrationOutcome(RegistrationStatus.UNREGISTERED, removed_choice)
+
+    return _run(action)
+
+
+def get_menu_choice(user_id: int, day: Optional[date_type] = None) -> Optional[int]:
+    """Menüwahl der bestehenden Anmeldung oder None (nur für Anzeige)"""
+    day = day or date_type.today()
+    return db.session.execute(
+        select(Registration.menu_choice)
+        .where(Registration.user_id == user_id, Registration.date == day)
+    ).scalar()
@@ -1,30 +1,189 @@
+"""
+RFID-Leser: Langlebiger Reader-Thread statt Port-Öffnen pro Karte.
+
+Der Serial-Port bleibt dauerhaft offen, gelesene Zeilen landen in einem
+begrenzten Puffer. Verschwindet das USB-Gerät, wird mit Backoff neu verbunden.
+"""
 import serial
-from app.models import db, User
+from collections import deque
+from typing import NamedTuple, Optional
+import threading
 import logging
+import time
 import os
 
 logger = logging.getLogger(__name__)
 
-def read_rfid(port=None, baudrate=None):
-    if port is None:
-        port = os.environ.get('RFID_PORT', '/dev/ttyUSB0')
-    if baudrate is None:
-        baudrate = int(os.environ.get('RFID_BAUDRATE', '115200'))
-    
-    try:
-        ser = serial.Serial(port, baudrate, timeout=2)
-        try:
-            while True:
-                data = ser.readline().decode('utf-8').strip()
-                if data:
-                    logger.info(f"RFID gelesen: {data}")
-                    # Annahme: Die Kartennummer steht direkt in der Zeile
-                    return data
-        finally:
-            ser.close()
-    except serial.SerialException as e:
-        logger.error(f"RFID-Leser nicht verfügbar auf {port}: {e}")
-        raise
+# Reconnect-Backoff (Sekunden)
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+
+class Scan(NamedTuple):
+    """Ein gelesener Kartenscan"""
+    card_id: str
+    read_at: float  # time.monotonic() beim Lesen
+    timestamp: float  # time.time() beim Lesen
+
+
+class RFIDReader:
+    """
+    Hält den Serial-Port offen und liest Karten kontinuierlich in einen Puffer.
+
+    Usage:
+        reader = RFIDReader()
+        reader.start()
+        scan = reader.get(timeout=1.0)
+    """
+
+    def __init__(self, port: Optional[str] = None, baudrate: Optional[int] = None,
+                 buffer_size: int = 32):
+        self.port = port or os.environ.get('RFID_PORT', '/dev/ttyUSB0')
+        self.baudrate = baudrate or int(os.environ.get('RFID_BAUDRATE', '115200'))
+        self._buffer = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._serial = None
+        self._counters = {
+            'reads': 0,
+            'consumed': 0,
+            'dropped': 0,
+            'reconnects': 0,
+            'errors': 0,
+        }
+        self._latency_last = None
+        self._latency_max = 0.0
+        self._latency_sum = 0.0
+        self._last_read_at = None
+        self._connected = False
+
+    def start(self):
+        """Startet den Reader-Thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='rfid-reader', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Stoppt den Reader-Thread und schließt den Port"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._close()
+
+    def _open(self):
+        # Kurzer Timeout: readline() kehrt sofort bei '\n' zurück,
+        # der Timeout bestimmt nur, wie oft das Stop-Flag geprüft wird
+        self._serial = serial.Serial(self.port, self.baudrate, timeout=0.5)
+        self._connected = True
+        logger.info(f"RFID-Leser verbunden auf {self.port}")
+
+    def _close(self):
+        self._connected = False
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+            self._serial = None
+
+    def _run(self):
+        delay = RECONNECT_MIN_DELAY
+        first = True
+        while not self._stop.is_set():
+            try:
+                if self._serial is None:
+                    if not first:
+                        self._counters['reconnects'] += 1
+                    first = False
+                    self._open()
+                    delay = RECONNECT_MIN_DELAY
+                line = self._serial.readline()
+                if line:
+                    card_id = line.decode('utf-8', errors='ignore').strip()
+                    if card_id:
+                        self._push(card_id)
+            except (serial.SerialException, OSError) as e:
+                self._counters['errors'] += 1
+                self._close()
+                logger.error(f"RFID-Leser nicht verfügbar auf {self.port}: {e} (neuer Versuch in {delay:.1f}s)")
+                self._stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        self._close()
+
+    def _push(self, card_id: str):
+        scan = Scan(card_id=card_id, read_at=time.monotonic(), timestamp=time.time())
+        logger.info(f"RFID gelesen: {card_id}")
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._counters['dropped'] += 1
+            self._buffer.append(scan)
+            self._counters['reads'] += 1
+            self._last_read_at = scan.timestamp
+            self._cond.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Scan]:
+        """
+        Ältesten ungelesenen Scan aus dem Puffer holen.
+
+        Args:
+            timeout: Sekunden warten falls Puffer leer (None = nicht warten)
+
+        Returns:
+            Scan oder None
+        """
+        with self._cond:
+            if not self._buffer and timeout:
+                self._cond.wait_for(lambda: self._buffer, timeout)
+            if not self._buffer:
+                return None
+            scan = self._buffer.popleft()
+            latency = time.monotonic() - scan.read_at
+            self._counters['consumed'] += 1
+            self._latency_last = latency
+            self._latency_max = max(self._latency_max, latency)
+            self._latency_sum += latency
+        return scan
+
+    def stats(self) -> dict:
+        """Lese-/Latenz-Zähler für Monitoring"""
+        with self._cond:
+            consumed = self._counters['consumed']
+            return {
+                'port': self.port,
+                'connected': self._connected,
+                'buffered': len(self._buffer),
+                **self._counters,
+                'last_read_at': self._last_read_at,
+                'latency_ms': {
+                    'last': round(self._latency_last * 1000, 1) if self._latency_last is not None else None,
+                    'avg': round(self._latency_sum / consumed * 1000, 1) if consumed else None,
+                    'max': round(self._latency_max * 1000, 1),
+                },
+            }
+
+
+# Prozessweiter Reader (wird von routes.start_rfid_thread gestartet)
+_reader: Optional[RFIDReader] = None
+
+
+def get_reader() -> Optional[RFIDReader]:
+    """Liefert den laufenden Reader oder None (Demo-Modus ohne RFID)"""
+    return _reader
+
+
+def start_reader(**kwargs) -> RFIDReader:
+    """Erstellt und startet den prozessweiten Reader (idempotent)"""
+    global _reader
+    if _reader is None:
+        _reader = RFIDReader(**kwargs)
+    _reader.start()
+    return _reader
+
 
 def find_user_by_card(card_id):
-    return User.query.filter_by(card_id=card_id).first()
+    """Karten-ID → User über den prozesslokalen Index (kein DB-Roundtrip)"""
+    from .user_index import user_index
+    return user_index.by_card(card_id)
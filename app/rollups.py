@@ -0,0 +1,159 @@
+"""
+Tages-Rollups (`DailySummary`) für Statistik, Export und /api/stats.
+
+Abgeschlossene Tage (vor heute) werden einmalig aus `DailyCounts` und
+`Menu` festgeschrieben. Wird ein vergangener Tag nachträglich geändert,
+steigt seine Tagesversion (counters.py) und der Rollup wird beim nächsten
+Lesen neu geschrieben. Heute und künftige Tage werden live berechnet, aber
+nicht gespeichert. Gelesen wird immer nur der angefragte Zeitraum, die
+Latenz hängt also nicht von der Länge der Historie ab.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date as date_type, datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+
+from .dialect import insert
+from .models import db, DailyCounts, DailySummary, Menu
+
+logger = logging.getLogger(__name__)
+
+# SQLite erlaubt höchstens 999 Parameter pro Statement
+_IN_CHUNK = 500
+
+
+@dataclass(frozen=True)
+class DayStats:
+    """Statistik eines Tages (gleiche Felder wie `DailySummary`)"""
+    date: date_type
+    menu1_count: int
+    menu2_count: int
+    guests_menu1: int
+    guests_menu2: int
+    has_menu: bool
+    description: Optional[str]
+    zwei_menues_aktiv: bool
+    menu1_name: Optional[str]
+    menu2_name: Optional[str]
+
+    @property
+    def registrations(self) -> int:
+        return self.menu1_count + self.menu2_count
+
+    @property
+    def guests(self) -> int:
+        return self.guests_menu1 + self.guests_menu2
+
+    @property
+    def total(self) -> int:
+        return self.registrations + self.guests
+
+    @property
+    def menu(self) -> Optional[str]:
+        """Für Templates: Menübeschreibung"""
+        return self.description
+
+    @property
+    def zwei_menues(self) -> bool:
+        """Für Templates: Zwei-Menü-Modus"""
+        return self.zwei_menues_aktiv
+
+    @classmethod
+    def from_summary(cls, summary: DailySummary) -> 'DayStats':
+        return cls(**{field: getattr(summary, field) for field in cls.__dataclass_fields__})
+
+
+def _compute(counts: Dict[date_type, DailyCounts]) -> Dict[date_type, DayStats]:
+    """DayStats aus Tageszählern und Menüs berechnen"""
+    dates = list(counts)
+    menus = {}
+    for i in range(0, len(dates), _IN_CHUNK):
+        chunk = dates[i:i + _IN_CHUNK]
+        menus.update({m.date: m for m in db.session.execute(
+            select(Menu).where(Menu.date.in_(chunk))
+        ).scalars()})
+
+    result = {}
+    for day, row in counts.items():
+        menu = menus.get(day)
+        result[day] = DayStats(
+            date=day,
+            menu1_count=row.menu1,
+            menu2_count=row.menu2,
+            guests_menu1=row.guests_menu1,
+            guests_menu2=row.guests_menu2,
+            has_menu=menu is not None,
+            description=menu.description if menu else None,
+            zwei_menues_aktiv=bool(menu and menu.zwei_menues_aktiv),
+            menu1_name=menu.menu1_name if menu else None,
+            menu2_name=menu.menu2_name if menu else None,
+        )
+    return result
+
+
+def _finalize(stats: Iterable[DayStats], versions: Dict[date_type, int]):
+    """Rollups vergangener Tage festschreiben (Upsert, ein Commit)"""
+    now = datetime.now()
+    rows = [
+        {**{field: getattr(s, field) for field in DayStats.__dataclass_fields__},
+         'source_version': versions[s.date], 'finalized_at': now}
+        for s in stats
+    ]
+    if not rows:
+        return
+    stmt = insert(DailySummary)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailySummary.date],
+        set_={key: stmt.excluded[key] for key in rows[0] if key != 'date'},
+    )
+    try:
+        db.session.execute(stmt, rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Tages-Rollups festgeschrieben: {len(rows)} Tage")
+
+
+def get_days(start: date_type, end: date_type, only_with_menu: bool = False,
+             descending: bool = True) -> List[DayStats]:
+    """
+    Statistik für den Zeitraum `start`..`end` (inklusive).
+
+    Nur Tage mit Daten (Anmeldungen, Gäste oder Menü) sind enthalten.
+
+    Args:
+        start: Erster Tag
+        end: Letzter Tag
+        only_with_menu: Nur Tage, für die ein Menü eingetragen war
+        descending: Neueste zuerst
+    """
+    today = date_type.today()
+    rows = db.session.execute(
+        select(DailyCounts, DailySummary)
+        .outerjoin(DailySummary, DailySummary.date == DailyCounts.date)
+        .where(DailyCounts.date >= start, DailyCounts.date <= end)
+    ).all()
+
+    days: Dict[date_type, DayStats] = {}
+    stale: Dict[date_type, DailyCounts] = {}
+    for counts, summary in rows:
+        if counts.date < today and summary is not None and summary.source_version == counts.version:
+            days[counts.date] = DayStats.from_summary(summary)
+        else:
+            stale[counts.date] = counts
+
+    if stale:
+        computed = _compute(stale)
+        days.update(computed)
+        # Nur abgeschlossene Tage speichern; heute ändert sich noch
+        _finalize(
+            [s for day, s in computed.items() if day < today],
+            {day: row.version for day, row in stale.items()},
+        )
+
+    result = [s for s in days.values() if s.has_menu or not only_with_menu]
+    result.sort(key=lambda s: s.date, reverse=descending)
+    return result
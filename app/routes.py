@@ -1,23 +1,27 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, make_response
-from .models import db, User, Menu, Registration, Guest, PresetMenu, AdminLog
-from .utils import register_user_for_today, save_menu, get_guests_for_date, get_menu_for_date, db_transaction
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, make_response, current_app
+from .models import db, User, Menu, Registration, PresetMenu, AdminLog, UserAttendance
+from .utils import register_user_for_today, save_menu, update_guests, db_transaction
+from .today import get_today_context, MENU_VERSION_KEY
+from .etags import make_etag, conditional_json
+from . import attendance, counters, registration, versions
+from .registration import RegistrationStatus
 from .validation import (
     validate_personal_number, validate_card_id, validate_name,
     validate_integer, validate_menu_choice, validate_date, validate_time
 )
 from .rfid import find_user_by_card
+from .user_index import user_index, VERSION_KEY as USERS_VERSION_KEY
 from .auth import login_required, check_auth
 from .api import limiter
 from .qr_generator import generate_qr_code
 from .notifications import notification_service
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import joinedload
 from flask_limiter.util import get_remote_address
 from datetime import date
 from urllib.parse import urlparse
 import csv
-from io import TextIOWrapper, StringIO
-import threading
-import time
+from io import StringIO
 import logging
 import os
 
@@ -64,14 +68,18 @@ def logout():
     session.pop('admin_logged_in', None)
     return redirect(url_for('main.index'))
 
-# Thread-sicherer Speicher für den letzten RFID-Scan
-_rfid_lock = threading.Lock()
-last_card_id = {'value': None}
+def _menu_text(menu, menu_choice):
+    """Anzeigetext des Menüs für eine Menüwahl"""
+    if not menu:
+        return ""
+    if menu.zwei_menues_aktiv:
+        return menu.menu2_name if menu_choice == 2 else menu.menu1_name
+    return menu.description
 
 @bp.route('/', methods=['GET', 'POST'])
 @limiter.limit("60 per minute")  # Max 60 Scans pro Minute (1 pro Sekunde)
 def index():
-    today_menu = get_menu_for_date()
+    today_menu = get_today_context().menu
     message = None
     status = None
     need_menu_choice = False
@@ -99,39 +107,22 @@ def index():
             card_id = validate_card_id(card_id)
         
         if personal_number:
-            user = User.query.filter_by(personal_number=personal_number).first()
+            user = user_index.by_personal_number(personal_number)
         elif card_id:
             user = find_user_by_card(card_id)
             
         if user:
-            # Deadline-Prüfung
-            if today_menu and not today_menu.is_registration_open():
-                # Abmeldung auch nach Deadline erlauben
-                existing_reg = Registration.query.filter_by(user_id=user.id, date=date.today()).first()
-                if not existing_reg:
+            # Toggle als eine atomare Transaktion (inkl. Frist- und Menüprüfung)
+            try:
+                outcome = registration.toggle(user.id, today_menu)
+            except Exception:
+                message = "Datenbankfehler"
+                status = 'error'
+            else:
+                if outcome.status == RegistrationStatus.DEADLINE_CLOSED:
                     message = f"Anmeldefrist abgelaufen ({today_menu.registration_deadline} Uhr)"
                     status = 'error'
-                    return render_template('touch.html', menu=today_menu, message=message, status=status)
-            
-            # Prüfe ob zwei Menüs aktiv sind
-            if today_menu and today_menu.zwei_menues_aktiv:
-                # Prüfe ob User schon angemeldet ist
-                existing_reg = Registration.query.filter_by(user_id=user.id, date=date.today()).first()
-                if existing_reg:
-                    # Abmelden
-                    menu_name = today_menu.menu1_name if existing_reg.menu_choice == 1 else today_menu.menu2_name
-                    try:
-                        with db_transaction():
-                            db.session.delete(existing_reg)
-                    except Exception as e:
-                        logger.error(f"Abmeldung fehlgeschlagen für {user.name}: {e}")
-                        message = "Datenbankfehler bei Abmeldung"
-                        status = 'error'
-                        return render_template('touch.html', menu=today_menu, message=message, status=status)
-                    message = f"{user.name}, du wurdest abgemeldet.\n{menu_name}"
-                    status = 'cancel'
-                    logger.info(f"Abmeldung: {user.name} ({user.personal_number})")
-                else:
+                elif outcome.status == RegistrationStatus.NEEDS_MENU_CHOICE:
                     # Zeige Menüauswahl
                     need_menu_choice = True
                     pending_user_id = user.id
@@ -139,20 +130,17 @@ def index():
                     pending_personal_number = personal_number
                     message = "Bitte wähle dein Menü"
                     status = 'info'
-            else:
-                # Normaler Modus ohne Menüauswahl
-                registered = register_user_for_today(user)
-                if registered:
-                    menu_text = today_menu.description if today_menu else "Kein Menü"
+                elif outcome.status == RegistrationStatus.UNREGISTERED:
+                    menu_text = _menu_text(today_menu, outcome.menu_choice)
+                    message = f"{user.name}, du wurdest abgemeldet.\n{menu_text}"
+                    status = 'cancel'
+                    logger.info(f"Abmeldung: {user.name} ({user.personal_number})")
+                else:
+                    menu_text = _menu_text(today_menu, outcome.menu_choice) or "Kein Menü"
                     message = f"{user.name}, du bist angemeldet!\n{menu_text}"
                     status = 'success'
                     logger.info(f"Anmeldung: {user.name} ({user.personal_number})")
                     notification_service.notify_new_registration(user.name)
-                else:
-                    menu_text = today_menu.description if today_menu else ""
-                    message = f"{user.name}, du wurdest abgemeldet.\n{menu_text}"
-                    status = 'cancel'
-                    logger.info(f"Abmeldung: {user.name} ({user.personal_number})")
         else:
             message = "Benutzer nicht gefunden"
             status = 'error'
@@ -186,7 +174,8 @@ def index():
 def register_with_menu():
     """Route für Anmeldung mit Menüauswahl"""
     user_id = validate_integer(request.form.get('user_id'), min_value=1)
-    menu_choice = validate_menu_choice(request.form.get('menu_choice', 1), zwei_menues_aktiv=False)
+    # Ein-Menü-Modus normalisiert die Registrierungs-Engine selbst auf Menü 1
+    menu_choice = validate_menu_choice(request.form.get('menu_choice', 1), zwei_menues_aktiv=True)
     
     # Input-Validierung
     try:
@@ -200,29 +189,33 @@ def register_with_menu():
     
     user = db.session.get(User, user_id_int)
     if user:
-        today_menu = get_menu_for_date()
+        today_menu = get_today_context().menu
+        is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
         
-        # Erstelle neue Registration mit Menüwahl
-        existing_reg = Registration.query.filter_by(user_id=user.id, date=date.today()).first()
-        if not existing_reg:
-            reg = Registration(user_id=user.id, date=date.today(), menu_choice=menu_choice)
-            try:
-                with db_transaction():
-                    db.session.add(reg)
-            except Exception as e:
-                logger.error(f"Registrierung mit Menü fehlgeschlagen für user_id {user_id}: {e}")
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return jsonify({'status': 'error', 'message': 'Datenbankfehler'})
-                return redirect(url_for('main.index'))
-            
-            menu_name = today_menu.menu1_name if menu_choice == 1 else today_menu.menu2_name
+        # Anmeldung mit Menüwahl (INSERT … ON CONFLICT DO NOTHING)
+        try:
+            outcome = registration.register(user.id, today_menu, menu_choice)
+        except Exception as e:
+            logger.error(f"Registrierung mit Menü fehlgeschlagen für user_id {user_id}: {e}")
+            if is_ajax:
+                return jsonify({'status': 'error', 'message': 'Datenbankfehler'})
+            return redirect(url_for('main.index'))
+        
+        if outcome.status == RegistrationStatus.DEADLINE_CLOSED:
+            message = f"Anmeldefrist abgelaufen ({today_menu.registration_deadline} Uhr)"
+            if is_ajax:
+                return jsonify({'status': 'error', 'message': message})
+            return render_template('touch.html', menu=today_menu, message=message, status='error')
+        
+        if outcome.status == RegistrationStatus.REGISTERED:
+            menu_name = _menu_text(today_menu, outcome.menu_choice)
             message = f"{user.name}, du bist angemeldet!\n{menu_name}"
             
-            logger.info(f"Anmeldung mit Menü {menu_choice}: {user.name} ({user.personal_number})")
-            notification_service.notify_new_registration(f"{user.name} - Menü {menu_choice}")
+            logger.info(f"Anmeldung mit Menü {outcome.menu_choice}: {user.name} ({user.personal_number})")
+            notification_service.notify_new_registration(f"{user.name} - Menü {outcome.menu_choice}")
             
             # Bei AJAX JSON zurückgeben
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if is_ajax:
                 return jsonify({
                     'status': 'success',
                     'message': message,
@@ -231,8 +224,11 @@ def register_with_menu():
             
             return render_template('touch.html', 
                                  menu=today_menu,
-                                 message=f"{user.name}, du bist angemeldet!\nMenü {menu_choice}: {menu_name}",
+                                 message=f"{user.name}, du bist angemeldet!\nMenü {outcome.menu_choice}: {menu_name}",
                                  status='success')
+        
+        if is_ajax:
+            return jsonify({'status': 'info', 'message': f"{user.name}, du bist bereits angemeldet."})
     
     return redirect(url_for('main.index'))
 
@@ -240,30 +236,30 @@ def register_with_menu():
 @bp.route('/kitchen', methods=['GET', 'POST'])
 @login_required
 def kitchen():
-    today_menu = get_menu_for_date()
+    today = get_today_context()
+    today_menu = today.menu
     registrations = Registration.query.options(
         joinedload(Registration.user)
     ).filter_by(date=date.today()).all()
     # Sortiere nach Username
     registrations = sorted(registrations, key=lambda r: r.user.name.lower())
     
-    # Gäste laden
-    guest_data = get_guests_for_date()
-    guest_menu1 = guest_data['menu1']
-    guest_menu2 = guest_data['menu2']
-    guest_count = guest_data['total_count']
+    # Gäste aus dem Tageskontext
+    guest_menu1 = today.guests_menu1
+    guest_menu2 = today.guests_menu2
+    guest_count = today.guest_count
     
     preset_menus = PresetMenu.get_all_ordered()
 
     # Menüstatistiken berechnen
-    menu1_count = sum(1 for r in registrations if r.menu_choice == 1) + (guest_menu1.count if guest_menu1 else 0)
-    menu2_count = sum(1 for r in registrations if r.menu_choice == 2) + (guest_menu2.count if guest_menu2 else 0)
+    menu1_count = sum(1 for r in registrations if r.menu_choice == 1) + guest_menu1
+    menu2_count = sum(1 for r in registrations if r.menu_choice == 2) + guest_menu2
 
     if request.method == 'POST':
         # Menü speichern
         if 'menu' in request.form or 'menu1' in request.form:
             try:
-                today_menu = save_menu(date.today(), request.form)
+                save_menu(date.today(), request.form)
                 flash('Menü aktualisiert!')
             except Exception as e:
                 logger.error(f"Menü-Speichern fehlgeschlagen: {e}")
@@ -273,18 +269,10 @@ def kitchen():
         elif 'guest_action' in request.form:
             action = request.form.get('guest_action')
             menu_choice = validate_menu_choice(request.form.get('menu_choice', 1), zwei_menues_aktiv=today_menu.zwei_menues_aktiv if today_menu else False)
-            
-            guest_entry = Guest.query.filter_by(date=date.today(), menu_choice=menu_choice).first()
-            if not guest_entry:
-                guest_entry = Guest(date=date.today(), menu_choice=menu_choice, count=0)
-                db.session.add(guest_entry)
-                
-            if action == 'add' and guest_entry.count < 50:
-                guest_entry.count += 1
-            elif action == 'remove' and guest_entry.count > 0:
-                guest_entry.count -= 1
-            
-            db.session.commit()
+            try:
+                update_guests(date.today(), menu_choice, action)
+            except Exception:
+                flash('Fehler beim Speichern der Gäste.')
         return redirect(url_for('main.kitchen'))
 
     total = len(registrations) + guest_count
@@ -299,67 +287,137 @@ def kitchen():
                          menu2_count=menu2_count,
                          preset_menus=preset_menus)
 
+# Mehr Änderungen als das → vollständiger Stand ist billiger
+KITCHEN_MAX_DELTA = 100
+
 @bp.route('/kitchen/data', methods=['GET'])
 @login_required
 def kitchen_data():
-    """API-Endpunkt für AJAX-Updates der Küchenseite"""
-    today_menu = get_menu_for_date()
-    registrations = Registration.query.options(
-        joinedload(Registration.user)
-    ).filter_by(date=date.today()).all()
-    users = sorted([r.user for r in registrations], key=lambda u: u.name.lower())
-    
-    # Gäste laden
-    guest_data = get_guests_for_date()
-    guest_menu1 = guest_data['menu1']
-    guest_menu2 = guest_data['menu2']
-    guest_count = guest_data['total_count']
-    
-    # Menüstatistiken
-    menu1_count = sum(1 for r in registrations if r.menu_choice == 1) + (guest_menu1.count if guest_menu1 else 0)
-    menu2_count = sum(1 for r in registrations if r.menu_choice == 2) + (guest_menu2.count if guest_menu2 else 0)
+    """
+    API-Endpunkt für AJAX-Updates der Küchenseite.
+
+    Ohne `since` kommt der vollständige Stand, mit `since=<version>` (Wert
+    aus der letzten Antwort) nur die Änderungen seither. Ist der Client zu
+    weit zurück oder das Protokoll lückenhaft, kommt wieder der volle Stand.
+    Unverändert → 304 über den ETag.
+    """
+    today_date = date.today()
+    day_version = counters.day_version(today_date)
+    users_version = versions.get(USERS_VERSION_KEY)
+    version = f'{today_date.isoformat()}.{day_version}.{users_version}'
+    since = request.args.get('since', '')[:40]
+    etag = make_etag('kitchen', version, since or 'full')
+
+    def build():
+        payload = _kitchen_delta(today_date, day_version, users_version, since) if since else None
+        if payload is None:
+            payload = _kitchen_payload()
+            payload['full'] = True
+        payload['version'] = version
+        return payload
+
+    return conditional_json(etag, build)
+
+
+def _kitchen_entry(user_id, name, menu_choice, today_menu):
+    entry = {
+        'user_id': user_id,
+        'name': name,
+        'menu_choice': menu_choice,
+    }
+    if today_menu:
+        if today_menu.zwei_menues_aktiv:
+            if menu_choice == 1:
+                entry['menu_name'] = today_menu.menu1_name or 'Menü 1'
+            elif menu_choice == 2:
+                entry['menu_name'] = today_menu.menu2_name or 'Menü 2'
+        else:
+            entry['menu_name'] = today_menu.description or ''
+    else:
+        entry['menu_name'] = ''
+    return entry
+
+
+def _kitchen_counts(counts):
+    return {
+        'guest_count': counts.guests,
+        'total': counts.total,
+        'user_count': counts.registrations,
+        'menu1_count': counts.menu1 + counts.guests_menu1,
+        'menu2_count': counts.menu2 + counts.guests_menu2,
+    }
+
+
+def _kitchen_delta(today_date, day_version, users_version, since):
+    """Änderungen seit `since` oder None, wenn ein voller Stand nötig ist"""
+    try:
+        since_date, since_version, since_users = since.split('.')
+        since_version = int(since_version)
+    except ValueError:
+        return None
+    if since_date != today_date.isoformat() or since_users != str(users_version):
+        return None
+    changes = counters.changes_since(today_date, since_version, day_version, KITCHEN_MAX_DELTA)
+    # Menü- und Reset-Änderungen betreffen die ganze Liste
+    if changes is None or any(c.kind in ('menu', 'reset') for c in changes):
+        return None
+
+    today_menu = get_today_context().menu
+    entries = []
+    for change in changes:
+        if change.kind == 'registered':
+            user = user_index.by_id(change.user_id)
+            if user is None:
+                return None
+            entries.append({'seq': change.seq, 'type': 'registered',
+                            **_kitchen_entry(user.id, user.name, change.menu_choice, today_menu)})
+        elif change.kind == 'unregistered':
+            entries.append({'seq': change.seq, 'type': 'unregistered', 'user_id': change.user_id})
+        # Gäste: nur die Zähler ändern sich, die kommen unten absolut mit
+    return {
+        'full': False,
+        'changes': entries,
+        **_kitchen_counts(counters.get_counts(today_date)),
+    }
+
+
+def _kitchen_payload():
+    today = get_today_context()
+    today_menu = today.menu
+    # Zahlen aus der Tageszähler-Zeile, Namensliste ohne volle User-Objekte
+    counts = counters.get_counts(today.date)
+    rows = db.session.execute(
+        select(User.id, User.name, Registration.menu_choice)
+        .join(Registration.user)
+        .where(Registration.date == today.date)
+        .order_by(func.lower(User.name))
+    ).all()
     
     # Liefere für jeden User auch menu_choice und Menüname
-    user_entries = []
-    for r in registrations:
-        entry = {
-            'name': r.user.name,
-            'menu_choice': r.menu_choice,
-        }
-        if today_menu:
-            if today_menu.zwei_menues_aktiv:
-                if r.menu_choice == 1:
-                    entry['menu_name'] = today_menu.menu1_name or 'Menü 1'
-                elif r.menu_choice == 2:
-                    entry['menu_name'] = today_menu.menu2_name or 'Menü 2'
-            else:
-                entry['menu_name'] = today_menu.description or ''
-        else:
-            entry['menu_name'] = ''
-        user_entries.append(entry)
-    return jsonify({
+    user_entries = [
+        _kitchen_entry(user_id, name, menu_choice, today_menu)
+        for user_id, name, menu_choice in rows
+    ]
+    return {
         'users': user_entries,
-        'guest_count': guest_count,
-        'total': len(users) + guest_count,
-        'menu1_count': menu1_count,
-        'menu2_count': menu2_count,
+        **_kitchen_counts(counts),
         'menu': {
             'zwei_menues_aktiv': today_menu.zwei_menues_aktiv if today_menu else False,
             'menu1_name': today_menu.menu1_name if today_menu else None,
             'menu2_name': today_menu.menu2_name if today_menu else None,
             'description': today_menu.description if today_menu else None
         }
-    })
+    }
 
 @bp.route('/kitchen/print')
 def kitchen_print():
     """Druckansicht für die Küche - gruppiert nach Menü"""
-    today_menu = Menu.query.filter_by(date=date.today()).first()
+    today = get_today_context()
+    today_menu = today.menu
     registrations = Registration.query.options(
         joinedload(Registration.user)
     ).filter_by(date=date.today()).all()
-    guest_entry = Guest.query.filter_by(date=date.today()).first()
-    guest_count = guest_entry.count if guest_entry else 0
+    guest_count = today.guest_count
     
     # Nach Menüwahl gruppieren und alphabetisch sortieren
     menu1_users = sorted([r.user for r in registrations if r.menu_choice == 1], key=lambda u: u.name.lower())
@@ -376,33 +434,34 @@ def kitchen_print():
 
 @bp.route('/menu/data', methods=['GET'])
 def menu_data():
-    """API-Endpunkt für AJAX-Updates des Menüs auf der Touch-Seite"""
-    today_menu = Menu.query.filter_by(date=date.today()).first()
+    """API-Endpunkt für AJAX-Updates des Menüs auf der Touch-Seite (304 wenn unverändert)"""
+    etag = make_etag('menu', date.today().isoformat(), versions.get(MENU_VERSION_KEY))
+    return conditional_json(etag, _menu_payload)
+
+
+def _menu_payload():
+    today_menu = get_today_context().menu
     if today_menu:
-        return jsonify({
+        return {
             'menu': today_menu.description if not today_menu.zwei_menues_aktiv else None,
             'zwei_menues_aktiv': today_menu.zwei_menues_aktiv,
             'menu1': today_menu.menu1_name if today_menu.zwei_menues_aktiv else None,
             'menu2': today_menu.menu2_name if today_menu.zwei_menues_aktiv else None
-        })
-    return jsonify({'menu': None, 'zwei_menues_aktiv': False})
+        }
+    return {'menu': None, 'zwei_menues_aktiv': False}
 
 @bp.route('/admin', methods=['GET', 'POST'])
 @login_required
 def admin():
-    today_menu = get_menu_for_date()
-    guest_data = get_guests_for_date()
-    guest_menu1 = guest_data['menu1']
-    guest_count = guest_data['total_count']  # Gesamt für Kompatibilität
     preset_menus = PresetMenu.get_all_ordered()
     message = session.pop('sync_message', None)
-
+    job_id = session.pop('job_id', None)
     
     if request.method == 'POST':
         # Menü speichern (neue Logik für ein oder zwei Menüs)
         if 'save_menu' in request.form:
             try:
-                today_menu = save_menu(date.today(), request.form)
+                save_menu(date.today(), request.form)
                 message = "Menü gespeichert."
             except Exception:
                 message = "Fehler beim Speichern des Menüs."
@@ -487,6 +546,8 @@ def admin():
             user_id = request.form.get('delete_user')
             user = db.session.get(User, int(user_id))
             if user:
+                # Zähler hängen per Fremdschlüssel am User (foreign_keys=ON)
+                db.session.execute(delete(UserAttendance).where(UserAttendance.user_id == user.id))
                 db.session.delete(user)
                 db.session.commit()
                 message = f"User {user.name} gelöscht."
@@ -494,49 +555,33 @@ def admin():
         elif 'csv_file' in request.files:
             file = request.files['csv_file']
             if file and file.filename and file.filename.endswith('.csv'):
+                # Import läuft als Hintergrund-Job; die Seite zeigt den Fortschritt
+                from .jobs import enqueue, upload_path
+                dry_run = bool(request.form.get('dry_run'))
                 try:
-                    reader = csv.DictReader(TextIOWrapper(file, encoding='utf-8'))
-                    count = 0
-                    skipped = 0
-                    for row in reader:
-                        name = row.get('name') or row.get('Name')
-                        personal_number = row.get('personal_number') or row.get('Personalnummer')
-                        card_id = row.get('card_id') or row.get('Karte')
-                        if name and personal_number:
-                            if not User.query.filter_by(personal_number=personal_number).first():
-                                user = User(name=name.strip(), personal_number=personal_number.strip(), card_id=(card_id or '').strip() or None)
-                                db.session.add(user)
-                                count += 1
-                            else:
-                                skipped += 1
-                    db.session.commit()
-                    message = f"{count} User importiert, {skipped} übersprungen (bereits vorhanden)."
-                    logger.info(f"CSV-Import: {count} User importiert, {skipped} übersprungen")
+                    path = upload_path(current_app, '.csv')
+                    file.save(path)
+                    job_id = enqueue('user_import', {'path': path, 'dry_run': dry_run},
+                                     created_by=session.get('portal_user') or get_remote_address(),
+                                     local=True)
+                    message = f"{'Prüfung' if dry_run else 'CSV-Import'} gestartet …"
                 except Exception as e:
-                    db.session.rollback()
                     logger.error(f"CSV-Import-Fehler: {e}")
-                    message = "Fehler beim CSV-Import. Bitte Format prüfen."
+                    message = "Fehler beim CSV-Import. Bitte erneut versuchen."
         # Gäste verwalten (nur Menü 1 in Admin, da einfaches Interface)
         elif 'guest_action' in request.form:
             action = request.form.get('guest_action')
-            guest_entry = Guest.query.filter_by(date=date.today(), menu_choice=1).first()
-            if not guest_entry:
-                guest_entry = Guest(date=date.today(), menu_choice=1, count=0)
-                db.session.add(guest_entry)
-            if action == 'add' and guest_entry.count < 50:
-                guest_entry.count += 1
-            elif action == 'remove' and guest_entry.count > 0:
-                guest_entry.count -= 1
-            elif action == 'set':
-                try:
-                    count = int(request.form.get('guest_count', 0))
-                    guest_entry.count = max(0, min(50, count))
-                except ValueError:
-                    pass
-            db.session.commit()
-            message = f"Gästezahl aktualisiert: {guest_entry.count}"
+            count = validate_integer(request.form.get('guest_count', 0)) if action == 'set' else None
+            try:
+                new_count = update_guests(date.today(), 1, action, count)
+                message = f"Gästezahl aktualisiert: {new_count}"
+            except Exception:
+                message = "Fehler beim Speichern der Gäste."
     
     # Daten NACH allen POST-Operationen neu laden
+    today = get_today_context()
+    today_menu = today.menu
+    guest_count = today.guest_count  # Gesamt für Kompatibilität
     users = User.query.order_by(User.name).all()
     registrations = Registration.query.filter_by(date=date.today()).all()
     registered_ids = {r.user_id for r in registrations}
@@ -545,6 +590,7 @@ def admin():
                          users=users, 
                          registered_ids=registered_ids, 
                          message=message, 
+                         job_id=job_id,
                          menu=today_menu, 
                          guest_count=guest_count,
                          preset_menus=preset_menus)
@@ -552,11 +598,12 @@ def admin():
 @bp.route('/admin/sync', methods=['POST'])
 @login_required
 def admin_sync():
-    """Synchronisiert Mitglieder-Daten vom Portal."""
-    from .sync import sync_kameraden
+    """Synchronisiert Mitglieder-Daten vom Portal (als Hintergrund-Job)."""
+    from .jobs import enqueue
     try:
-        created, updated = sync_kameraden()
-        session['sync_message'] = f'✅ Sync erfolgreich: {created} erstellt, {updated} aktualisiert'
+        session['job_id'] = enqueue('sync', {'full': True},
+                                    created_by=session.get('portal_user') or get_remote_address())
+        session['sync_message'] = '🔄 Sync gestartet …'
     except Exception as e:
         logger.error(f"Manueller Sync fehlgeschlagen: {e}")
         session['sync_message'] = f'❌ Sync fehlgeschlagen: {e}'
@@ -605,7 +652,13 @@ def admin_weekly():
                 if menu_date:
                     menu = Menu.query.filter_by(date=menu_date).first()
                     if menu:
-                        Registration.query.filter_by(date=menu_date).delete()
+                        removed = db.session.execute(
+                            delete(Registration).where(Registration.date == menu_date)
+                            .returning(Registration.user_id)
+                            .execution_options(synchronize_session=False)
+                        ).scalars().all()
+                        counters.clear_registrations(menu_date)
+                        attendance.apply(removed, menu_date, -1)
                         db.session.delete(menu)
                         db.session.commit()
                         message = f"Tag {menu_date.strftime('%d.%m.%Y')} gelöscht."
@@ -650,41 +703,43 @@ def admin_weekly():
 @bp.route('/rfid_scan')
 @limiter.limit("60 per minute")
 def rfid_scan():
-    with _rfid_lock:
-        card_id = last_card_id['value']
-        last_card_id['value'] = None  # Nach Abfrage löschen
-    return jsonify({'card_id': card_id})
-
-# Hintergrundthread zum Polling des RFID-Lesers
-def rfid_background():
-    from .rfid import read_rfid
-    while True:
-        try:
-            card_id = read_rfid()
-            if card_id:
-                with _rfid_lock:
-                    last_card_id['value'] = card_id
-        except Exception as e:
-            logger.error(f"RFID-Fehler: {e}")
-        time.sleep(0.1)
+    from .scan_queue import claim_next
+    # Scan aus der gemeinsamen Warteschlange (egal welcher Worker ihn gelesen hat)
+    scan = claim_next()
+    return jsonify({'card_id': scan.card_id if scan else None})
+
+# Server-Sent Events: Scans werden gepusht statt sekündlich gepollt
+# (Alias für /events?topics=scan, ältere Kiosk-Clients nutzen noch diese URL)
+@bp.route('/rfid_scan/stream')
+@limiter.limit("30 per minute")
+def rfid_scan_stream():
+    """Hält die Verbindung offen und pusht jede gescannte Karte sofort"""
+    from .events import event_stream
+    last_id = validate_integer(
+        request.headers.get('Last-Event-ID') or request.args.get('last_id'), min_value=0
+    )
+    return event_stream(['scan'], last_id)
 
-# Starte den Thread beim App-Start
-def start_rfid_thread():
-    import os
+# Starte den RFID-Reader beim App-Start (create_app) - nur ein Prozess pro Host hält den Port
+def start_rfid_thread(app):
+    port = os.environ.get('RFID_PORT', '/dev/ttyUSB0')
     # Nur starten wenn das RFID-Device existiert
-    if os.path.exists('/dev/ttyUSB0'):
-        try:
-            t = threading.Thread(target=rfid_background, daemon=True)
-            t.start()
-            logger.info("RFID-Thread gestartet")
-        except Exception as e:
-            logger.warning(f"RFID-Thread konnte nicht gestartet werden: {e}")
-    else:
+    if not os.path.exists(port):
         logger.info("RFID-Reader nicht verfügbar - Demo-Modus ohne RFID")
+        return
+
+    def _start():
+        from .rfid import start_reader
+        from .scan_queue import run_publisher
+        reader = start_reader(port=port)
+        run_publisher(app, reader)
+        logger.info("RFID-Reader gestartet")
 
-@bp.record_once
-def on_load(state):
-    start_rfid_thread()
+    from .leader import run_when_leader
+    try:
+        run_when_leader('rfid', _start)
+    except Exception as e:
+        logger.warning(f"RFID-Reader konnte nicht gestartet werden: {e}")
 
 @bp.route('/qr/<int:user_id>')
 @login_required
@@ -734,17 +789,17 @@ def example_csv():
 # Mobile Registrierung via Token
 @bp.route('/m/<token>', methods=['GET', 'POST'])
 def mobile_registration(token):
-    user = User.query.filter_by(mobile_token=token).first()
+    user = user_index.by_token(token)
     if not user:
         return render_template('invalid_token.html'), 404
     
-    today_menu = Menu.query.filter_by(date=date.today()).first()
-    registration = Registration.query.filter_by(user_id=user.id, date=date.today()).first()
-    is_registered = registration is not None
+    today_menu = get_today_context().menu
     registration_closed = today_menu and not today_menu.is_registration_open() if today_menu else False
     
     message = None
     status_type = None
+    menu_choice = None
+    state_known = False  # Anmeldestatus schon aus der Aktion bekannt?
     
     if request.method == 'POST':
         action = request.form.get('action')
@@ -753,62 +808,51 @@ def mobile_registration(token):
             if not today_menu:
                 message = "Heute ist kein Menü verfügbar"
                 status_type = "info"
-            elif today_menu and not today_menu.is_registration_open():
-                message = f"Anmeldefrist abgelaufen ({today_menu.registration_deadline} Uhr)"
-                status_type = "error"
-            elif is_registered:
-                message = "Du bist bereits angemeldet"
-                status_type = "info"
             else:
-                menu_choice = 1
-                if today_menu.zwei_menues_aktiv:
-                    try:
-                        menu_choice = int(request.form.get('menu_choice', 1))
-                    except (TypeError, ValueError):
-                        menu_choice = 1
-                    if menu_choice not in (1, 2):
-                        menu_choice = 1
-                
-                new_registration = Registration(
-                    user_id=user.id,
-                    date=date.today(),
-                    menu_choice=menu_choice
-                )
+                menu_choice = validate_integer(request.form.get('menu_choice', 1), min_value=1, max_value=2, default=1)
                 try:
-                    db.session.add(new_registration)
-                    db.session.commit()
+                    outcome = registration.register(user.id, today_menu, menu_choice)
                 except Exception:
-                    db.session.rollback()
                     message = "Datenbankfehler"
                     status_type = "error"
                 else:
-                    message = "✓ Erfolgreich angemeldet!"
-                    status_type = "success"
-                    is_registered = True
-                    registration = new_registration
+                    if outcome.status == RegistrationStatus.DEADLINE_CLOSED:
+                        message = f"Anmeldefrist abgelaufen ({today_menu.registration_deadline} Uhr)"
+                        status_type = "error"
+                    elif outcome.status == RegistrationStatus.ALREADY_REGISTERED:
+                        message = "Du bist bereits angemeldet"
+                        status_type = "info"
+                    else:
+                        message = "✓ Erfolgreich angemeldet!"
+                        status_type = "success"
+                        menu_choice = outcome.menu_choice
+                        state_known = True
                 
         elif action == 'unregister':
-            if registration:
-                try:
-                    db.session.delete(registration)
-                    db.session.commit()
-                    message = "✓ Erfolgreich abgemeldet"
-                    status_type = "info"
-                    is_registered = False
-                    registration = None
-                except Exception:
-                    db.session.rollback()
-                    message = "Datenbankfehler"
-                    status_type = "error"
+            try:
+                outcome = registration.unregister(user.id)
+            except Exception:
+                message = "Datenbankfehler"
+                status_type = "error"
             else:
-                message = "Du warst nicht angemeldet"
+                if outcome.status == RegistrationStatus.UNREGISTERED:
+                    message = "✓ Erfolgreich abgemeldet"
+                else:
+                    message = "Du warst nicht angemeldet"
                 status_type = "info"
+                state_known = True
+    
+    # Aktueller Stand für die Anzeige (nur lesen, wenn die Aktion ihn nicht liefert)
+    if not state_known:
+        menu_choice = registration.get_menu_choice(user.id)
+    is_registered = menu_choice is not None
     
     return render_template('mobile.html',
                          user=user,
+                         token=token,
                          menu=today_menu,
                          is_registered=is_registered,
-                         registration=registration,
+                         menu_choice=menu_choice,
                          registration_closed=registration_closed,
                          message=message,
                          status=status_type)
@@ -0,0 +1,149 @@
+"""
+Prozessübergreifende RFID-Scan-Warteschlange (SQLite-Tabelle).
+
+Nur ein Prozess pro Host liest den Serial-Port (Leader-Lock `rfid`) und
+veröffentlicht Scans hier. Jeder Gunicorn-Worker kann sie in Reihenfolge
+abholen; das Abholen ist ein einzelnes atomares UPDATE … RETURNING, damit
+jeder Scan höchstens einmal ausgeliefert wird.
+
+Die Zähler des Readers (`RFIDReader.stats()`) gibt es nur im Leader; der
+Publisher schreibt sie deshalb alle STATS_INTERVAL Sekunden nach
+instance/rfid_stats.json, wo `/system/info` sie in jedem Worker liest.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select, update, delete
+
+from .models import db, RFIDScan
+
+logger = logging.getLogger(__name__)
+
+# Scans, die so lange niemand abgeholt hat, werden ignoriert
+# (sonst würde ein Kiosk nach dem Aufwachen alte Karten absenden)
+SCAN_MAX_AGE = timedelta(seconds=30)
+
+# Wie lange Scans für Diagnose in der Tabelle bleiben
+SCAN_RETENTION = timedelta(hours=1)
+
+# Reader-Zähler für andere Worker (Sekunden zwischen zwei Schreibvorgängen)
+STATS_INTERVAL = 5.0
+STATS_FILE = 'rfid_stats.json'
+
+
+class QueuedScan(NamedTuple):
+    id: int
+    card_id: str
+
+
+def publish(card_id: str) -> int:
+    """
+    Scan in die Warteschlange stellen (vom RFID-Leader aufgerufen).
+
+    Returns:
+        ID des neuen Eintrags
+    """
+    scan = RFIDScan(card_id=card_id, created_at=datetime.now())
+    try:
+        db.session.add(scan)
+        # Alte Einträge im selben Commit aufräumen (Index auf created_at)
+        db.session.execute(
+            delete(RFIDScan).where(RFIDScan.created_at < datetime.now() - SCAN_RETENTION)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return scan.id
+
+
+def _pending_query(after_id: Optional[int] = None):
+    cutoff = datetime.now() - SCAN_MAX_AGE
+    query = select(RFIDScan.id).where(RFIDScan.consumed.is_(False), RFIDScan.created_at >= cutoff)
+    if after_id:
+        query = query.where(RFIDScan.id > after_id)
+    return query.order_by(RFIDScan.id).limit(1)
+
+
+def claim_next(after_id: Optional[int] = None) -> Optional[QueuedScan]:
+    """
+    Ältesten offenen Scan atomar abholen (at-most-once).
+
+    Args:
+        after_id: Nur Scans mit größerer ID (Resume nach Verbindungsabbruch)
+
+    Returns:
+        QueuedScan oder None wenn nichts ansteht
+    """
+    next_id = _pending_query(after_id).scalar_subquery()
+    stmt = (
+        update(RFIDScan)
+        .where(RFIDScan.id == next_id, RFIDScan.consumed.is_(False))
+        .values(consumed=True)
+        .returning(RFIDScan.id, RFIDScan.card_id)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        row = db.session.execute(stmt).first()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return QueuedScan(row.id, row.card_id) if row else None
+
+
+def run_publisher(app, reader) -> threading.Thread:
+    """
+    Startet den Thread, der Scans aus dem RFIDReader-Puffer in die
+    Warteschlange schreibt.
+    """
+    path = os.path.join(app.instance_path, STATS_FILE)
+
+    def _loop():
+        written = 0.0
+        while True:
+            if time.monotonic() - written >= STATS_INTERVAL:
+                written = time.monotonic()
+                try:
+                    _write_stats(path, reader)
+                except Exception as e:
+                    logger.error(f"RFID-Zähler konnten nicht geschrieben werden: {e}")
+            scan = reader.get(timeout=1.0)
+            if not scan:
+                continue
+            with app.app_context():
+                try:
+                    publish(scan.card_id)
+                except Exception as e:
+                    logger.error(f"RFID-Scan konnte nicht veröffentlicht werden: {e}")
+
+    t = threading.Thread(target=_loop, name='rfid-publisher', daemon=True)
+    t.start()
+    return t
+
+
+def _write_stats(path: str, reader):
+    """Zähler atomar ersetzen (Leser sehen nie eine halbe Datei)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {**reader.stats(), 'pid': os.getpid(), 'updated_at': datetime.now().isoformat()}
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp, path)
+
+
+def read_stats(app) -> Optional[dict]:
+    """Zuletzt vom Publisher geschriebene Reader-Zähler, None ohne RFID-Leader"""
+    try:
+        with open(os.path.join(app.instance_path, STATS_FILE)) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    age = (datetime.now() - datetime.fromisoformat(data['updated_at'])).total_seconds()
+    data['stale'] = age > 3 * STATS_INTERVAL  # Leader tot oder Publisher hängt
+    return data
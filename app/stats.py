@@ -1,127 +1,130 @@
-from flask import Blueprint, render_template, send_file
-from .models import db, User, Menu, Registration, Guest
+from flask import Blueprint, Response, jsonify, render_template, request, stream_with_context
+from sqlalchemy import select
+from .models import db, User, Menu
+from .archive import all_registrations
 from .auth import login_required
+from .readonly import route_reads
+from .rollups import get_days
+from .validation import validate_date
 from datetime import date, timedelta
-from sqlalchemy import func
 import csv
-from io import StringIO, BytesIO
+import json
 
 stats_bp = Blueprint('stats', __name__, url_prefix='/stats')
-
-
-def _build_stats_for_menus(menus):
-    """Baut Statistik-Daten für eine Liste von Menüs effizient auf."""
-    if not menus:
-        return []
-    
-    dates = [m.date for m in menus]
-    
-    # Alle Registrierungen für diese Tage in einer Query
-    reg_data = db.session.query(
-        Registration.date,
-        Registration.menu_choice,
-        func.count(Registration.id)
-    ).filter(Registration.date.in_(dates)
-    ).group_by(Registration.date, Registration.menu_choice).all()
-    
-    # Alle Gäste für diese Tage in einer Query
-    guest_data = Guest.query.filter(Guest.date.in_(dates)).all()
-    
-    # Lookup-Dicts aufbauen
-    reg_counts = {}  # {date: {menu_choice: count}}
-    for reg_date, menu_choice, count in reg_data:
-        if reg_date not in reg_counts:
-            reg_counts[reg_date] = {}
-        reg_counts[reg_date][menu_choice] = count
-    
-    guest_counts = {g.date: g.count for g in guest_data}
-    
-    days = []
-    for menu_entry in menus:
-        day = menu_entry.date
-        day_regs = reg_counts.get(day, {})
-        total_regs = sum(day_regs.values())
-        guests = guest_counts.get(day, 0)
-        
-        entry = {
-            'date': day,
-            'registrations': total_regs,
-            'guests': guests,
-            'total': total_regs + guests,
-            'menu': menu_entry.description,
-        }
-        
-        if menu_entry.zwei_menues_aktiv:
-            entry['zwei_menues'] = True
-            entry['menu1_name'] = menu_entry.menu1_name
-            entry['menu2_name'] = menu_entry.menu2_name
-            entry['menu1_count'] = day_regs.get(1, 0)
-            entry['menu2_count'] = day_regs.get(2, 0)
-        else:
-            entry['zwei_menues'] = False
-        
-        days.append(entry)
-    
-    return days
+route_reads(stats_bp)  # Auswertungen nicht über den Pool der Anmeldungen
 
 
 @stats_bp.route('/')
 @login_required
 def index():
-    """Statistik-Übersicht - nur Tage mit Menü"""
+    """Statistik-Übersicht - nur Tage mit Menü (aus den Tages-Rollups)"""
     start_date = date.today() - timedelta(days=180)
-    menus = Menu.query.filter(Menu.date >= start_date).order_by(Menu.date.desc()).limit(14).all()
-    
-    days = _build_stats_for_menus(menus)
+    days = get_days(start_date, date.max, only_with_menu=True)[:14]
     
     # Durchschnittliche Teilnehmer
-    totals = [d['total'] for d in days if d['total'] > 0]
+    totals = [d.total for d in days if d.total > 0]
     avg = sum(totals) / len(totals) if totals else 0
     
     return render_template('stats.html', days=days, average=round(avg, 1))
 
 
+# Zusammenfassung wird fensterweise aus den Rollups gelesen (konstanter Speicher)
+EXPORT_WINDOW_DAYS = 92
+# Detail-Export: so viele Zeilen holt der Cursor pro Roundtrip
+EXPORT_YIELD_PER = 1000
+
+SUMMARY_COLUMNS = ['Datum', 'Kameraden', 'Gäste', 'Gesamt', 'Menü', 'Zwei Menüs', 'Menü 1', 'Menü 1 Anzahl', 'Menü 2', 'Menü 2 Anzahl']
+DETAIL_COLUMNS = ['Datum', 'Name', 'Personalnummer', 'Menüwahl', 'Menü']
+
+
+class _Echo:
+    """Datei-Ersatz für csv.writer: gibt die formatierte Zeile direkt zurück"""
+    def write(self, value):
+        return value
+
+
+def _summary_rows(start, end):
+    """Tage mit Menü, neueste zuerst, fensterweise aus den Rollups"""
+    window_end = end
+    while window_end >= start:
+        window_start = max(start, window_end - timedelta(days=EXPORT_WINDOW_DAYS - 1))
+        for d in get_days(window_start, window_end, only_with_menu=True):
+            yield [
+                d.date.isoformat(),
+                d.registrations,
+                d.guests,
+                d.total,
+                d.menu,
+                'Ja' if d.zwei_menues else 'Nein',
+                (d.menu1_name or '') if d.zwei_menues else '',
+                d.menu1_count if d.zwei_menues else '',
+                (d.menu2_name or '') if d.zwei_menues else '',
+                d.menu2_count if d.zwei_menues else '',
+            ]
+        window_end = window_start - timedelta(days=1)
+
+
+def _detail_rows(start, end):
+    """Eine Zeile pro Anmeldung (inkl. Archiv), serverseitiger Cursor statt .all()"""
+    regs = all_registrations()
+    stmt = (
+        select(regs.c.date, User.name, User.personal_number, regs.c.menu_choice,
+               Menu.zwei_menues_aktiv, Menu.description, Menu.menu1_name, Menu.menu2_name)
+        .join(User, User.id == regs.c.user_id)
+        .outerjoin(Menu, Menu.date == regs.c.date)
+        .where(regs.c.date >= start, regs.c.date <= end)
+        .order_by(regs.c.date.desc(), User.name)
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+    for row in db.session.execute(stmt):
+        if row.zwei_menues_aktiv:
+            menu_name = row.menu2_name if row.menu_choice == 2 else row.menu1_name
+        else:
+            menu_name = row.description
+        yield [row.date.isoformat(), row.name, row.personal_number, row.menu_choice, menu_name or '']
+
+
 @stats_bp.route('/export')
 @login_required
 def export_csv():
-    """CSV-Export aller Tage mit Menü als CSV"""
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Datum', 'Kameraden', 'Gäste', 'Gesamt', 'Menü', 'Zwei Menüs', 'Menü 1', 'Menü 1 Anzahl', 'Menü 2', 'Menü 2 Anzahl'])
-    
-    start_date = date.today() - timedelta(days=365)
-    menus = Menu.query.filter(Menu.date >= start_date).order_by(Menu.date.desc()).all()
-    
-    days = _build_stats_for_menus(menus)
-    
-    for d in days:
-        if d.get('zwei_menues'):
-            writer.writerow([
-                d['date'].isoformat(),
-                d['registrations'],
-                d['guests'],
-                d['total'],
-                d['menu'],
-                'Ja',
-                d.get('menu1_name', ''),
-                d.get('menu1_count', 0),
-                d.get('menu2_name', ''),
-                d.get('menu2_count', 0)
-            ])
-        else:
-            writer.writerow([
-                d['date'].isoformat(),
-                d['registrations'],
-                d['guests'],
-                d['total'],
-                d['menu'],
-                'Nein', '', '', '', ''
-            ])
-    
-    output.seek(0)
-    return send_file(
-        BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'essensanmeldungen_{date.today()}.csv'
-    )
+    """
+    Export als Stream (CSV oder NDJSON), Speicherbedarf unabhängig vom Zeitraum.
+
+    Query-Parameter:
+        from, to: Zeitraum (YYYY-MM-DD), default die letzten 365 Tage
+        format: csv (default) oder ndjson
+        detail: 1 = eine Zeile pro Anmeldung statt pro Tag
+    """
+    end = validate_date(request.args.get('to', '')) or date.today()
+    start = validate_date(request.args.get('from', '')) or end - timedelta(days=365)
+    fmt = request.args.get('format', 'csv')
+    detail = request.args.get('detail') == '1'
+    for param in ('from', 'to'):
+        if request.args.get(param) and not validate_date(request.args[param]):
+            return jsonify({'error': f"'{param}' muss im Format YYYY-MM-DD sein"}), 400
+    if start > end:
+        return jsonify({'error': "'from' liegt nach 'to'"}), 400
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': "format muss 'csv' oder 'ndjson' sein"}), 400
+
+    columns = DETAIL_COLUMNS if detail else SUMMARY_COLUMNS
+    rows = _detail_rows(start, end) if detail else _summary_rows(start, end)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+
+        def generate():
+            yield writer.writerow(columns)
+            for row in rows:
+                yield writer.writerow(row)
+        mimetype = 'text/csv'
+    else:
+        def generate():
+            for row in rows:
+                yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+        mimetype = 'application/x-ndjson'
+
+    filename = f"essensanmeldungen_{'details_' if detail else ''}{start}_{end}.{fmt}"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
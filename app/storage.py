@@ -0,0 +1,257 @@
+"""
+Speicherprofil für SQLite: PRAGMAs, Connection-Pool und WAL-Checkpoints.
+
+Ohne PRAGMAs läuft SQLite im Rollback-Journal: ein Schreiber sperrt die
+ganze Datei auch für Leser, und parallele Anmeldungen aus mehreren Workern
+enden in "database is locked". Jede neue Verbindung bekommt deshalb:
+
+- `journal_mode=WAL`: Leser und ein Schreiber gleichzeitig
+- `synchronous=NORMAL`: in WAL sicher gegen Absturz, fsync nur beim Checkpoint
+- `busy_timeout`: auf die Schreibsperre warten statt sofort abzubrechen
+- `cache_size`/`mmap_size`: Seiten-Cache pro Verbindung, Lesen per mmap
+- `foreign_keys=ON`: Fremdschlüssel werden geprüft
+
+Der Pool einer SQLite-Datei wächst mit den Threads: Gunicorn läuft mit
+gthread und GUNICORN_THREADS Threads pro Worker, dazu halten Event-Hub,
+Scan-Publisher, Checkpoints, Sync und Job-Runner je eine Verbindung. Die
+Pool-Größe ist deshalb mindestens die Summe daraus (`pool_size_for_sqlite`),
+sonst warten Requests unter Last bis `pool_timeout` und scheitern.
+Verbindungen öffnet der Pool erst bei Bedarf, eine Datei-Verbindung ist billig.
+
+Der WAL wächst zwischen Checkpoints; der Leader ('checkpoint') setzt ihn
+regelmäßig mit `wal_checkpoint(TRUNCATE)` zurück. Alle Werte lassen sich
+per SQLITE_* überschreiben; andere Datenbanken behalten die bisherigen
+Pool-Einstellungen.
+
+Die Auswertungen lesen über eine zweite Engine mit eigenem Pool
+(`readonly_binds`, Routing in readonly.py).
+
+Anmeldungen, Scan-Queue, Jobs und Zähler nutzen `INSERT/UPDATE/DELETE ...
+RETURNING`, das SQLite erst ab 3.35 kann (Debian 12/Raspberry Pi OS
+Bookworm, Ubuntu 22.04). Ältere Bibliotheken lehnt `init_app` beim Start ab.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')  # DELETE z.B. auf Netzlaufwerken
+SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '16384'))  # pro Verbindung
+MMAP_SIZE_MB = int(os.getenv('SQLITE_MMAP_SIZE_MB', '64'))
+FOREIGN_KEYS = os.getenv('SQLITE_FOREIGN_KEYS', 'true').lower() not in ('false', '0', 'no')
+CHECKPOINT_INTERVAL = int(os.getenv('SQLITE_CHECKPOINT_INTERVAL', '300'))  # Sekunden, 0 = aus
+MIN_SQLITE_VERSION = (3, 35)  # RETURNING
+THREADS = int(os.getenv('GUNICORN_THREADS', '32'))  # Request-Threads pro Worker (gunicorn.conf.py)
+BACKGROUND_CONNECTIONS = 4  # Event-Hub, Scan-Publisher, Checkpoints, Sync (+ JOB_WORKERS)
+
+
+def is_sqlite(uri: str) -> bool:
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def _is_memory(uri: str) -> bool:
+    return make_url(uri).database in (None, '', ':memory:')
+
+
+def pragmas() -> dict:
+    """PRAGMAs für jede neue Verbindung (Reihenfolge = Ausführung)"""
+    return {
+        'busy_timeout': BUSY_TIMEOUT_MS,
+        'journal_mode': JOURNAL_MODE,
+        'synchronous': SYNCHRONOUS,
+        'cache_size': -CACHE_SIZE_KB,  # negativ = KiB statt Seiten
+        'mmap_size': MMAP_SIZE_MB * 1024 * 1024,
+        'foreign_keys': 'ON' if FOREIGN_KEYS else 'OFF',
+    }
+
+
+def apply_pragmas(dbapi_connection, readonly: bool = False):
+    """PRAGMAs auf eine rohe sqlite3-Verbindung anwenden (`readonly`: nur lesen)"""
+    settings = pragmas()
+    if readonly:
+        # Journal-Modus setzt die schreibende Engine, er gilt für die Datei
+        del settings['journal_mode']
+        settings['query_only'] = 'ON'
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in settings.items():
+            row = cursor.execute(f'PRAGMA {name}={value}').fetchone()
+            # WAL kann scheitern (z.B. Netzlaufwerk): SQLite bleibt dann still beim alten Modus
+            if name == 'journal_mode' and row and row[0].lower() != str(value).lower():
+                logger.warning(f"SQLite journal_mode={value} nicht möglich, läuft mit {row[0]}")
+    finally:
+        cursor.close()
+
+
+def background_connections() -> int:
+    """Verbindungen, die die Hintergrund-Threads eines Workers höchstens halten"""
+    from .jobs import JOB_WORKERS
+    return BACKGROUND_CONNECTIONS + JOB_WORKERS
+
+
+def pool_size_for_sqlite(pool_size: int) -> int:
+    """Pool-Größe einer SQLite-Datei: max(pool_size, GUNICORN_THREADS + Hintergrund-Threads)"""
+    return max(pool_size, THREADS + background_connections())
+
+
+def engine_options(uri: str, pool_size: int, max_overflow: int, pool_recycle: int) -> dict:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS passend zur Datenbank.
+
+    SQLite-Dateien: QueuePool ohne pre_ping und recycle (eine Datei hat keine
+    Verbindung, die abreißen kann), mindestens so groß wie die Threads eines
+    Workers (`pool_size_for_sqlite`). Jeder Thread behält seine Verbindung
+    samt Seiten-Cache; die Wartezeit auf Schreibsperren regelt busy_timeout.
+    In-Memory-SQLite braucht eine einzige geteilte Verbindung (StaticPool).
+    """
+    if not is_sqlite(uri):
+        return {
+            'pool_size': pool_size,
+            'pool_recycle': pool_recycle,
+            'pool_pre_ping': True,
+            'max_overflow': max_overflow,
+            'pool_timeout': 30
+        }
+    if _is_memory(uri):
+        return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+    return {
+        'poolclass': QueuePool,
+        'pool_size': pool_size_for_sqlite(pool_size),
+        'max_overflow': max_overflow,
+        'pool_timeout': 30,
+        'connect_args': {'check_same_thread': False},
+    }
+
+
+def readonly_binds(uri: str, replica_uri: Optional[str], pool_size: int, max_overflow: int,
+                   pool_recycle: int) -> dict:
+    """
+    SQLALCHEMY_BINDS mit der Read-Engine für die Auswertungen (readonly.py).
+
+    Leer (alles über den Primary) bei `pool_size` 0 und In-Memory-SQLite,
+    das keine zweite Verbindung auf dieselbe Datenbank zulässt.
+    """
+    from .readonly import BIND_KEY
+
+    url = replica_uri or uri
+    if pool_size <= 0 or (is_sqlite(url) and _is_memory(url)):
+        return {}
+    options = engine_options(url, pool_size, max_overflow, pool_recycle)
+    if not is_sqlite(url):
+        # Schutz gegen versehentliche Schreibzugriffe, auch ohne Replica
+        options['connect_args'] = {'options': '-c default_transaction_read_only=on'}
+    return {BIND_KEY: {'url': url, **options}}
+
+
+def init_app(app):
+    """
+    PRAGMAs für alle Verbindungen der Engines registrieren (vor dem ersten Connect).
+
+    Raises:
+        RuntimeError: SQLite-Bibliothek älter als MIN_SQLITE_VERSION
+    """
+    from .readonly import BIND_KEY
+
+    with app.app_context():
+        engines = dict(db.engines)
+    if any(engine.dialect.name == 'sqlite' for engine in engines.values()):
+        check_version()
+    for key, engine in engines.items():
+        if engine.dialect.name != 'sqlite':
+            continue
+        readonly = key == BIND_KEY
+        event.listen(engine, 'connect',
+                     lambda dbapi_connection, record, readonly=readonly: apply_pragmas(dbapi_connection, readonly))
+
+
+def check_version(version_info: tuple = sqlite3.sqlite_version_info):
+    """Start abbrechen, wenn die SQLite-Bibliothek kein RETURNING kann"""
+    if tuple(version_info[:2]) >= MIN_SQLITE_VERSION:
+        return
+    found = '.'.join(map(str, version_info))
+    required = '.'.join(map(str, MIN_SQLITE_VERSION))
+    raise RuntimeError(
+        f"SQLite {found} ist zu alt, FoodBot braucht mindestens SQLite {required} "
+        f"(RETURNING). Debian 12/Raspberry Pi OS Bookworm oder Ubuntu 22.04 "
+        f"verwenden oder PostgreSQL per DATABASE_URI (siehe DEPLOYMENT.md)."
+    )
+
+
+def settings() -> dict:
+    """Aktive Einstellungen für /system/info"""
+    from .readonly import BIND_KEY
+
+    engine = db.engine
+    info = {'dialect': engine.dialect.name, 'pool': engine.pool.status()}
+    if BIND_KEY in db.engines:
+        info['read_pool'] = db.engines[BIND_KEY].pool.status()
+    if engine.dialect.name != 'sqlite':
+        return info
+    with engine.connect() as conn:
+        for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'foreign_keys'):
+            info[name] = conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+    info['synchronous'] = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}.get(info['synchronous'], info['synchronous'])
+    database = engine.url.database
+    if database and os.path.exists(f'{database}-wal'):
+        info['wal_size_kb'] = os.path.getsize(f'{database}-wal') // 1024
+    info['checkpoint_interval'] = CHECKPOINT_INTERVAL
+    if isinstance(engine.pool, QueuePool):
+        info['pool_sizing'] = {
+            'rule': 'max(DB_POOL_SIZE, GUNICORN_THREADS + Hintergrund-Threads)',
+            'threads': THREADS,
+            'background': background_connections(),
+            'pool_size': engine.pool.size(),
+        }
+    info['sqlite_version'] = sqlite3.sqlite_version
+    return info
+
+
+def checkpoint(mode: str = 'TRUNCATE') -> Optional[tuple]:
+    """
+    WAL in die Datenbank zurückschreiben.
+
+    Returns:
+        (busy, WAL-Seiten, zurückgeschriebene Seiten) oder None ohne SQLite
+    """
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return None
+    with engine.connect() as conn:
+        return tuple(conn.exec_driver_sql(f'PRAGMA wal_checkpoint({mode})').first())
+
+
+def _run_checkpointer(app):
+    """Endlosschleife des Leaders: Checkpoint alle CHECKPOINT_INTERVAL Sekunden"""
+    stop = threading.Event()
+    while True:
+        stop.wait(CHECKPOINT_INTERVAL)
+        with app.app_context():
+            try:
+                busy, log, done = checkpoint()
+                if busy:
+                    logger.info(f"WAL-Checkpoint unvollständig (Leser aktiv): {done}/{log} Seiten")
+                else:
+                    logger.debug(f"WAL-Checkpoint: {done} Seiten")
+            except Exception as e:
+                logger.error(f"WAL-Checkpoint fehlgeschlagen: {e}")
+
+
+def start_checkpointer(app):
+    """Startet die periodischen Checkpoints (nur SQLite im WAL-Modus, ein Leader pro Host)"""
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    if dialect != 'sqlite' or CHECKPOINT_INTERVAL <= 0 or JOURNAL_MODE.upper() != 'WAL':
+        return
+    from .leader import run_when_leader
+    run_when_leader('checkpoint', lambda: _run_checkpointer(app))
@@ -1,15 +1,53 @@
 """
 Synchronisiert Kameraden-Daten vom Portal (via PostgREST).
 Kameraden mit Personalnummer werden als lokale FoodBot-User gespiegelt.
+
+Der Abgleich läuft mengenbasiert: alle lokalen User werden einmal geladen,
+der Unterschied (neu/geändert/unverändert) im Speicher berechnet und per
+executemany in einer Transaktion geschrieben. Karten, die den Besitzer
+wechseln, werden zuerst freigegeben, damit der Unique-Index auf `card_id`
+auch bei Tauschen zweier Kameraden nicht greift.
+
+Im Betrieb läuft der Sync als Hintergrundjob in genau einem Worker
+(Leader-Lock 'sync', siehe leader.py) alle `SYNC_INTERVAL` Sekunden. Er
+holt nur Kameraden hinter der Watermark in `SyncState`: dem größten Paar
+(`updated_at`, `id`) des letzten Laufs. Die `id` trennt Zeilen mit gleichem
+Zeitstempel (Massen-Update im Portal), sonst käme jede davon bei jedem Delta
+erneut. Ein Vollabgleich läuft beim ersten Mal, alle `SYNC_FULL_INTERVAL`
+Sekunden – er holt auch Zeilen nach, die mit älterem Zeitstempel erst nach
+dem Abruf committet wurden – und wenn das Portal kein `updated_at` kennt.
+Ob es die Spalte inzwischen kennt, prüft der Sync nach `SYNC_FULL_INTERVAL`
+Sekunden (oder beim Vollsync aus dem Admin) erneut.
 """
 import os
 import time
 import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
 
 logger = logging.getLogger(__name__)
 
 POSTGREST_URL = os.getenv('POSTGREST_URL', 'http://postgrest:3000')
 JWT_SECRET = os.getenv('JWT_SECRET')
+SYNC_INTERVAL = int(os.getenv('SYNC_INTERVAL', '300'))  # Sekunden zwischen zwei Läufen
+SYNC_FULL_INTERVAL = int(os.getenv('SYNC_FULL_INTERVAL', '86400'))  # Sekunden zwischen Vollabgleichen
+WATERMARK_COLUMN = os.getenv('SYNC_WATERMARK_COLUMN', 'updated_at')
+ID_COLUMN = 'id'  # Reihenfolge bei gleichem `updated_at`
+HTTP_TIMEOUT = 10
+
+STATE_NAME = 'kameraden'
+SELECT_COLUMNS = 'id,Vorname,Name,Personalnummer,KartenID,Aktiv,food_rolle'
+
+# Gesetzt, nachdem das Portal die Watermark-Spalte abgelehnt hat: bis dahin
+# nur Vollabgleiche ohne Watermark, danach (oder bei erzwungenem Vollabgleich)
+# ein neuer Versuch. None = Watermark wird genutzt
+_watermark_retry_at: Optional[datetime] = None
+
+UNDEFINED_COLUMN = '42703'  # PostgreSQL-Fehlercode, von PostgREST durchgereicht
 
 
 def _get_service_jwt():
@@ -24,61 +62,286 @@ def _get_service_jwt():
     }, JWT_SECRET, algorithm='HS256')
 
 
-def sync_kameraden():
-    """
-    Synchronisiert aktive Kameraden (mit Personalnummer) → lokale User-Tabelle.
-    Returns (created, updated) tuple.
+@dataclass
+class SyncStats:
+    """Ergebnis eines Sync-Laufs"""
+    mode: str = 'full'  # full, delta oder unchanged (304 auf den Vollabgleich)
+    fetched: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0  # Ohne Personalnummer oder doppelt geliefert
+    cards_released: int = 0  # Karte einem nicht (mehr) gelieferten User entzogen
+    fetch_ms: float = 0.0
+    apply_ms: float = 0.0
+    watermark: bool = True  # False: Portal kennt die Watermark-Spalte nicht
+
+    def __str__(self):
+        mode = self.mode if self.watermark else f'{self.mode}, ohne Watermark'
+        return (f"[{mode}] {self.created} erstellt, {self.updated} aktualisiert, {self.unchanged} unverändert, "
+                f"{self.skipped} übersprungen, {self.cards_released} Karten freigegeben "
+                f"(von {self.fetched} Kameraden; Abruf {self.fetch_ms:.0f} ms, Abgleich {self.apply_ms:.0f} ms)")
+
+
+class WatermarkUnsupported(Exception):
+    """Das Portal kennt die Watermark-Spalte nicht (PostgREST 400, Code 42703)"""
+
+
+def _undefined_column(resp) -> bool:
+    """PostgREST-Fehler 'Spalte existiert nicht' (andere 400er sind echte Fehler)"""
+    try:
+        return resp.json().get('code') == UNDEFINED_COLUMN
+    except ValueError:
+        return False
+
+
+def fetch_kameraden(since: Optional[Tuple[str, str]] = None, etag: Optional[str] = None,
+                    with_watermark: bool = True) -> Tuple[Optional[List[dict]], Optional[str]]:
     """
-    if not JWT_SECRET:
-        logger.info("JWT_SECRET nicht gesetzt — Sync übersprungen (Standalone-Modus)")
-        return 0, 0
+    Aktive Kameraden mit Personalnummer vom Portal holen.
+
+    Args:
+        since: Nur Kameraden mit (`updated_at`, `id`) > since (Delta); None = alle
+        etag: ETag des letzten Vollabgleichs (If-None-Match)
+        with_watermark: `updated_at` mitladen
+
+    Returns:
+        (Kameraden oder None bei 304, ETag der Antwort)
 
+    Raises:
+        WatermarkUnsupported: Spalte `updated_at` fehlt im Portal
+    """
     import requests as http_requests
-    from .models import db, User
 
     token = _get_service_jwt()
-    resp = http_requests.get(
-        f'{POSTGREST_URL}/Kameraden',
-        params={
-            'select': 'id,Vorname,Name,Personalnummer,KartenID,Aktiv,food_rolle',
-            'food_rolle': 'not.is.null',
-            'Personalnummer': 'not.is.null',
-            'Aktiv': 'eq.true',
-        },
-        headers={
-            'Authorization': f'Bearer {token}',
-            'Accept': 'application/json',
-        },
-        timeout=10,
-    )
+    params = {
+        'select': f'{SELECT_COLUMNS},{WATERMARK_COLUMN}' if with_watermark else SELECT_COLUMNS,
+        'food_rolle': 'not.is.null',
+        'Personalnummer': 'not.is.null',
+        'Aktiv': 'eq.true',
+    }
+    if since:
+        # Keyset statt `gte.`: bei vielen Zeilen mit gleichem Zeitstempel käme
+        # sonst jedes Delta mit all diesen Zeilen. Werte in Anführungszeichen,
+        # Zeitstempel enthalten die PostgREST-Trennzeichen '.' und ':'
+        stamp, last_id = since
+        params['or'] = (f'({WATERMARK_COLUMN}.gt."{stamp}",'
+                        f'and({WATERMARK_COLUMN}.eq."{stamp}",{ID_COLUMN}.gt."{last_id}"))')
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Accept': 'application/json',
+    }
+    if etag and not since:
+        headers['If-None-Match'] = etag
+    resp = http_requests.get(f'{POSTGREST_URL}/Kameraden', params=params, headers=headers, timeout=HTTP_TIMEOUT)
+    if resp.status_code == 304:
+        return None, etag
+    if resp.status_code == 400 and with_watermark and _undefined_column(resp):
+        raise WatermarkUnsupported(resp.text[:200])
     resp.raise_for_status()
-    kameraden = resp.json()
+    return resp.json(), resp.headers.get('ETag')
+
 
-    created, updated = 0, 0
+def _roster(kameraden: Iterable[dict], stats: SyncStats) -> Dict[str, Tuple[str, Optional[str]]]:
+    """Personalnummer → (Name, Karten-ID); doppelte Nummern/Karten: erster Eintrag gewinnt"""
+    roster = {}
+    cards = set()
     for k in kameraden:
+        stats.fetched += 1
         pn = (k.get('Personalnummer') or '').strip()
-        if not pn:
+        if not pn or pn in roster:
+            stats.skipped += 1
             continue
-
         name = f"{k.get('Vorname') or ''} {k.get('Name') or ''}".strip()
         card_id = (k.get('KartenID') or '').strip() or None
+        if card_id in cards:
+            logger.warning(f"Kameraden-Sync: Karte {card_id} doppelt im Portal, {pn} ohne Karte übernommen")
+            card_id = None
+        if card_id:
+            cards.add(card_id)
+        roster[pn] = (name, card_id)
+    return roster
+
+
+def apply_roster(kameraden: Iterable[dict], stats: Optional[SyncStats] = None) -> SyncStats:
+    """
+    Kameraden-Liste mit der User-Tabelle abgleichen (eine Transaktion).
+
+    Args:
+        kameraden: Datensätze im PostgREST-Format
+        stats: Vorbelegte Statistik (z.B. mit Abrufdauer)
+
+    Returns:
+        SyncStats
+    """
+    from .models import db, User
+    from . import dialect, versions
+    from .user_index import user_index, VERSION_KEY
+
+    stats = stats or SyncStats()
+    started = time.perf_counter()
+    roster = _roster(kameraden, stats)
 
-        user = User.query.filter_by(personal_number=pn).first()
-        if user:
-            changed = False
-            if user.name != name:
-                user.name = name
-                changed = True
-            if user.card_id != card_id:
-                user.card_id = card_id
-                changed = True
-            if changed:
-                updated += 1
+    # Mehrere App-Nodes (PostgreSQL): Abgleiche nacheinander, jeder sieht den Stand des vorigen
+    dialect.lock('foodbot.sync')
+    local = {
+        row.personal_number: row for row in db.session.execute(
+            select(User.id, User.personal_number, User.name, User.card_id)
+        )
+    }
+    card_owner = {row.card_id: row.personal_number for row in local.values() if row.card_id}
+
+    creates, updates, release = [], [], set()
+    for pn, (name, card_id) in roster.items():
+        row = local.get(pn)
+        if row is None:
+            creates.append({'name': name, 'personal_number': pn, 'card_id': card_id})
+        elif row.name != name or row.card_id != card_id:
+            updates.append({'uid': row.id, 'new_name': name, 'new_card_id': card_id})
+            if row.card_id != card_id and row.card_id:
+                release.add(row.id)
         else:
-            user = User(name=name, personal_number=pn, card_id=card_id)
-            db.session.add(user)
-            created += 1
+            stats.unchanged += 1
+            continue
+        # Karte gehört lokal noch jemand anderem, der nicht (mehr) geliefert wird
+        owner = card_owner.get(card_id)
+        if card_id and owner and owner != pn and owner not in roster:
+            release.add(local[owner].id)
+            stats.cards_released += 1
+    stats.created, stats.updated = len(creates), len(updates)
+
+    if creates or updates or release:
+        table = User.__table__
+        try:
+            # 1. Wechselnde Karten freigeben, 2. ändern, 3. neue User anlegen:
+            # so ist jede Karte zu jedem Zeitpunkt höchstens einmal vergeben
+            if release:
+                db.session.execute(
+                    update(table).where(table.c.id == bindparam('uid')).values(card_id=None),
+                    [{'uid': user_id} for user_id in release],
+                )
+            if updates:
+                db.session.execute(
+                    update(table).where(table.c.id == bindparam('uid'))
+                    .values(name=bindparam('new_name'), card_id=bindparam('new_card_id')),
+                    updates,
+                )
+            if creates:
+                db.session.execute(insert(table), creates)
+            # Bulk-Statements lösen keine Mapper-Events aus
+            versions.bump(VERSION_KEY)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        user_index.mark_stale()
+
+    stats.apply_ms = (time.perf_counter() - started) * 1000
+    return stats
+
+
+def _watermark(kameraden: Iterable[dict]) -> Optional[Tuple[str, str]]:
+    """
+    Größtes (`updated_at`, `id`) der Antwort; ISO-Zeitstempel sind als Text
+    vergleichbar. Ein Delta liefert nur Zeilen hinter der alten Watermark,
+    deren Maximum ist damit auch das neue.
+    """
+    keys = [(k[WATERMARK_COLUMN], k[ID_COLUMN]) for k in kameraden
+            if k.get(WATERMARK_COLUMN) and k.get(ID_COLUMN) is not None]
+    if not keys:
+        return None
+    stamp, last_id = max(keys)
+    return stamp, str(last_id)
+
+
+def sync_kameraden(full: bool = False) -> SyncStats:
+    """
+    Synchronisiert aktive Kameraden (mit Personalnummer) → lokale User-Tabelle.
+
+    Args:
+        full: Vollabgleich erzwingen (sonst Delta ab Watermark, wenn möglich)
 
-    db.session.commit()
-    logger.info(f"Kameraden-Sync: {created} erstellt, {updated} aktualisiert (von {len(kameraden)} Kameraden)")
-    return created, updated
+    Returns:
+        SyncStats (leer im Standalone-Modus ohne JWT_SECRET)
+    """
+    if not JWT_SECRET:
+        logger.info("JWT_SECRET nicht gesetzt — Sync übersprungen (Standalone-Modus)")
+        return SyncStats()
+
+    global _watermark_retry_at
+    from .models import db, SyncState
+
+    state = db.session.get(SyncState, STATE_NAME) or SyncState(name=STATE_NAME)
+    now = datetime.now()
+    with_watermark = _watermark_retry_at is None or full or now >= _watermark_retry_at
+    full = (full or not state.watermark or not state.watermark_id or not state.last_full_sync
+            or now - state.last_full_sync >= timedelta(seconds=SYNC_FULL_INTERVAL))
+
+    started = time.perf_counter()
+    kameraden = etag = watermark = None
+    if with_watermark:
+        try:
+            kameraden, etag = fetch_kameraden(
+                since=None if full else (state.watermark, state.watermark_id), etag=state.etag if full else None,
+            )
+            watermark = _watermark(kameraden or [])
+            _watermark_retry_at = None
+        except WatermarkUnsupported as e:
+            _watermark_retry_at = now + timedelta(seconds=SYNC_FULL_INTERVAL)
+            logger.warning(f"Kameraden-Sync: Portal kennt '{WATERMARK_COLUMN}' nicht, nur Vollabgleich "
+                           f"bis {_watermark_retry_at:%d.%m.%Y %H:%M} ({e})")
+            with_watermark = False
+    if not with_watermark:
+        full = True
+        kameraden, etag = fetch_kameraden(etag=state.etag, with_watermark=False)
+    stats = SyncStats(mode='full' if full else 'delta', fetch_ms=(time.perf_counter() - started) * 1000,
+                      watermark=with_watermark)
+
+    if kameraden is None:
+        stats.mode = 'unchanged'
+    else:
+        apply_roster(kameraden, stats)
+
+    try:
+        state = db.session.merge(state)
+        state.last_sync = now
+        if full:
+            state.last_full_sync = now
+            if kameraden is not None:
+                state.etag = etag
+                state.watermark, state.watermark_id = watermark or (None, None)
+        elif watermark:
+            state.watermark, state.watermark_id = watermark
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Kameraden-Sync: {stats}")
+    return stats
+
+
+def _run_scheduler(app):
+    """Endlosschleife des Leaders: Sync alle SYNC_INTERVAL Sekunden"""
+    stop = threading.Event()
+    while True:
+        with app.app_context():
+            try:
+                sync_kameraden()
+            except Exception as e:
+                logger.error(f"Kameraden-Sync fehlgeschlagen: {e}")
+            finally:
+                from .models import db
+                db.session.remove()
+        stop.wait(SYNC_INTERVAL)
+
+
+def start_scheduler(app):
+    """
+    Startet den Hintergrund-Sync (ein Leader pro Host, blockiert den Start nicht).
+    Ohne JWT_SECRET (Standalone-Modus) passiert nichts.
+    """
+    if not JWT_SECRET or SYNC_INTERVAL <= 0:
+        logger.info("Kameraden-Sync im Hintergrund deaktiviert")
+        return
+    from .leader import run_when_leader
+    run_when_leader('sync', lambda: _run_scheduler(app))
@@ -3,9 +3,12 @@ import subprocess
 import os
 import logging
 from datetime import datetime
-from flask import Blueprint, jsonify, request, render_template
+from flask import Blueprint, current_app, jsonify, request, render_template, url_for
 from .auth import login_required
-from .models import db, AdminLog
+from .models import db, AdminLog, Job
+from .pagination import count, keyset, request_args
+from . import migrations, storage
+from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 system_bp = Blueprint('system', __name__, url_prefix='/system')
@@ -19,10 +22,11 @@ def health_check():
         db_status = 'connected'
         
         # Optional: Check table counts
-        from .models import User, Menu, Registration
+        from .models import User, Menu, Registration, RegistrationArchive
         user_count = User.query.count()
         menu_count = Menu.query.count()
         reg_count = Registration.query.count()
+        archived_count = RegistrationArchive.query.count()
         
         health_data = {
             'status': 'healthy',
@@ -31,7 +35,8 @@ def health_check():
             'stats': {
                 'users': user_count,
                 'menus': menu_count,
-                'registrations': reg_count
+                'registrations': reg_count,
+                'registrations_archived': archived_count
             }
         }
         return jsonify(health_data), 200
@@ -106,38 +111,41 @@ def git_update():
             'message': 'Interner Fehler beim Update'
         })
 
+def backup_database(admin_user=None, progress=None):
+    """
+    Datenbank-Backup nach backups/ schreiben (läuft als Job, siehe jobs.py)
+    
+    SQLite: Online-Backup, geprüft und gzip-komprimiert; PostgreSQL:
+    `pg_dump` im Custom-Format (wiederherstellen mit `pg_restore`).
+    Details und Aufbewahrung: backup.py
+    
+    Returns:
+        backup.Backup (Pfad, Größe, Dauer, gelöschte alte Backups)
+    """
+    from .backup import create
+    result = create(progress)
+    
+    # Log
+    AdminLog(
+        admin_user=admin_user or 'system',
+        action='backup_created',
+        details=f"Backup: {result}"
+    ).save()
+    return result
+
 @system_bp.route('/backup', methods=['POST'])
 @login_required
 def create_backup():
-    """Datenbank-Backup erstellen"""
+    """Datenbank-Backup als Hintergrund-Job starten (Status: /system/jobs/<id>)"""
     try:
-        from flask import current_app
-        # DB-Pfad aus SQLAlchemy Config extrahieren
-        db_uri = current_app.config['SQLALCHEMY_DATABASE_URI']
-        db_path = db_uri.replace('sqlite:///', '')
-        if not os.path.isabs(db_path):
-            db_path = os.path.join(current_app.instance_path, os.path.basename(db_path))
-        
-        backup_dir = 'backups'
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = os.path.join(backup_dir, f'foodbot_{timestamp}.db')
-        
-        import shutil
-        shutil.copy2(db_path, backup_path)
-        
-        # Log
-        AdminLog(
-            admin_user=request.remote_addr,
-            action='backup_created',
-            details=f"Backup: {backup_path}"
-        ).save()
-        
+        from .jobs import enqueue
+        job_id = enqueue('backup', created_by=request.remote_addr)
         return jsonify({
             'success': True,
-            'message': f'Backup erstellt: {backup_path}'
-        })
+            'message': 'Backup gestartet',
+            'job_id': job_id,
+            'status_url': url_for('system.get_job', job_id=job_id)
+        }), 202
         
     except Exception as e:
         logger.error(f"Backup-Fehler: {e}")
@@ -146,19 +154,82 @@ def create_backup():
             'message': 'Interner Fehler beim Backup'
         })
 
+@system_bp.route('/jobs', methods=['GET'])
+@login_required
+def list_jobs():
+    """Hintergrund-Jobs, neueste zuerst (Cursor-Pagination: ?after=<next_cursor>&limit=, ?status=)"""
+    from .jobs import as_dict
+    order_by = [Job.id]
+    try:
+        after, limit = request_args(order_by, default_limit=20)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    stmt = select(Job)
+    if request.args.get('status'):
+        stmt = stmt.where(Job.status == request.args['status'])
+    page = keyset(stmt, order_by=order_by, after=after, limit=limit, descending=True,
+                  key=lambda row: (row.Job.id,))
+    return jsonify({
+        'jobs': [as_dict(job) for job, in page.items],
+        'next_cursor': page.next_cursor,
+        'limit': limit
+    })
+
+@system_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    """Status, Fortschritt und Ergebnis eines Jobs"""
+    from .jobs import as_dict, get
+    job = get(job_id)
+    if not job:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    return jsonify(as_dict(job))
+
+@system_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    """Job abbrechen (laufende Jobs beim nächsten Fortschritts-Schritt)"""
+    from .jobs import cancel
+    if not cancel(job_id):
+        return jsonify({'success': False, 'message': 'Job läuft nicht (mehr)'}), 409
+    AdminLog(
+        admin_user=request.remote_addr,
+        action='job_cancelled',
+        details=f"Job {job_id}"
+    ).save()
+    return jsonify({'success': True, 'message': 'Abbruch angefordert'})
+
 @system_bp.route('/logs', methods=['GET'])
 @login_required
 def get_admin_logs():
-    """Admin-Log anzeigen"""
-    logs = AdminLog.query.order_by(AdminLog.timestamp.desc()).limit(100).all()
-    return jsonify({
+    """Admin-Log anzeigen, neueste zuerst (Cursor-Pagination: ?after=<next_cursor>&limit=, ?total=1)"""
+    # Sortiert nach ID: steigt mit dem Zeitstempel und ist eindeutig; ein
+    # Cursor auf `timestamp` scheitert an den gemischten Formaten von
+    # func.now() und Python-Datetimes in SQLite
+    order_by = [AdminLog.id]
+    try:
+        after, limit = request_args(order_by, default_limit=100)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    stmt = select(AdminLog)
+    page = keyset(stmt, order_by=order_by, after=after, limit=limit, descending=True,
+                  key=lambda row: (row.AdminLog.id,))
+    
+    result = {
         'logs': [{
-            'timestamp': log.timestamp.isoformat(),
+            'timestamp': log.timestamp.isoformat() if log.timestamp else None,
             'admin': log.admin_user,
             'action': log.action,
             'details': log.details
-        } for log in logs]
-    })
+        } for log, in page.items],
+        'next_cursor': page.next_cursor,
+        'limit': limit
+    }
+    if request.args.get('total') == '1':
+        result['total'] = count(stmt)
+    return jsonify(result)
 
 @system_bp.route('/info', methods=['GET'])
 @login_required
@@ -180,10 +251,16 @@ def system_info():
             text=True
         )
         
+        # Reader läuft nur im RFID-Leader; die Zähler kommen aus dessen Datei
+        from .scan_queue import read_stats
+        
         return jsonify({
             'git_version': git_result.stdout.strip(),
             'disk_space': disk_result.stdout,
-            'python_version': subprocess.run(['python3', '--version'], capture_output=True, text=True).stdout.strip()
+            'python_version': subprocess.run(['python3', '--version'], capture_output=True, text=True).stdout.strip(),
+            'rfid': read_stats(current_app),
+            'database': storage.settings(),
+            'schema': {'version': migrations.current_version(), 'latest': migrations.LATEST}
         })
         
     except Exception as e:
@@ -0,0 +1,126 @@
+"""
+Tageskontext: Menü, geparste Anmeldefrist und Gästezahlen für heute.
+
+Fast jeder Request braucht diese Daten. Statt sie jedes Mal aus `Menu` und
+`Guest` zu laden, hält jeder Worker einen Snapshot, der über die
+Versionsstempel 'menu' und 'guests' (siehe versions.py) invalidiert wird.
+Der Datumswechsel um Mitternacht ist Teil des Cache-Schlüssels.
+"""
+from dataclasses import dataclass
+from datetime import date as date_type, datetime, time as time_type
+from typing import Optional
+
+from sqlalchemy import event, select
+
+from . import versions
+from .models import db, Menu, Guest
+
+MENU_VERSION_KEY = 'menu'
+GUESTS_VERSION_KEY = 'guests'
+
+
+@dataclass(frozen=True)
+class MenuSnapshot:
+    """Unveränderliche Kopie eines Menüs (gleiche Attribute wie `Menu`)"""
+    date: date_type
+    description: str
+    zwei_menues_aktiv: bool
+    menu1_name: Optional[str]
+    menu2_name: Optional[str]
+    registration_deadline: Optional[str]
+    deadline_enabled: bool
+    deadline_time: Optional[time_type]  # Einmalig geparst statt strptime pro Aufruf
+
+    @classmethod
+    def from_menu(cls, menu: Menu) -> 'MenuSnapshot':
+        try:
+            deadline_time = datetime.strptime(menu.registration_deadline, '%H:%M').time()
+        except (TypeError, ValueError):
+            deadline_time = None
+        return cls(
+            date=menu.date,
+            description=menu.description,
+            zwei_menues_aktiv=bool(menu.zwei_menues_aktiv),
+            menu1_name=menu.menu1_name,
+            menu2_name=menu.menu2_name,
+            registration_deadline=menu.registration_deadline,
+            deadline_enabled=bool(menu.deadline_enabled),
+            deadline_time=deadline_time,
+        )
+
+    @property
+    def menu1(self):
+        """Für Kompatibilität: menu1_name oder description"""
+        return self.menu1_name or self.description
+
+    @property
+    def menu2(self):
+        """Zweites Menü oder None"""
+        return self.menu2_name if self.zwei_menues_aktiv else None
+
+    def is_registration_open(self, now: Optional[datetime] = None) -> bool:
+        """Prüft ob Anmeldefrist noch offen ist"""
+        if not self.deadline_enabled or self.deadline_time is None:
+            return True
+        now = now or datetime.now()
+        if now.date() != self.date:
+            return True  # Andere Tage immer offen
+        return now.time() < self.deadline_time
+
+
+@dataclass(frozen=True)
+class TodayContext:
+    """Alles, was die heißen Endpunkte über den heutigen Tag wissen müssen"""
+    date: date_type
+    menu: Optional[MenuSnapshot]
+    guests_menu1: int
+    guests_menu2: int
+
+    @property
+    def guest_count(self) -> int:
+        return self.guests_menu1 + self.guests_menu2
+
+
+# (Schlüssel, Kontext) als ein Tupel, damit beide immer zusammenpassen
+_cache: Optional[tuple] = None
+
+
+def _build(today: date_type) -> TodayContext:
+    menu = Menu.query.filter_by(date=today).first()
+    guests = dict(db.session.execute(
+        select(Guest.menu_choice, Guest.count).where(Guest.date == today)
+    ).all())
+    return TodayContext(
+        date=today,
+        menu=MenuSnapshot.from_menu(menu) if menu else None,
+        guests_menu1=guests.get(1) or 0,
+        guests_menu2=guests.get(2) or 0,
+    )
+
+
+def get_today_context() -> TodayContext:
+    """Tageskontext aus dem Cache (Neuaufbau bei Tageswechsel oder neuer Version)"""
+    global _cache
+    today = date_type.today()
+    # Stempel VOR den Daten lesen (siehe UserIndex.rebuild)
+    key = (today, versions.get(MENU_VERSION_KEY), versions.get(GUESTS_VERSION_KEY))
+    cached = _cache
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    ctx = _build(today)
+    _cache = (key, ctx)
+    return ctx
+
+
+@event.listens_for(Menu, 'after_insert')
+@event.listens_for(Menu, 'after_update')
+@event.listens_for(Menu, 'after_delete')
+def _menu_changed(mapper, connection, target):
+    versions.bump(MENU_VERSION_KEY, connection)
+
+
+@event.listens_for(Guest, 'after_insert')
+@event.listens_for(Guest, 'after_update')
+@event.listens_for(Guest, 'after_delete')
+def _guests_changed(mapper, connection, target):
+    versions.bump(GUESTS_VERSION_KEY, connection)
@@ -0,0 +1,212 @@
+"""
+CSV-Import von Usern (Admin-Seite).
+
+Die Datei wird zeilenweise gelesen und in Blöcken verarbeitet: jede Zeile
+läuft durch validation.py, Personalnummern und Karten-IDs eines Blocks
+werden mit je einer `IN (...)`-Query gegen die Datenbank geprüft, gültige
+Zeilen per executemany eingefügt und pro Block committet. Eine fehlerhafte
+Zeile verwirft damit nicht mehr die ganze Datei; der Bericht nennt jede
+abgelehnte Zeile mit Grund. Im Dry-Run wird alles geprüft, aber nichts
+geschrieben.
+"""
+import csv
+import logging
+import time
+from dataclasses import dataclass, field
+from io import TextIOWrapper
+from typing import IO, Callable, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from . import versions
+from .models import db, User
+from .user_index import user_index, VERSION_KEY
+from .validation import validate_card_id, validate_name, validate_personal_number
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500  # Zeilen pro Block (SQLite: max. 999 Parameter pro IN-Query)
+
+
+@dataclass
+class RowError:
+    line: int  # Zeilennummer in der Datei (Kopfzeile = 1)
+    personal_number: Optional[str]
+    reason: str
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool = False
+    rows: int = 0
+    imported: int = 0  # Im Dry-Run: würden importiert
+    skipped: int = 0  # Personalnummer existiert bereits
+    errors: List[RowError] = field(default_factory=list)
+    duration_ms: float = 0.0
+
+    def __str__(self):
+        verb = 'würden importiert' if self.dry_run else 'importiert'
+        return (f"{self.imported} User {verb}, {self.skipped} übersprungen (bereits vorhanden), "
+                f"{len(self.errors)} fehlerhaft (von {self.rows} Zeilen, {self.duration_ms:.0f} ms)")
+
+
+def _column(row: dict, *names: str) -> str:
+    for name in names:
+        if row.get(name):
+            return row[name]
+    return ''
+
+
+class _Importer:
+    def __init__(self, dry_run: bool):
+        self.report = ImportReport(dry_run=dry_run)
+        self.seen_numbers = {}  # Personalnummer → Zeile (Duplikate innerhalb der Datei)
+        self.seen_cards = {}  # Karten-ID → Zeile
+
+    def error(self, line: int, personal_number: Optional[str], reason: str):
+        self.report.errors.append(RowError(line, personal_number, reason))
+
+    def parse(self, line: int, row: dict) -> Optional[dict]:
+        """Zeile validieren; None bei Fehler (wird im Bericht vermerkt)"""
+        raw_pn = _column(row, 'personal_number', 'Personalnummer').strip()
+        personal_number = validate_personal_number(raw_pn)
+        if not personal_number:
+            self.error(line, raw_pn or None, 'Ungültige oder fehlende Personalnummer')
+            return None
+        name = validate_name(_column(row, 'name', 'Name'))
+        if not name:
+            self.error(line, personal_number, 'Ungültiger oder fehlender Name')
+            return None
+        raw_card = _column(row, 'card_id', 'Karte').strip()
+        card_id = validate_card_id(raw_card) if raw_card else None
+        if raw_card and not card_id:
+            self.error(line, personal_number, f'Ungültige Karten-ID: {raw_card}')
+            return None
+
+        if personal_number in self.seen_numbers:
+            self.error(line, personal_number, f'Personalnummer doppelt in Datei (Zeile {self.seen_numbers[personal_number]})')
+            return None
+        self.seen_numbers[personal_number] = line
+        if card_id:
+            if card_id in self.seen_cards:
+                self.error(line, personal_number, f'Karten-ID doppelt in Datei (Zeile {self.seen_cards[card_id]})')
+                return None
+            self.seen_cards[card_id] = line
+        return {'line': line, 'name': name, 'personal_number': personal_number, 'card_id': card_id}
+
+    def flush(self, batch: List[dict]):
+        """Block gegen die Datenbank prüfen und einfügen (ein Commit)"""
+        if not batch:
+            return
+        numbers = [r['personal_number'] for r in batch]
+        cards = [r['card_id'] for r in batch if r['card_id']]
+        existing_numbers = set(db.session.execute(
+            select(User.personal_number).where(User.personal_number.in_(numbers))
+        ).scalars())
+        used_cards = dict(db.session.execute(
+            select(User.card_id, User.personal_number).where(User.card_id.in_(cards))
+        ).all()) if cards else {}
+
+        rows = []
+        for r in batch:
+            if r['personal_number'] in existing_numbers:
+                self.report.skipped += 1
+            elif r['card_id'] in used_cards:
+                self.error(r['line'], r['personal_number'],
+                           f"Karten-ID {r['card_id']} gehört bereits {used_cards[r['card_id']]}")
+            else:
+                rows.append(r)
+        if not rows:
+            return
+        if self.report.dry_run:
+            self.report.imported += len(rows)
+            return
+
+        values = [{k: r[k] for k in ('name', 'personal_number', 'card_id')} for r in rows]
+        try:
+            db.session.execute(insert(User), values)
+            versions.bump(VERSION_KEY)
+            db.session.commit()
+            self.report.imported += len(rows)
+        except IntegrityError:
+            # Parallel angelegt: Zeilen einzeln einfügen, um die Übeltäter zu finden
+            db.session.rollback()
+            self._insert_one_by_one(rows)
+
+    def _insert_one_by_one(self, rows: List[dict]):
+        for r in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(User), [{k: r[k] for k in ('name', 'personal_number', 'card_id')}])
+                self.report.imported += 1
+            except IntegrityError:
+                self.error(r['line'], r['personal_number'], 'Personalnummer oder Karten-ID bereits vergeben')
+        try:
+            versions.bump(VERSION_KEY)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def import_csv(stream: IO[bytes], dry_run: bool = False, batch_size: int = BATCH_SIZE,
+               progress: Optional[Callable[[int], None]] = None) -> ImportReport:
+    """
+    User aus einer CSV-Datei importieren.
+
+    Spalten: `name`/`Name`, `personal_number`/`Personalnummer`,
+    optional `card_id`/`Karte`. Bestehende Personalnummern werden
+    übersprungen, nicht geändert.
+
+    Args:
+        stream: Binärer Datei-Stream (z.B. Upload)
+        dry_run: Nur prüfen, nichts schreiben
+        batch_size: Zeilen pro Block
+        progress: Wird nach jedem Block mit der Zahl gelesener Zeilen
+            aufgerufen (Job-Fortschritt, siehe jobs.py)
+
+    Returns:
+        ImportReport mit allen abgelehnten Zeilen
+
+    Raises:
+        ValueError: Kopfzeile fehlt oder ist nicht lesbar
+    """
+    started = time.perf_counter()
+    importer = _Importer(dry_run)
+    text = TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(text)
+        try:
+            if not reader.fieldnames:
+                raise ValueError("CSV-Datei ist leer")
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValueError(f"CSV-Datei nicht lesbar: {e}")
+        batch = []
+        try:
+            for row in reader:
+                importer.report.rows += 1
+                parsed = importer.parse(reader.line_num, row)
+                if parsed:
+                    batch.append(parsed)
+                if len(batch) >= batch_size:
+                    importer.flush(batch)
+                    batch = []
+                    if progress:
+                        progress(importer.report.rows)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Bis hierhin gelesene Zeilen trotzdem verarbeiten
+            importer.error(reader.line_num + 1, None, f"Datei ab hier nicht lesbar: {e}")
+        importer.flush(batch)
+        if progress:
+            progress(importer.report.rows)
+    finally:
+        text.detach()
+        if importer.report.imported and not dry_run:
+            user_index.mark_stale()
+
+    report = importer.report
+    report.errors.sort(key=lambda e: e.line)
+    report.duration_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"CSV-Import{' (Dry-Run)' if dry_run else ''}: {report}")
+    return report
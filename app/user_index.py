@@ -0,0 +1,109 @@
+"""
+Prozesslokaler Index Karten-ID / Personalnummer / Mobile-Token → User.
+
+Der Badge-zu-User-Schritt bei jedem Scan wird damit ein Dict-Lookup statt
+einer ORM-Query. Änderungen an `User` erhöhen über Mapper-Events den
+Versionsstempel 'users' (siehe versions.py); jeder Worker baut seinen Index
+neu auf, sobald sich der Stempel ändert.
+"""
+import logging
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import event, select
+
+from . import versions
+from .models import db, User
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'users'
+
+
+class IndexedUser(NamedTuple):
+    """Schlanke User-Sicht für Scans (keine ORM-Instanz)"""
+    id: int
+    name: str
+    personal_number: str
+
+
+class UserIndex:
+    """Dict-basierter Lookup-Index, invalidiert über den Versionsstempel"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._by_card: Dict[str, IndexedUser] = {}
+        self._by_personal_number: Dict[str, IndexedUser] = {}
+        self._by_token: Dict[str, IndexedUser] = {}
+        self._by_id: Dict[int, IndexedUser] = {}
+
+    def rebuild(self):
+        """Index komplett aus der Datenbank neu aufbauen"""
+        # Stempel VOR den Daten lesen: ein paralleler Commit führt höchstens
+        # zu einem weiteren Rebuild, nie zu veralteten Daten
+        version = versions.get(VERSION_KEY)
+        rows = db.session.execute(
+            select(User.id, User.name, User.personal_number, User.card_id, User.mobile_token)
+        ).all()
+        by_card, by_pn, by_token, by_id = {}, {}, {}, {}
+        for row in rows:
+            entry = IndexedUser(row.id, row.name, row.personal_number)
+            by_id[row.id] = entry
+            by_pn[row.personal_number] = entry
+            if row.card_id:
+                by_card[row.card_id] = entry
+            if row.mobile_token:
+                by_token[row.mobile_token] = entry
+        with self._lock:
+            self._by_card, self._by_personal_number, self._by_token = by_card, by_pn, by_token
+            self._by_id = by_id
+            self._version = version
+        logger.debug(f"User-Index neu aufgebaut: {len(rows)} User (Version {version})")
+
+    def mark_stale(self):
+        """Lokalen Index beim nächsten Zugriff neu aufbauen"""
+        with self._lock:
+            self._version = None
+
+    def _ensure_fresh(self):
+        if self._version is None or self._version != versions.get(VERSION_KEY):
+            self.rebuild()
+
+    def by_card(self, card_id: str) -> Optional[IndexedUser]:
+        self._ensure_fresh()
+        return self._by_card.get(card_id)
+
+    def by_personal_number(self, personal_number: str) -> Optional[IndexedUser]:
+        self._ensure_fresh()
+        return self._by_personal_number.get(personal_number)
+
+    def by_token(self, token: str) -> Optional[IndexedUser]:
+        self._ensure_fresh()
+        return self._by_token.get(token)
+
+    def by_id(self, user_id: int) -> Optional[IndexedUser]:
+        self._ensure_fresh()
+        return self._by_id.get(user_id)
+
+    def __len__(self) -> int:
+        self._ensure_fresh()
+        return len(self._by_id)
+
+
+user_index = UserIndex()
+
+
+def invalidate():
+    """Nach Bulk-Änderungen ohne ORM-Events (Sync, CSV-Import) aufrufen"""
+    versions.invalidate(VERSION_KEY)
+    user_index.mark_stale()
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    # Im selben Flush/Commit wie die Änderung: andere Worker sehen beides zusammen
+    versions.bump(VERSION_KEY, connection)
+    user_index.mark_stale()
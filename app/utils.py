@@ -1,4 +1,5 @@
-from .models import db, User, Menu, Registration, Guest
+from .models import db, User, Menu, Guest
+from . import counters
 from datetime import date as date_type
 from contextlib import contextmanager
 from typing import Optional, Dict, Any
@@ -78,6 +79,37 @@ def get_guests_for_date(target_date: Optional[date_type] = None) -> Dict[str, An
     }
 
 
+def update_guests(target_date: date_type, menu_choice: int, action: str, count: Optional[int] = None) -> int:
+    """
+    Gästezahl für ein Datum und Menü ändern (Küche und Admin).
+    
+    Args:
+        target_date: date object
+        menu_choice: 1 oder 2
+        action: 'add', 'remove' oder 'set'
+        count: Neue Anzahl bei action='set'
+    
+    Returns:
+        Neue Gästezahl
+    """
+    guest_entry = Guest.query.filter_by(date=target_date, menu_choice=menu_choice).first()
+    if not guest_entry:
+        guest_entry = Guest(date=target_date, menu_choice=menu_choice, count=0)
+        db.session.add(guest_entry)
+    
+    if action == 'add' and guest_entry.count < 50:
+        guest_entry.count += 1
+    elif action == 'remove' and guest_entry.count > 0:
+        guest_entry.count -= 1
+    elif action == 'set' and count is not None:
+        guest_entry.count = max(0, min(50, count))
+    
+    with db_transaction():
+        # Tageszähler im selben Commit nachziehen
+        counters.set_guests(target_date, menu_choice, guest_entry.count)
+    return guest_entry.count
+
+
 def save_menu(menu_date: date_type, form_data: Dict[str, Any], field_prefix: str = '') -> Menu:
     """
     Menü speichern/aktualisieren. Einheitliche Logik für Admin, Kitchen und Weekly.
@@ -154,7 +186,7 @@ def save_menu(menu_date: date_type, form_data: Dict[str, Any], field_prefix: str
 
 def register_user_for_today(user: User, menu_choice: int = 1) -> bool:
     """
-    An-/Abmeldung eines Users für heute (Toggle).
+    An-/Abmeldung eines Users für heute (Toggle, ohne Frist-/Menüprüfung).
     
     Args:
         user: User-Objekt
@@ -166,17 +198,9 @@ def register_user_for_today(user: User, menu_choice: int = 1) -> bool:
     Raises:
         Exception: Bei Datenbankfehlern
     """
+    from .registration import toggle
     try:
-        existing = Registration.query.filter_by(user_id=user.id, date=date_type.today()).first()
-        if existing:
-            with db_transaction():
-                db.session.delete(existing)
-            return False  # Abgemeldet
-        else:
-            reg = Registration(user_id=user.id, date=date_type.today(), menu_choice=menu_choice)
-            with db_transaction():
-                db.session.add(reg)
-            return True  # Angemeldet
+        return toggle(user.id, menu_choice=menu_choice).registered
     except Exception as e:
         logger.error(f"Fehler bei Registrierung für User {user.id}: {e}")
         raise
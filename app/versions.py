@@ -0,0 +1,62 @@
+"""
+Prozessübergreifende Versionsstempel für In-Memory-Caches.
+
+Jeder Gunicorn-Worker hält eigene Caches. Schreibende Stellen erhöhen in
+derselben Transaktion einen Zähler in `data_version`; Leser vergleichen ihn
+mit dem Stand ihres Caches und laden bei Abweichung neu. Innerhalb eines
+Requests werden alle Stempel nur einmal gelesen.
+"""
+from typing import Dict
+
+from flask import g, has_app_context
+from sqlalchemy import select
+
+from .dialect import insert
+from .models import db, DataVersion
+
+_G_KEY = '_data_versions'
+
+
+def bump(key: str, connection=None):
+    """
+    Erhöht den Versionsstempel `key` (ohne Commit).
+
+    Args:
+        key: Name des Caches (z.B. 'users')
+        connection: Connection aus einem Mapper-Event; sonst db.session
+    """
+    stmt = insert(DataVersion, connection).values(key=key, version=1).on_conflict_do_update(
+        index_elements=[DataVersion.key],
+        set_={'version': DataVersion.version + 1},
+    )
+    if connection is not None:
+        connection.execute(stmt)
+    else:
+        db.session.execute(stmt)
+    # Request-Cache verwerfen, damit dieser Request den neuen Stand sieht
+    if has_app_context():
+        g.pop(_G_KEY, None)
+
+
+def current() -> Dict[str, int]:
+    """Alle Versionsstempel (pro Request/App-Kontext nur eine Query)"""
+    versions = g.get(_G_KEY)
+    if versions is None:
+        versions = dict(db.session.execute(select(DataVersion.key, DataVersion.version)).all())
+        g.setdefault(_G_KEY, versions)
+    return versions
+
+
+def get(key: str) -> int:
+    """Aktueller Versionsstempel `key` (0 wenn nie erhöht)"""
+    return current().get(key, 0)
+
+
+def invalidate(key: str):
+    """Stempel erhöhen und sofort committen (nach Bulk-Operationen ohne ORM-Events)"""
+    try:
+        bump(key)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
@@ -14,7 +14,12 @@ backlog = 2048
 
 # Worker Prozesse
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# gthread: offene Event-Streams (/events) belegen nur einen Thread. Ein idle
+# Stream wartet nur auf den Event-Hub (kein CPU, keine DB), daher viele Threads
+# pro Worker. `timeout` ist bei gthread der Worker-Heartbeat, nicht die
+# Request-Dauer – lange Streams sind unkritisch.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
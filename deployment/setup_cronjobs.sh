@@ -19,18 +19,19 @@ echo "Python Path: $PYTHON_PATH"
 echo ""
 
 # Backup Cronjob: Täglich um 00:30 Uhr
-BACKUP_CRON="30 0 * * * $PYTHON_PATH $PROJECT_DIR/backup_db.py >> /var/log/foodbot/backup.log 2>&1"
+BACKUP_CRON="30 0 * * * cd $PROJECT_DIR && PYTHONPATH=$PROJECT_DIR $PYTHON_PATH scripts/backup_db.py >> /var/log/foodbot/backup.log 2>&1"
 
-# Reset Cronjob: Täglich um 00:00 Uhr
-RESET_CRON="0 0 * * * $PYTHON_PATH $PROJECT_DIR/clear_registrations.py >> /var/log/foodbot/reset.log 2>&1"
+# Rotation: Täglich um 00:05 Uhr abgeschlossene Tage ins Archiv verschieben
+# (ersetzt das frühere Löschen aller Anmeldungen um 00:00 Uhr)
+ROTATE_CRON="5 0 * * * cd $PROJECT_DIR && PYTHONPATH=$PROJECT_DIR $PYTHON_PATH scripts/rotate_registrations.py >> /var/log/foodbot/rotate.log 2>&1"
 
 echo "Cronjobs werden eingerichtet:"
 echo ""
 echo "1. Backup (täglich 00:30 Uhr):"
 echo "   $BACKUP_CRON"
 echo ""
-echo "2. Reset (täglich 00:00 Uhr):"
-echo "   $RESET_CRON"
+echo "2. Archiv-Rotation (täglich 00:05 Uhr):"
+echo "   $ROTATE_CRON"
 echo ""
 
 # Log-Verzeichnis erstellen
@@ -48,7 +49,8 @@ echo ""
 
 # Neue Cronjobs hinzufügen (nur wenn nicht bereits vorhanden)
 (crontab -l 2>/dev/null | grep -v "backup_db.py"; echo "$BACKUP_CRON") | crontab -
-(crontab -l 2>/dev/null | grep -v "clear_registrations.py"; echo "$RESET_CRON") | crontab -
+# Alten Reset-Job (clear_registrations.py) dabei entfernen
+(crontab -l 2>/dev/null | grep -v "clear_registrations.py" | grep -v "rotate_registrations.py"; echo "$ROTATE_CRON") | crontab -
 
 echo "✓ Cronjobs installiert"
 echo ""
@@ -60,8 +62,8 @@ echo "✅ Setup abgeschlossen!"
 echo ""
 echo "Die Logs finden sich in:"
 echo "  - /var/log/foodbot/backup.log"
-echo "  - /var/log/foodbot/reset.log"
+echo "  - /var/log/foodbot/rotate.log"
 echo ""
 echo "Zum Testen kannst du die Skripte manuell ausführen:"
-echo "  python3 $PROJECT_DIR/backup_db.py"
-echo "  python3 $PROJECT_DIR/clear_registrations.py"
+echo "  cd $PROJECT_DIR && PYTHONPATH=. python3 scripts/backup_db.py"
+echo "  cd $PROJECT_DIR && PYTHONPATH=. python3 scripts/rotate_registrations.py"
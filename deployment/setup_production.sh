@@ -81,7 +81,7 @@ echo ""
 # Datenbank initialisieren
 echo -e "${YELLOW}💾 Datenbank initialisieren...${NC}"
 cd "$PROJECT_DIR"
-sudo -u "$PROJECT_USER" "$VENV_DIR/bin/python" -c "from app import create_app, db; app = create_app(); app.app_context().push(); db.create_all(); print('✓ Datenbank initialisiert')"
+sudo -u "$PROJECT_USER" "$VENV_DIR/bin/python" scripts/migrate_db.py
 echo ""
 
 # .env Datei erstellen falls nicht vorhanden
@@ -165,13 +165,13 @@ echo ""
 # Cronjobs einrichten
 echo -e "${YELLOW}⏰ Cronjobs einrichten...${NC}"
 # Backup Cronjob: Täglich um 00:30 Uhr
-BACKUP_CRON="30 0 * * * $VENV_DIR/bin/python $PROJECT_DIR/backup_db.py >> $LOG_DIR/backup.log 2>&1"
-# Reset Cronjob: Täglich um 00:00 Uhr
-RESET_CRON="0 0 * * * $VENV_DIR/bin/python $PROJECT_DIR/clear_registrations.py >> $LOG_DIR/reset.log 2>&1"
+BACKUP_CRON="30 0 * * * cd $PROJECT_DIR && PYTHONPATH=$PROJECT_DIR $VENV_DIR/bin/python scripts/backup_db.py >> $LOG_DIR/backup.log 2>&1"
+# Rotation: Täglich um 00:05 Uhr abgeschlossene Tage ins Archiv verschieben
+ROTATE_CRON="5 0 * * * cd $PROJECT_DIR && PYTHONPATH=$PROJECT_DIR $VENV_DIR/bin/python scripts/rotate_registrations.py >> $LOG_DIR/rotate.log 2>&1"
 
 # Cronjobs für den Projektuser hinzufügen
 (sudo -u "$PROJECT_USER" crontab -l 2>/dev/null | grep -v "backup_db.py"; echo "$BACKUP_CRON") | sudo -u "$PROJECT_USER" crontab -
-(sudo -u "$PROJECT_USER" crontab -l 2>/dev/null | grep -v "clear_registrations.py"; echo "$RESET_CRON") | sudo -u "$PROJECT_USER" crontab -
+(sudo -u "$PROJECT_USER" crontab -l 2>/dev/null | grep -v "clear_registrations.py" | grep -v "rotate_registrations.py"; echo "$ROTATE_CRON") | sudo -u "$PROJECT_USER" crontab -
 echo -e "${GREEN}✓${NC} Cronjobs eingerichtet"
 echo ""
 
@@ -1,56 +1,29 @@
 #!/usr/bin/env python3
 """
-Backup-Skript für FoodBot-Datenbank
-Erstellt tägliche Backups der SQLite-Datenbank
-"""
-
-import shutil
-import os
-from datetime import datetime
+Backup-Skript für die FoodBot-Datenbank (täglich per Cron).
 
-# Konfiguration
-DB_FILE = 'foodbot.db'
-BACKUP_DIR = 'backups'
-MAX_BACKUPS = 14  # Behalte die letzten 14 Backups
+Online-Backup über app/backup.py: konsistent auch bei laufendem Betrieb,
+geprüft, gzip-komprimiert (PostgreSQL: pg_dump); behält die BACKUP_KEEP
+neuesten Backups (Default 14).
 
-def create_backup():
-    """Erstelle ein Backup der Datenbank"""
-    if not os.path.exists(DB_FILE):
-        print(f"⚠️  Datenbank {DB_FILE} nicht gefunden!")
-        return False
-    
-    # Backup-Verzeichnis erstellen
-    os.makedirs(BACKUP_DIR, exist_ok=True)
-    
-    # Dateiname mit Zeitstempel
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_file = os.path.join(BACKUP_DIR, f'foodbot_backup_{timestamp}.db')
-    
-    # Kopiere Datenbank
-    shutil.copy2(DB_FILE, backup_file)
-    file_size = os.path.getsize(backup_file) / 1024  # KB
-    print(f"✅ Backup erstellt: {backup_file} ({file_size:.1f} KB)")
-    
-    # Alte Backups löschen
-    cleanup_old_backups()
-    
-    return True
+Usage:
+    cd /home/pi/FoodBot && PYTHONPATH=. python scripts/backup_db.py
+"""
+import sys
 
-def cleanup_old_backups():
-    """Lösche alte Backups, behalte nur die letzten MAX_BACKUPS"""
-    if not os.path.exists(BACKUP_DIR):
-        return
-    
-    backups = sorted([f for f in os.listdir(BACKUP_DIR) if f.endswith('.db')])
-    
-    if len(backups) > MAX_BACKUPS:
-        to_delete = backups[:-MAX_BACKUPS]
-        for old_backup in to_delete:
-            path = os.path.join(BACKUP_DIR, old_backup)
-            os.remove(path)
-            print(f"🗑️  Altes Backup gelöscht: {old_backup}")
+from app import create_app
+from app.backup import BackupError
+from app.system import backup_database
 
 if __name__ == '__main__':
     print("🔄 Starte Datenbank-Backup...")
-    success = create_backup()
-    exit(0 if success else 1)
+    app = create_app(background=False)
+    with app.app_context():
+        try:
+            backup = backup_database(admin_user='cron')
+        except BackupError as e:
+            print(f"❌ Backup fehlgeschlagen: {e}")
+            sys.exit(1)
+    print(f"✅ Backup erstellt: {backup}")
+    for path in backup.removed:
+        print(f"🗑️  Altes Backup gelöscht: {path}")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parallele Schreiber auf SQLite, ohne und mit Speicherprofil.
+
+Simuliert Kiosk-Anmeldungen aus mehreren Gunicorn-Workern: jeder Prozess
+schreibt kurze Transaktionen (Anmeldung + Tageszähler), daneben liest ein
+Prozess dauernd (Küchen-Anzeige). Verglichen werden
+
+- `legacy`: SQLite-Defaults (Rollback-Journal, synchronous=FULL,
+  5 s Lock-Timeout von pysqlite) wie vor storage.py
+- `storage`: PRAGMAs aus app/storage.py (WAL, synchronous=NORMAL, ...)
+
+Usage:
+    python scripts/bench_sqlite_writers.py
+    python scripts/bench_sqlite_writers.py --writers 8 --transactions 300
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage import apply_pragmas  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE registration (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, date TEXT NOT NULL,
+                           UNIQUE (user_id, date));
+CREATE TABLE daily_count (date TEXT PRIMARY KEY, count INTEGER NOT NULL);
+"""
+
+
+def _connect(path, profile):
+    conn = sqlite3.connect(path, timeout=5.0)
+    if profile == 'storage':
+        apply_pragmas(conn)
+    return conn
+
+
+def _writer(path, profile, worker, transactions, results):
+    conn = _connect(path, profile)
+    latencies, errors = [], 0
+    for i in range(transactions):
+        user_id = worker * 100000 + i
+        started = time.perf_counter()
+        try:
+            conn.execute("SELECT id FROM registration WHERE user_id = ? AND date = '2025-01-01'", (user_id,)).fetchone()
+            conn.execute("INSERT INTO registration (user_id, date) VALUES (?, '2025-01-01')", (user_id,))
+            conn.execute("INSERT INTO daily_count (date, count) VALUES ('2025-01-01', 1) "
+                         "ON CONFLICT (date) DO UPDATE SET count = count + 1")
+            conn.commit()
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            conn.rollback()
+            errors += 1
+    conn.close()
+    results.put((latencies, errors))
+
+
+def _reader(path, profile, stop, results):
+    conn = _connect(path, profile)
+    reads = 0
+    while not stop.is_set():
+        try:
+            conn.execute("SELECT count(*), max(user_id) FROM registration").fetchone()
+            reads += 1
+        except sqlite3.OperationalError:
+            pass
+    conn.close()
+    results.put(reads)
+
+
+def run(profile, writers, transactions):
+    directory = tempfile.mkdtemp(prefix='foodbot-bench-')
+    path = os.path.join(directory, 'bench.db')
+    conn = _connect(path, profile)
+    conn.executescript(SCHEMA)
+    conn.close()
+
+    results, reads = multiprocessing.Queue(), multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    reader = multiprocessing.Process(target=_reader, args=(path, profile, stop, reads))
+    reader.start()
+    started = time.perf_counter()
+    processes = [multiprocessing.Process(target=_writer, args=(path, profile, w, transactions, results))
+                 for w in range(writers)]
+    for p in processes:
+        p.start()
+    collected = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - started
+    for p in processes:
+        p.join()
+    stop.set()
+    read_count = reads.get()
+    reader.join()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    latencies = sorted(l for lat, _ in collected for l in lat)
+    errors = sum(e for _, e in collected)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f"{profile:8} {len(latencies) / elapsed:8.0f} tx/s  "
+          f"p50 {statistics.median(latencies) * 1000 if latencies else 0:7.2f} ms  "
+          f"p95 {p95 * 1000:7.2f} ms  "
+          f"locked {errors:5}  reads {read_count:7}  ({elapsed:.1f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4, help='Parallele Schreib-Prozesse')
+    parser.add_argument('--transactions', type=int, default=200, help='Transaktionen pro Schreiber')
+    args = parser.parse_args()
+
+    print(f"{args.writers} Schreiber × {args.transactions} Transaktionen, 1 Leser")
+    for profile in ('legacy', 'storage'):
+        run(profile, args.writers, args.transactions)
+
+
+if __name__ == '__main__':
+    main()
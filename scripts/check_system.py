@@ -57,7 +57,7 @@ def check_database():
         from app import create_app
         from app.models import User, Menu, Registration
         
-        app = create_app()
+        app = create_app(background=False)
         with app.app_context():
             user_count = User.query.count()
             menu_today = Menu.query.filter_by(date=__import__('datetime').date.today()).first()
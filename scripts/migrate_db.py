@@ -1,24 +1,74 @@
 #!/usr/bin/env python3
 """
-Datenbank-Migration: Fügt fehlende Indizes und AdminLog-Tabelle hinzu
+Datenbank-Migration: wendet ausstehende Schema-Migrationen an (app/migrations.py).
+
+Passiert auch automatisch beim Start der App (create_app); das Skript
+migriert ohne Serverstart, zeigt den Stand an und ersetzt die früheren
+Einzelskripte (migrate_*.py).
+
+Usage:
+    python scripts/migrate_db.py                 # Migrieren + Stand anzeigen
+    python scripts/migrate_db.py --seed-presets  # Zusätzlich Standard-Menüvorlagen anlegen (falls leer)
 """
-from app import create_app
-from app.models import db, AdminLog
-import sqlite3
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app import migrations  # noqa: E402
+from app.models import db, PresetMenu  # noqa: E402
+
+DEFAULT_PRESETS = [
+    "Schnitzel mit Pommes",
+    "Spaghetti Bolognese",
+    "Currywurst mit Pommes",
+    "Gulasch mit Nudeln",
+    "Hähnchen mit Reis",
+    "Kassler mit Sauerkraut",
+    "Fischfilet mit Kartoffeln",
+    "Chili con Carne",
+    "Pizza",
+    "Lasagne",
+    "Eintopf",
+    "Salat"
+]
+
 
-def migrate_db():
-    app = create_app()
-    
+def print_status():
+    for m in migrations.status():
+        mark = '✓' if m['applied_at'] else '…'
+        when = m['applied_at'].strftime('%d.%m.%Y %H:%M') if m['applied_at'] else 'ausstehend'
+        print(f"  {mark} {m['version']:3}  {m['name']:25} {when}")
+
+
+def seed_presets():
+    if PresetMenu.query.count():
+        print("✓ Vordefinierte Menüs existieren bereits")
+        return
+    try:
+        for i, name in enumerate(DEFAULT_PRESETS):
+            db.session.add(PresetMenu(name=name, sort_order=i))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    print(f"✅ {len(DEFAULT_PRESETS)} Standard-Menüs hinzugefügt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed-presets', action='store_true', help='Standard-Menüvorlagen anlegen')
+    args = parser.parse_args()
+
+    app = create_app(background=False)  # wendet ausstehende Migrationen an
     with app.app_context():
-        # Erstelle alle neuen Tabellen (AdminLog)
-        db.create_all()
-        print("✅ Tabellen erstellt/aktualisiert")
-        
-        # Indizes werden automatisch von SQLAlchemy erstellt
-        print("✅ Indizes werden beim nächsten Start angewendet")
-        
-        print("\n🎉 Migration erfolgreich!")
-        print("Bitte Service neu starten: sudo systemctl restart foodbot")
+        print(f"🗄️  Schema-Version {migrations.current_version()} von {migrations.LATEST}")
+        print_status()
+        if args.seed_presets:
+            seed_presets()
+
 
 if __name__ == '__main__':
-    migrate_db()
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Lokaler PostgREST-Ersatz für den Kameraden-Sync (Entwicklung/Tests).
+
+Liefert `GET /Kameraden` aus einer JSON-Datei und versteht die Filter, die
+sync.py benutzt (`eq.`, `gt.`, `gte.`, `not.is.null`, `select=`, `or=(...)`
+mit verschachteltem `and(...)`), dazu ETag/If-None-Match. Unbekannte Spalten ergeben wie bei PostgREST 400. Die
+Datei wird bei jedem Request neu gelesen: Änderungen (mit neuem
+`updated_at`) sind sofort sichtbar. Das JWT wird nicht geprüft.
+
+Usage:
+    python scripts/postgrest_stub.py kameraden.json --generate 1000
+    python scripts/postgrest_stub.py kameraden.json --port 3000
+
+    POSTGREST_URL=http://localhost:3000 JWT_SECRET=dev python run.py
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+def generate(path, count):
+    """Beispieldaten mit `count` aktiven Kameraden schreiben"""
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [{
+        'id': i,
+        'Vorname': f'Vorname{i}',
+        'Name': f'Name{i}',
+        'Personalnummer': f'{10000 + i}',
+        'KartenID': f'CARD{i:05d}',
+        'Aktiv': True,
+        'food_rolle': 'Esser',
+        'updated_at': now,
+    } for i in range(1, count + 1)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, ensure_ascii=False, indent=1)
+    print(f"{count} Kameraden nach {path} geschrieben")
+
+
+def _matches(value, condition):
+    if condition == 'not.is.null':
+        return value is not None
+    if condition == 'is.null':
+        return value is None
+    op, _, operand = condition.partition('.')
+    if len(operand) >= 2 and operand[0] == operand[-1] == '"':
+        operand = operand[1:-1]
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        text = str(value).lower()
+    elif isinstance(value, (int, float)):
+        # Zahlen wie PostgreSQL numerisch vergleichen, nicht als Text
+        text, operand = value, float(operand)
+    else:
+        text = str(value)
+    if op == 'eq':
+        return text == operand
+    if op == 'neq':
+        return text != operand
+    if op == 'gt':
+        return text > operand
+    if op == 'gte':
+        return text >= operand
+    if op == 'lt':
+        return text < operand
+    if op == 'lte':
+        return text <= operand
+    raise ValueError(f"Operator nicht unterstützt: {op}")
+
+
+def _split(text):
+    """Elemente einer Filter-Liste an Kommas der obersten Ebene trennen"""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _logic(op, items, columns):
+    """`or=(...)`/`and(...)` in eine Prüffunktion für eine Zeile übersetzen"""
+    if not (items.startswith('(') and items.endswith(')')):
+        raise ValueError(f"Logischer Filter ohne Klammern: {op}={items}")
+    checks = []
+    for item in _split(items[1:-1]):
+        for nested in ('and', 'or'):
+            if item.startswith(f'{nested}('):
+                checks.append(_logic(nested, item[len(nested):], columns))
+                break
+        else:
+            key, _, condition = item.partition('.')
+            if key not in columns:
+                raise KeyError(key)
+            checks.append(lambda row, key=key, condition=condition: _matches(row.get(key), condition))
+    combine = any if op == 'or' else all
+    return lambda row: combine(check(row) for check in checks)
+
+
+def make_handler(path):
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, status, payload, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/Kameraden':
+                return self._json(404, {'message': 'Not Found'})
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                return self._json(401, {'message': 'JWT fehlt'})
+
+            with open(path, encoding='utf-8') as f:
+                rows = json.load(f)
+            columns = set().union(*(row.keys() for row in rows)) if rows else set()
+
+            select = None
+            try:
+                for key, condition in parse_qsl(url.query, keep_blank_values=True):
+                    if key == 'select':
+                        select = condition.split(',')
+                        continue
+                    if key in ('or', 'and'):
+                        match = _logic(key, condition, columns)
+                        rows = [row for row in rows if match(row)]
+                        continue
+                    if key not in columns:
+                        raise KeyError(key)
+                    rows = [row for row in rows if _matches(row.get(key), condition)]
+                if select:
+                    missing = [c for c in select if c not in columns]
+                    if missing:
+                        raise KeyError(missing[0])
+                    rows = [{c: row.get(c) for c in select} for row in rows]
+            except KeyError as e:
+                return self._json(400, {'code': '42703', 'message': f'column Kameraden.{e.args[0]} does not exist'})
+            except ValueError as e:
+                return self._json(400, {'code': 'PGRST100', 'message': str(e)})
+
+            etag = '"' + hashlib.sha1(json.dumps(rows, sort_keys=True).encode()).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self._json(200, rows, {'ETag': etag})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data', help='JSON-Datei mit Kameraden')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--generate', type=int, metavar='N', help='N Beispiel-Kameraden erzeugen und beenden')
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.data, args.generate)
+        return
+    if not os.path.exists(args.data):
+        parser.error(f"{args.data} fehlt (mit --generate N anlegen)")
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.data))
+    print(f"PostgREST-Stub auf http://127.0.0.1:{args.port}/Kameraden ({args.data})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
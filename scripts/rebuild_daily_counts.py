@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Reparatur: Tageszähler (DailyCounts) aus Registration/Guest neu berechnen.
+
+Usage:
+    python scripts/rebuild_daily_counts.py                 # alle Tage
+    python scripts/rebuild_daily_counts.py 2025-01-01      # ab Datum
+    python scripts/rebuild_daily_counts.py 2025-01-01 2025-01-31
+"""
+import sys
+from datetime import date
+
+from app import create_app
+from app.counters import rebuild
+
+
+def main():
+    start = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    end = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+    app = create_app(background=False)
+    with app.app_context():
+        days = rebuild(start, end)
+    print(f"✅ Tageszähler für {days} Tage neu berechnet.")
+
+
+if __name__ == '__main__':
+    main()
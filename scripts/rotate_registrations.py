@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Nächtliche Rotation: abgeschlossene Tage von `Registration` ins Archiv
+verschieben (ersetzt das frühere Löschen aller Anmeldungen) und die
+Anmeldezähler pro User auf den neuen Tag vorrücken.
+
+Usage:
+    python scripts/rotate_registrations.py
+"""
+from app import create_app
+from app.archive import rotate
+from app.attendance import decay
+
+app = create_app(background=False)
+
+with app.app_context():
+    moved = rotate()
+    print(f"{moved} Anmeldungen archiviert.")
+    decay()
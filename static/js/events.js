@@ -0,0 +1,46 @@
+/* ===================================
+   Server-Sent Events (/events) mit Polling-Fallback
+   =================================== */
+
+/**
+ * Subscribes to server push topics; falls back to polling if SSE is unavailable
+ * @param {string[]} topics - e.g. ['kitchen'] or ['menu']
+ * @param {Object} handlers - topic → function(data)
+ * @param {Object} fallback - { poll: function, interval: ms } when SSE fails
+ */
+function subscribeEvents(topics, handlers, fallback) {
+    const MAX_STREAM_ERRORS = 3; // Danach auf Polling umschalten
+    let fallbackTimer = null;
+
+    function startFallback() {
+        if (fallback && !fallbackTimer) {
+            fallbackTimer = setInterval(fallback.poll, fallback.interval);
+        }
+    }
+
+    if (!window.EventSource) {
+        startFallback();
+        return null;
+    }
+
+    let errors = 0;
+    // EventSource verbindet selbst neu (Stream endet serverseitig nach ~1 Minute)
+    const source = new EventSource(`${BASE_URL}/events?topics=${topics.join(',')}`);
+    topics.forEach(topic => {
+        source.addEventListener(topic, e => {
+            errors = 0;
+            handlers[topic](JSON.parse(e.data));
+        });
+    });
+    source.addEventListener('open', () => {
+        errors = 0;
+    });
+    source.addEventListener('error', () => {
+        errors++;
+        if (source.readyState === EventSource.CLOSED || errors >= MAX_STREAM_ERRORS) {
+            source.close();
+            startFallback();
+        }
+    });
+    return source;
+}
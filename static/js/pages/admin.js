@@ -180,3 +180,106 @@ function validateForm(form) {
     
     return isValid;
 }
+
+// ===================================
+// Background Jobs
+// ===================================
+
+/**
+ * Polls the job shown in #job-status (CSV import, sync) until it finishes
+ * and renders progress, result and rejected import rows
+ */
+function watchJob(box) {
+    const text = box.querySelector('.job-status__text');
+    const bar = box.querySelector('.job-status__bar');
+    const cancelBtn = box.querySelector('.job-status__cancel');
+    const errorList = box.querySelector('.import-errors');
+
+    cancelBtn.addEventListener('click', function() {
+        cancelBtn.disabled = true;
+        fetch(box.dataset.cancelUrl, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': box.dataset.csrf }
+        }).catch(function() { cancelBtn.disabled = false; });
+    });
+
+    function render(job) {
+        const done = job.progress.done;
+        const total = job.progress.total;
+        if (total) {
+            bar.max = total;
+            bar.value = done;
+        }
+        if (job.status === 'queued' || job.status === 'running') {
+            text.textContent = '⏳ ' + (job.message || 'Wartet …');
+            return false;
+        }
+
+        bar.remove();
+        cancelBtn.remove();
+        if (job.status === 'done') {
+            text.textContent = '✅ ' + (job.result && job.result.summary ? job.result.summary : 'Fertig');
+            const errors = (job.result && job.result.errors) || [];
+            errors.forEach(function(error) {
+                const li = document.createElement('li');
+                li.textContent = 'Zeile ' + error.line +
+                    (error.personal_number ? ' (' + error.personal_number + ')' : '') + ': ' + error.reason;
+                errorList.appendChild(li);
+            });
+            errorList.hidden = errors.length === 0;
+        } else if (job.status === 'cancelled') {
+            text.textContent = '⏹ Abgebrochen';
+        } else {
+            box.classList.add('job-status--failed');
+            text.textContent = '❌ Fehlgeschlagen: ' + (job.error || 'unbekannter Fehler');
+        }
+        return true;
+    }
+
+    function poll() {
+        fetch(box.dataset.jobUrl, { headers: { 'Accept': 'application/json' } })
+            .then(function(response) { return response.json(); })
+            .then(function(job) {
+                if (!render(job)) setTimeout(poll, 1000);
+            })
+            .catch(function() { setTimeout(poll, 3000); });
+    }
+    poll();
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const box = document.getElementById('job-status');
+    if (box) watchJob(box);
+});
+
+// ===================================
+// Live Updates
+// ===================================
+
+/**
+ * Shows a reload hint when registrations, guests or users changed elsewhere
+ * (kein automatisches Neuladen, damit offene Formulare nicht verloren gehen)
+ */
+let adminVersion = null;
+
+function onAdminEvent(data) {
+    if (adminVersion === null || adminVersion === data.version) {
+        adminVersion = data.version;
+        return;
+    }
+    adminVersion = data.version;
+    if (document.getElementById('admin-update-hint')) return;
+
+    const hint = document.createElement('button');
+    hint.id = 'admin-update-hint';
+    hint.type = 'button';
+    hint.className = 'btn btn-secondary';
+    hint.textContent = '🔄 Neue Daten – Seite neu laden';
+    hint.style.cssText = 'position: fixed; bottom: 20px; right: 20px; z-index: 1000;';
+    hint.addEventListener('click', () => window.location.reload());
+    document.body.appendChild(hint);
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    subscribeEvents(['admin'], { admin: onAdminEvent }, null);
+});
@@ -2,44 +2,91 @@
    Kitchen Display - JavaScript
    =================================== */
 
+// ETag der zuletzt angezeigten Daten (Server antwortet 304 wenn unverändert)
+let kitchenEtag = null;
+// Datenstand für Delta-Abfragen (?since=), null = vollständigen Stand holen
+let kitchenVersion = null;
+
+// Hilfsfunktion für XSS-Schutz
+function escapeHtml(text) {
+    return text.replace(/[&<>"']/g, function(m) {
+        return ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[m]);
+    });
+}
+
+/**
+ * Creates a badge element for one registered user
+ */
+function createUserBadge(user) {
+    const badge = document.createElement('div');
+    badge.className = 'user-badge';
+    badge.dataset.userId = user.user_id;
+    badge.dataset.sortName = user.name.toLowerCase();
+    // Name
+    let html = `<span>${escapeHtml(user.name)}</span>`;
+    // Menüwahl
+    if (user.menu_name) {
+        html += ` <span style="color:#94a3b8; font-size:0.92em;">· ${escapeHtml(user.menu_name)}</span>`;
+    }
+    badge.innerHTML = html;
+    return badge;
+}
+
+/**
+ * Applies registered/unregistered changes to the list without rebuilding it
+ */
+function applyKitchenChanges(usersList, changes) {
+    changes.forEach(change => {
+        const existing = usersList.querySelector(`[data-user-id="${change.user_id}"]`);
+        if (existing) existing.remove();
+        if (change.type !== 'registered') return;
+
+        // Alphabetisch einsortieren
+        const badge = createUserBadge(change);
+        const next = Array.from(usersList.children)
+            .find(el => (el.dataset.sortName || '') > badge.dataset.sortName);
+        usersList.insertBefore(badge, next || null);
+    });
+}
+
 /**
  * Updates the kitchen display with fresh data from the server
  */
 function updateKitchen() {
-    fetch(`${BASE_URL}/kitchen/data?t=${Date.now()}`)
-        .then(response => response.json())
+    const url = kitchenVersion
+        ? `${BASE_URL}/kitchen/data?since=${encodeURIComponent(kitchenVersion)}`
+        : `${BASE_URL}/kitchen/data`;
+    fetch(url, {
+        cache: 'no-store',
+        headers: kitchenEtag ? { 'If-None-Match': kitchenEtag } : {}
+    })
+        .then(response => {
+            if (response.status === 304) return null;
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            kitchenEtag = response.headers.get('ETag');
+            return response.json();
+        })
         .then(data => {
+            if (!data) return; // Nichts geändert
+            kitchenVersion = data.version;
+
             // Update statistics counters
             document.getElementById('total-count').textContent = data.total;
             document.getElementById('menu1-count').textContent = data.menu1_count;
             document.getElementById('menu2-count').textContent = data.menu2_count;
             document.getElementById('guest-count').textContent = data.guest_count;
-            document.getElementById('user-count').textContent = data.users.length;
-            
-            // Update users list (zeige Menüwahl mit an)
-            const usersList = document.getElementById('users-list');
-            usersList.innerHTML = data.users
-                .map(user => {
-                    const safe = document.createElement('div');
-                    safe.className = 'user-badge';
-                    // Name
-                    let html = '';
-                    html += `<span>${escapeHtml(user.name)}</span>`;
-                    // Menüwahl
-                    if (user.menu_name) {
-                        html += ` <span style="color:#94a3b8; font-size:0.92em;">· ${escapeHtml(user.menu_name)}</span>`;
-                    }
-                    safe.innerHTML = html;
-                    return safe.outerHTML;
-                })
-                .join('');
+            document.getElementById('user-count').textContent = data.user_count;
 
-            // Hilfsfunktion für XSS-Schutz
-            function escapeHtml(text) {
-                return text.replace(/[&<>"']/g, function(m) {
-                    return ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[m]);
-                });
+            const usersList = document.getElementById('users-list');
+            if (!data.full) {
+                // Delta: nur geänderte Einträge anfassen
+                applyKitchenChanges(usersList, data.changes);
+                return;
             }
+
+            // Vollständiger Stand: Liste neu aufbauen (zeige Menüwahl mit an)
+            usersList.textContent = '';
+            data.users.forEach(user => usersList.appendChild(createUserBadge(user)));
             
             // Update menu display (safe DOM manipulation)
             const menuDisplay = document.querySelector('.menu-display');
@@ -84,6 +131,9 @@ function updateKitchen() {
         })
         .catch(error => {
             console.error('Error updating kitchen display:', error);
+            // Beim nächsten Mal sicherheitshalber wieder vollständig laden
+            kitchenVersion = null;
+            kitchenEtag = null;
         });
 }
 
@@ -104,8 +154,8 @@ function toggleMenuInputs() {
 
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
-    // Start auto-refresh
-    setInterval(updateKitchen, 5000);
+    // Push statt Polling: Server meldet jede Änderung (Polling nur als Fallback)
+    subscribeEvents(['kitchen'], { kitchen: updateKitchen }, { poll: updateKitchen, interval: 5000 });
     
     // Initial update
     updateKitchen();
@@ -77,12 +77,20 @@ async function selectMenu(choice) {
 
 // RFID polling removed - scanner uses keyboard events in touch.html
 
+// ETag des angezeigten Menüs (Server antwortet 304 wenn unverändert)
+let menuEtag = null;
+
 /**
  * Update menu display with latest menu data
  */
 async function updateMenu() {
     try {
-        const res = await fetch(`${BASE_URL}/menu/data?t=${Date.now()}`);
+        const res = await fetch(`${BASE_URL}/menu/data`, {
+            cache: 'no-store',
+            headers: menuEtag ? { 'If-None-Match': menuEtag } : {}
+        });
+        if (res.status === 304) return; // Menü unverändert
+        menuEtag = res.headers.get('ETag');
         const data = await res.json();
         const display = document.getElementById('menuDisplay');
         
@@ -198,5 +206,6 @@ async function handleSubmit(e) {
 
 // Initialize updates
 // RFID-Polling entfernt - Scanner wird jetzt über document keyboard events in touch.html erfasst
-setInterval(updateMenu, 10000); // Update every 10 seconds
+// Menü-Änderungen per Push (Polling alle 10 Sekunden nur als Fallback)
+subscribeEvents(['menu'], { menu: updateMenu }, { poll: updateMenu, interval: 10000 });
 updateMenu();
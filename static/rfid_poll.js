@@ -1,16 +1,58 @@
-// Dieses Skript pollt regelmäßig eine lokale API, um eine gescannte Karten-ID automatisch ins Formular einzutragen.
-setInterval(async function() {
-    try {
-        let resp = await fetch(BASE_URL + '/rfid_scan');
-        if (resp.ok) {
-            let data = await resp.json();
-            if (data.card_id) {
-                let input = document.querySelector('input[name="card_id"]');
-                if (input) {
-                    input.value = data.card_id;
-                    document.querySelector('form').submit();
+// Dieses Skript trägt eine gescannte Karten-ID automatisch ins Formular ein.
+// Bevorzugt Server-Sent Events (/events?topics=scan), Polling nur als Fallback.
+(function() {
+    const POLL_INTERVAL = 1000; // Fallback: alle 1 Sekunde
+    const MAX_STREAM_ERRORS = 3; // Danach auf Polling umschalten
+
+    function submitCard(cardId) {
+        let input = document.querySelector('input[name="card_id"]');
+        if (input) {
+            input.value = cardId;
+            document.querySelector('form').submit();
+        }
+    }
+
+    function startPolling() {
+        setInterval(async function() {
+            try {
+                let resp = await fetch(BASE_URL + '/rfid_scan');
+                if (resp.ok) {
+                    let data = await resp.json();
+                    if (data.card_id) {
+                        submitCard(data.card_id);
+                    }
                 }
+            } catch (e) {}
+        }, POLL_INTERVAL);
+    }
+
+    function startStream() {
+        let errors = 0;
+        // EventSource verbindet selbst neu und sendet dabei Last-Event-ID
+        const source = new EventSource(BASE_URL + '/events?topics=scan');
+        source.addEventListener('scan', function(e) {
+            errors = 0;
+            const data = JSON.parse(e.data);
+            if (data.card_id) {
+                source.close();
+                submitCard(data.card_id);
             }
-        }
-    } catch (e) {}
-}, 1000); // alle 1 Sekunde
+        });
+        source.addEventListener('open', function() {
+            errors = 0;
+        });
+        source.addEventListener('error', function() {
+            errors++;
+            if (source.readyState === EventSource.CLOSED || errors >= MAX_STREAM_ERRORS) {
+                source.close();
+                startPolling();
+            }
+        });
+    }
+
+    if (window.EventSource) {
+        startStream();
+    } else {
+        startPolling();
+    }
+})();
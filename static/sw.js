@@ -33,8 +33,13 @@ self.addEventListener('activate', event => {
 self.addEventListener('fetch', event => {
     const url = new URL(event.request.url);
 
+    // Event-Streams nicht abfangen (Service Worker würde sie puffern)
+    if (event.request.headers.get('Accept') === 'text/event-stream') {
+        return;
+    }
+
     // API-Anfragen: Nie cachen (sensible Daten)
-    if (url.pathname.startsWith('/api/') || url.pathname === '/rfid_scan' || url.pathname.startsWith('/kitchen/data') || url.pathname.startsWith('/menu/data')) {
+    if (url.pathname.startsWith('/api/') || url.pathname.startsWith('/events') || url.pathname.startsWith('/rfid_scan') || url.pathname.startsWith('/kitchen/data') || url.pathname.startsWith('/menu/data')) {
         event.respondWith(fetch(event.request));
         return;
     }